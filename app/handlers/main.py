@@ -2,128 +2,140 @@ from app.handlers.set_dep import handle_set_dep
 from app.handlers.set_dest import handle_set_dest
 from app.services.gpt import classify_state
 
-from app.services.redis_session import get_session, update_session, set_slot, get_slot
-from app.services.apis import fetch_realtime_bus_info, fetch_bus_directions
+from app.handlers.message import format_arrival_message
 
-import os
-import json
-from dotenv import load_dotenv
-load_dotenv()
-from openai import OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.services.redis_session import set_slot, set_slots, get_slot, append_slot
+from app.services.memory import build_history
+from app.services.apis import fetch_bus_directions, itineraries_for_prompt, find_bus_leg
+from app.services.arrivals import CITY_CODE, get_arrivals, next_arrival
+from app.services.arrival_poller import mark_hot
+from app.services.llm import get_openai_client, structured_completion, StructuredOutputError
+from app.services.llm_schemas import MainResult
 
-
-
-def main(user_id, user_input):
-    state = classify_state(user_id, user_input).get("state", "error")
-    while True:
-        if state == "set_dest":
-            return handle_set_dest(user_id, user_input)
-        
-        elif state == "set_dep":
-            return handle_set_dep(user_id, user_input)
-        
-        elif state == "main":
-            return handle_main(user_id, user_input)
-        
-        else:
-            return {"message": "죄송하지만 버스 관련 정보만 안내해 드릴 수 있어요."}
-
-
-
-def handle_main(user_id, user_message):
-    dep_coord = get_slot(user_id, "dep_coord")
-    dest_coord = get_slot(user_id, "dest_coord")
-
-    if not dest_coord:
-        set_slot(user_id, "state", "set_dest")
-        set_slot(user_id, "sub_state", "coord")
-
-    elif not dep_coord:
-        set_slot(user_id, "state", "set_dep")
-        set_slot(user_id, "sub_state", "coord")
-
-    else:
-        route_info = get_slot(user_id, "route")
-        if not route_info:
-            route_info = fetch_bus_directions(dep_coord, dest_coord)
-            set_slot(user_id, "route", route_info)
-            if not route_info:
-                message = "죄송해요, 해당 경로에 대한 버스 정보를 찾을 수 없어요. 출발지와 목적지를 다시 확인해 주세요."
-                return {"message": message}
-        
-        else:
-            # 이미 경로 정보가 있는 경우, llm을 통해 대화형식으로 경로를 안내하고, 원하는 버스 정보를 추출해 실시간 버스 정보를 가져옵니다.
-            system_prompt = """
+SYSTEM_PROMPT = """
 너는 버스 정보 안내 도우미야. 사용자와의 대화 기록과 경로 데이터를 참고해 자연스럽고 정확하게 실시간 버스 정보를 안내하는 역할을 수행해야 해.
 
 - 최초 경로 안내는 최단시간의 경로를 요약해 주고, 추가적으로 도보이동이 적은 경로나 환승하지 않는 경로 등을 추천할 수 있어.
 - 사용자의 요청이 실시간 버스 정보와 관련이 있다면, 메시지를 생성하지 않고 버스번호(routeno)와 출발 정류장ID(nodeid)를 반환해야 해.
 - 실시간 요청이 아닌 경우, routeno와 nodeid는 절대 추출하지 말고 자연스러운 message만 생성해야 해.
 - 항상 JSON 형식으로만 응답해야 하고, 설명이나 코드블럭은 포함하면 안 돼.
-"""
-            prompt = f"""
-너는 버스 정보 안내 도우미야. 사용자와의 대화 기록을 참고해 자연스럽고 정확하게 버스 정보를 안내해야 해.
 
 다음 조건을 반드시 지켜:
 
 1. 사용자가 **실시간 버스 정보**를 요청한 경우:
     - 사용자에게 보여줄 메시지를 생성하지 마.
-    - 대신, 주어진 경로 검색 결과(route_info)에서 해당하는 버스번호(routeno)와 출발 정류장 ID(start_nodeid)를 찾아 반환해.
+    - 대신, 다음 system 메시지의 경로 검색 결과에서 해당하는 버스번호(routeno)와 출발 정류장 ID(start_nodeid)를 찾아 반환해.
     - 이 경우 message는 null이어야 하고, routeno와 nodeid는 실제 값으로 채워야 해.
 
 2. 사용자가 실시간 정보를 요청하지 않은 경우:
     - 사용자와 자연스럽게 이어지는 안내 메시지를 message에 생성해.
     - 이 경우 routeno와 nodeid는 **반드시 null로 설정해야 해.** (값을 추출하지 마.)
 
+경로 검색 결과는 추천 순으로 정렬된 경로이고, route_names는 같은 정류장 사이를 오가는 대체 가능한 버스 번호들이야.
+실시간 버스 정보 요청 여부는 마지막 사용자 발화에 따라 판단해.
+
 출력 형식은 반드시 다음 JSON 구조를 그대로 따라야 해.
 - 문자열이 아닌 JSON 객체 자체로 시작하고 끝나야 해.
 - **추가적인 설명, 주석, 코드 블럭, 따옴표 없는 텍스트 등은 절대 포함하지 마.**
 
-경로 검색 결과: {route_info}
-
-실시간 버스 정보 요청 여부: 사용자 발화에 따라 판단
-
 출력 형식:
-{{
+{
   "message": "사용자에게 보여줄 메시지 또는 null",
   "routeno": "사용자가 선택한 버스번호 또는 null",
   "nodeid": "사용자가 선택한 정류장id 또는 null"
-}}
+}
 """.strip()
 
-            session = get_session(user_id)
-            messages=[{
-                "role": "system", "content": system_prompt
-                }] + session.get("message_history", []) + [{"role": "user", "content": prompt}]
-            session["message_history"] = session.get("message_history", []) + [{"role": "user", "content": user_message}]
 
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    temperature=0.0,
-                )
+def main(user_id, user_input):
+    state = classify_state(user_id, user_input).get("state", "error")
+    while True:
+        if state == "set_dest":
+            return handle_set_dest(user_id, user_input)
+        
+        elif state == "set_dep":
+            return handle_set_dep(user_id, user_input)
+        
+        elif state == "main":
+            return handle_main(user_id, user_input)
+        
+        else:
+            return {"message": "죄송하지만 버스 관련 정보만 안내해 드릴 수 있어요."}
+
+
+
+def update_user_history(user_id, message):
+    """히스토리 업데이트 헬퍼 함수"""
+    for key in ["message_history", "history_main_step"]:
+        append_slot(user_id, key, {"role": "assistant", "content": message})
+
 
-                content = response.choices[0].message.content
-                print(f"main_state... GPT 응답: {content}")
-                
-                try:
-                    result = json.loads(content)
-                except json.JSONDecodeError:
-                    print("JSON 파싱 실패")
-                    result = {"state": "main", "sub_state": "main", "dep": None, "dest": None}
+def realtime_message(user_id, route_info, routeno, nodeid) -> str:
+    """handle_main이 고른 버스/정류장의 다음 도착 안내 문구"""
+    try:
+        arrivals = get_arrivals(nodeid)
+    except Exception as e:
+        print(f"❌ 실시간 버스 정보 조회 실패: {e}")
+        arrivals = None
+    arrival = next_arrival(arrivals, routeno) if arrivals and arrivals["value"] else None
+    if not arrival:
+        return f"죄송해요, 지금은 {routeno}번 버스의 도착 정보를 찾을 수 없어요. 잠시 후 다시 시도해주세요."
+    leg = find_bus_leg(route_info, routeno) or {"start_station": None}
+    return format_arrival_message(get_slot(user_id, "dest_name") or "목적지", leg, arrival)
 
 
-                # 결과에 따른 세션 값 업데이트
-                if result.get("routeno") and result.get("nodeid"):
-                    # 실시간 버스 정보 요청인 경우
-                    set_slot(user_id, "bus", get_slot(user_id, "bus", []) + [{"routeno": result["routeno"], "nodeid": result["nodeid"]}])
+def handle_main(user_id, user_message):
+    dep_coord = get_slot(user_id, "dep_coord")
+    dest_coord = get_slot(user_id, "dest_coord")
 
-            except Exception as e:
-                print(f"gpt api 호출 중 에러: {e}")
-                return {"departure": None, "destination": None}
+    if not dest_coord:
+        set_slots(user_id, {"state": "set_dest", "sub_state": "coord"})
+        return main(user_id, user_message)
 
+    elif not dep_coord:
+        set_slots(user_id, {"state": "set_dep", "sub_state": "coord"})
+        return main(user_id, user_message)
 
+    route_info = get_slot(user_id, "route")
+    if not route_info:
+        route_info = fetch_bus_directions(dep_coord, dest_coord)
+        set_slot(user_id, "route", route_info)
+        if not route_info:
+            message = "죄송해요, 해당 경로에 대한 버스 정보를 찾을 수 없어요. 출발지와 목적지를 다시 확인해 주세요."
+            return {"message": message}
+
+    # 경로 정보로 llm을 통해 대화형식으로 경로를 안내하고, 원하는 버스 정보를 추출해 실시간 버스 정보를 가져옵니다.
+    # 답은 여기서 만들어 반환 (같은 메시지로 main()을 다시 부르면 분류가 반복돼 결국 error로 끝남)
+    # 고정 지시문 → 경로 데이터 → 대화 기록(마지막이 이번 사용자 메시지) 순서 (앞부분이 호출마다 같아야 프롬프트 캐시가 적중)
+    messages = (
+        [{"role": "system", "content": SYSTEM_PROMPT},
+         {"role": "system", "content": f"경로 검색 결과: {itineraries_for_prompt(route_info)}"}]
+        + build_history(user_id, "main")
+    )
+
+    try:
+        try:
+            result = structured_completion(get_openai_client(), MainResult, "handle_main",
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.0,
+            ).model_dump()
+        except StructuredOutputError:
+            print("JSON 파싱 실패")
+            result = {"message": None, "routeno": None, "nodeid": None}
+        print(f"main_state... GPT 응답: {result}")
+
+        # 결과에 따른 세션 값 업데이트
+        if result.get("routeno") and result.get("nodeid"):
+            # 실시간 버스 정보 요청인 경우
+            set_slot(user_id, "bus", get_slot(user_id, "bus", []) + [{"routeno": result["routeno"], "nodeid": result["nodeid"]}])
+            mark_hot(CITY_CODE, [result["nodeid"]])
+            message = realtime_message(user_id, route_info, result["routeno"], result["nodeid"])
+        else:
+            message = result.get("message") or "죄송해요, 경로 안내 중 문제가 발생했어요. 다시 말씀해 주세요."
+        update_user_history(user_id, message)
+        return {"message": message}
 
-    return main(user_id, user_message)
\ No newline at end of file
+    except Exception as e:
+        print(f"gpt api 호출 중 에러: {e}")
+        return {"departure": None, "destination": None}
@@ -1,11 +1,102 @@
+import asyncio
+import json
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from pydantic import BaseModel
 from app.handlers.init import handle_init
 from app.services.gpt import classify_state
+from app.services.redis_session import SessionConflictError
+from app.services.redis_session_async import async_session_scope
+from app.services.redis_client import close_async_redis
+from app.services.resilience import turn_deadline
+from app.services.llm import message_stream
 
 app = FastAPI(title="Gashu Server API")
 
+
+@app.on_event("startup")
+async def startup():
+    from app.services.db import start_station_index
+    from app.services.arrivals import start_arrivals_poller
+    start_station_index()
+    start_arrivals_poller()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.services.history import stop_history_writer
+    from app.services.http_client_async import close_async_clients, stop_sync_loop
+    from app.services.llm import close_openai_client
+    await run_in_threadpool(stop_history_writer)
+    await run_in_threadpool(stop_sync_loop)
+    await run_in_threadpool(close_openai_client)
+    await close_async_clients()
+    await close_async_redis()
+
+
+async def run_turn(user_id: str, handler, *args):
+    """
+    한 턴을 요청 단위 세션 안에서 실행하고 끝에서 세션 변경 사항을 한 번에 기록.
+    세션 읽기/기록은 비동기로 처리하고, 동기 핸들러만 스레드풀에서 실행
+    턴 안의 업스트림/LLM 호출은 합쳐서 TURN_DEADLINE초 안에 끝나야 함 (남은 시간이 호출별 타임아웃이 됨)
+    """
+    try:
+        async with async_session_scope(user_id):
+            with turn_deadline():
+                return await run_in_threadpool(handler, *args)
+    except SessionConflictError as e:
+        print(f"세션 충돌: {e}")
+        return {"message": "이전 요청을 처리하고 있어요. 잠시 후 다시 말씀해 주세요."}
+
+
+def stream_turn(user_id: str, handler, *args) -> StreamingResponse:
+    """
+    run_turn의 스트리밍 버전 (NDJSON, 한 줄에 이벤트 하나)
+    - {"type": "delta", "text": "..."}: LLM이 생성 중인 message를 문장 단위로 바로 전달 (TTS는 delta만 읽으면 됨)
+    - {"type": "replace", "text": "..."}: 스트리밍한 문장이 최종 응답이 아니게 된 경우(형식 오류로 다시 요청 등).
+      클라이언트는 앞의 delta를 취소하고 이 text로 바꿈
+    - {"type": "done", ...}: 핸들러의 최종 응답. 세션은 이 이벤트 전에 기록됨
+    스트리밍한 문장 없이 끝난 턴(템플릿 응답, LLM 없이 만든 안내 등)은 최종 message를 delta 하나로 보냄
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def sink(text: str):
+        loop.call_soon_threadsafe(queue.put_nowait, ("delta", text))
+
+    async def produce():
+        try:
+            with message_stream(sink):
+                result = await run_turn(user_id, handler, *args)
+        except Exception as e:
+            print(f"❌ 스트리밍 턴 처리 실패: {e}")
+            result = {"message": "죄송해요, 서버에 문제가 발생했어요. 잠시 후 다시 시도해주세요."}
+        queue.put_nowait(("done", result))
+
+    async def events():
+        task = asyncio.create_task(produce())
+        streamed = []
+        while True:
+            kind, value = await queue.get()
+            if kind == "delta":
+                streamed.append(value)
+                yield json.dumps({"type": "delta", "text": value}, ensure_ascii=False) + "\n"
+                continue
+            final = value if isinstance(value, dict) else {"message": None}
+            message = final.get("message")
+            if message and " ".join(streamed) != " ".join(message.split()):
+                kind = "replace" if streamed else "delta"
+                yield json.dumps({"type": kind, "text": message}, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", **final}, ensure_ascii=False) + "\n"
+            await task
+            return
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 class Message(BaseModel):
     user_id: str = '0001'
     user_message: str = ''
@@ -13,33 +104,101 @@ class Message(BaseModel):
     user_lat: str = '36.62544'
 
 @app.post("/init")
-def initialize_user(msg: Message):
+async def initialize_user(msg: Message):
     print("Initializing user state...")
     print("controll by handlers.init => handle_init")
-    return handle_init(msg.user_id, msg.user_message, msg.user_lon, msg.user_lat)
+    return await run_turn(msg.user_id, handle_init, msg.user_id, msg.user_message, msg.user_lon, msg.user_lat)
 
 @app.post("/message")
-def handle_message(msg: Message):
+async def handle_message(msg: Message):
     from app.handlers.message import processing_message
-    return processing_message(msg.user_id, msg.user_message, msg.user_lon, msg.user_lat)
+    return await run_turn(msg.user_id, processing_message, msg.user_id, msg.user_message, msg.user_lon, msg.user_lat)
+
+@app.post("/message/stream")
+async def handle_message_stream(msg: Message):
+    from app.handlers.message import processing_message
+    return stream_turn(msg.user_id, processing_message, msg.user_id, msg.user_message, msg.user_lon, msg.user_lat)
 
 @app.post("/test/function")
-def test_endpoint(msg: Message):
-    return classify_state(msg.user_id, msg.user_message)
+async def test_endpoint(msg: Message):
+    return await run_turn(msg.user_id, classify_state, msg.user_id, msg.user_message)
 
 
 @app.post("/test/set_dest")
-def test_session(msg: Message):
+async def test_session(msg: Message):
     from app.handlers.set_dest import handle_set_dest
-    return handle_set_dest(msg.user_id, msg.user_message)
+    return await run_turn(msg.user_id, handle_set_dest, msg.user_id, msg.user_message)
 
 
 @app.post("/test/session")
-def test_session(msg: Message):
-    from app.services.redis_session import get_session
-    return get_session(msg.user_id)
+async def test_session(msg: Message):
+    from app.services.redis_session_async import get_session
+    return await get_session(msg.user_id)
 
 @app.post("/test/main")
-def test_main(msg: Message):
+async def test_main(msg: Message):
+    from app.handlers.main import main
+    return await run_turn(msg.user_id, main, msg.user_id, msg.user_message)
+
+@app.post("/test/main/stream")
+async def test_main_stream(msg: Message):
     from app.handlers.main import main
-    return main(msg.user_id, msg.user_message)
\ No newline at end of file
+    return stream_turn(msg.user_id, main, msg.user_id, msg.user_message)
+
+@app.get("/status/db")
+def db_status():
+    from app.services.db import get_mysql_pool
+    return get_mysql_pool().metrics()
+
+
+@app.get("/status/history")
+def history_status():
+    from app.services.history import get_history_stats
+    return get_history_stats()
+
+
+@app.get("/status/upstreams")
+def upstream_status():
+    from app.services.http_client import get_upstream_stats
+    return get_upstream_stats()
+
+
+@app.get("/status/breakers")
+def breaker_status():
+    from app.services.resilience import get_breaker_states
+    return get_breaker_states()
+
+
+@app.get("/status/llm")
+def llm_status():
+    from app.services.llm import get_llm_stats
+    return get_llm_stats()
+
+
+@app.get("/status/intent")
+def intent_status():
+    from app.services.intent import get_intent_stats
+    return get_intent_stats()
+
+
+@app.get("/status/poller")
+def poller_status():
+    from app.services.arrival_poller import get_poller_stats
+    return get_poller_stats()
+
+
+@app.get("/status/caches")
+def cache_status():
+    import app.services.apis  # 캐시 등록
+    from app.services.cache import get_cache_stats
+    return get_cache_stats()
+
+
+@app.post("/test/memory")
+async def test_memory(msg: Message):
+    from app.services.memory import get_memory_stats
+    from app.services.redis_session_async import get_slot
+    return {
+        "session": await get_slot(msg.user_id, "memory_stats", {}),
+        "call_sites": get_memory_stats(),
+    }
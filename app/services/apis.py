@@ -1,11 +1,87 @@
 import os
+import json
+import math
 from datetime import datetime, timedelta
-import requests
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.services.db import find_nearest_station_nodeid
+from app.services.db import find_nearest_station_nodeids
+from app.services.http_client import upstream_get, upstream_post
+from app.services.cache import TwoTierCache, normalize_query
+from app.services.arrival_poller import mark_hot
+from app.services.arrivals import CITY_CODE, get_arrivals, present_arrivals, normalize_routeno
+
+# 장소 검색 캐시 설정
+PLACE_CACHE_TTL = int(os.getenv("PLACE_CACHE_TTL", str(60 * 60 * 24 * 7)))         # 검색 결과 보관 시간(초)
+PLACE_CACHE_NEGATIVE_TTL = int(os.getenv("PLACE_CACHE_NEGATIVE_TTL", "300"))      # '결과 없음' 보관 시간(초)
+PLACE_CACHE_LOCAL_SIZE = int(os.getenv("PLACE_CACHE_LOCAL_SIZE", "2048"))         # 프로세스 내 캐시 항목 수
+PLACE_CACHE_LOCAL_TTL = int(os.getenv("PLACE_CACHE_LOCAL_TTL", "600"))            # 프로세스 내 캐시 보관 시간(초)
+PLACE_CACHE_STALE_IF_ERROR = int(os.getenv("PLACE_CACHE_STALE_IF_ERROR", str(60 * 60 * 24 * 7)))  # 카카오 장애 시 만료된 결과를 대신 쓸 수 있는 시간(초)
+
+keyword_cache = TwoTierCache(
+    "kakao_keyword", PLACE_CACHE_TTL, PLACE_CACHE_NEGATIVE_TTL,
+    local_size=PLACE_CACHE_LOCAL_SIZE, local_ttl=PLACE_CACHE_LOCAL_TTL, stale_if_error=PLACE_CACHE_STALE_IF_ERROR,
+)
+geocode_cache = TwoTierCache(
+    "kakao_geocode", PLACE_CACHE_TTL, PLACE_CACHE_NEGATIVE_TTL,
+    local_size=PLACE_CACHE_LOCAL_SIZE, local_ttl=PLACE_CACHE_LOCAL_TTL, stale_if_error=PLACE_CACHE_STALE_IF_ERROR,
+)
+
+# 경로 캐시 설정
+DIRECTIONS_GRID_M = float(os.getenv("DIRECTIONS_GRID_M", "50"))                    # 좌표를 맞추는 격자 크기(m)
+DIRECTIONS_TIME_BUCKET_MIN = int(os.getenv("DIRECTIONS_TIME_BUCKET_MIN", "30"))   # 검색 시각 구간(분)
+DIRECTIONS_FRESH_SEC = int(os.getenv("DIRECTIONS_FRESH_SEC", "300"))              # 이 시간이 지나면 백그라운드 갱신(초)
+DIRECTIONS_CACHE_TTL = int(os.getenv("DIRECTIONS_CACHE_TTL", "1800"))             # 오래된 결과를 내줄 수 있는 최대 시간(초)
+DIRECTIONS_NEGATIVE_TTL = int(os.getenv("DIRECTIONS_NEGATIVE_TTL", "120"))
+DIRECTIONS_STALE_IF_ERROR = int(os.getenv("DIRECTIONS_STALE_IF_ERROR", "21600"))  # SK 장애 시 이전 시간 구간 결과를 대신 쓸 수 있는 시간(초)
+
+directions_cache = TwoTierCache(
+    "sk_directions", DIRECTIONS_CACHE_TTL, DIRECTIONS_NEGATIVE_TTL,
+    local_size=512, local_ttl=DIRECTIONS_FRESH_SEC, stale_if_error=DIRECTIONS_STALE_IF_ERROR,
+)
+
+# 프롬프트용 경로 요약 설정
+ROUTE_PROMPT_TOP_K = int(os.getenv("ROUTE_PROMPT_TOP_K", "3"))                    # 프롬프트에 넣는 경로 수 (같은 정류장 경로는 하나로 묶은 뒤)
+ROUTE_WALK_WEIGHT = float(os.getenv("ROUTE_WALK_WEIGHT", "1.0"))                  # 순위 계산 시 도보 1분에 더하는 가중치(분)
+ROUTE_TRANSFER_PENALTY = float(os.getenv("ROUTE_TRANSFER_PENALTY", "5"))          # 순위 계산 시 환승 1회에 더하는 시간(분)
+
+
+# 업스트림 주소 (부하 테스트 시 bench/fake_upstreams.py 주소로 변경)
+KAKAO_BASE_URL = os.getenv("KAKAO_BASE_URL") or "https://dapi.kakao.com"
+SK_TRANSIT_BASE_URL = os.getenv("SK_TRANSIT_BASE_URL") or "https://apis.openapi.sk.com"
+
+KAKAO_ADDRESS_URL = f"{KAKAO_BASE_URL}/v2/local/search/address.json"
+KAKAO_KEYWORD_URL = f"{KAKAO_BASE_URL}/v2/local/search/keyword.json"
+SK_TRANSIT_URL = f"{SK_TRANSIT_BASE_URL}/transit/routes/"
+
+# 요청 구성/응답 파싱은 동기(apis)와 비동기(apis_async) 호출이 함께 사용
+
+
+def _kakao_headers() -> dict:
+    return {
+        "Authorization": f"KakaoAK {os.getenv('KAKAO_API_KEY')}"
+    }
+
+
+def _geocode_request(address: str) -> dict:
+    return {"url": KAKAO_ADDRESS_URL, "headers": _kakao_headers(), "params": {"query": address}}
+
+
+def _parse_geocode(data: dict):
+    """첫 번째 결과의 [lon, lat], 결과가 없으면 None"""
+    documents = data.get("documents", [])
+    if not documents:
+        return None
 
+    first = documents[0]
+    return [float(first["x"]), float(first["y"])]
+
+
+def _request_geocode(address: str):
+    """카카오 주소 검색 호출. 실패 시 예외, 결과가 없으면 None"""
+    response = upstream_get("kakao", **_geocode_request(address))
+    response.raise_for_status()
+    return _parse_geocode(response.json())
 
 
 def geocode_address(address: str) -> tuple:
@@ -13,37 +89,44 @@ def geocode_address(address: str) -> tuple:
     주소 문자열을 위경도로 변환 (지오코딩)
     반환값: (lon, lat)
     """
-    API_URL = "https://dapi.kakao.com/v2/local/search/address.json"
-    API_KEY = os.getenv("KAKAO_API_KEY")
-
-    headers = {
-        "Authorization": f"KakaoAK {API_KEY}"
-    }
-
-    params = {
-        "query": address
-    }
+    if not address:
+        return None
 
     try:
-        response = requests.get(API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        documents = data.get("documents", [])
-        if not documents:
+        coord = geocode_cache.get_or_load(normalize_query(address), lambda: _request_geocode(address))
+        if coord is None:
             print("주소를 찾을 수 없음")
             return None
-
-        first = documents[0]
-        lon = float(first["x"])
-        lat = float(first["y"])
-        return (lon, lat)
+        return (coord[0], coord[1])
 
     except Exception as e:
         print("실패:", e)
         return None
 
 
+def _keyword_request(keyword: str) -> dict:
+    return {"url": KAKAO_KEYWORD_URL, "headers": _kakao_headers(), "params": {"query": keyword, "size": 1}}
+
+
+def _parse_keyword_search(data: dict) -> list:
+    result = []
+    for doc in data.get("documents", []):
+        result.append({
+            "name": doc.get("place_name"),
+            "address": doc.get("road_address_name") or doc.get("address_name"),
+            "lon": float(doc.get("x")),
+            "lat": float(doc.get("y"))
+        })
+
+    return result
+
+
+def _request_keyword_search(keyword: str) -> list:
+    """카카오 키워드 검색 호출. 실패 시 예외"""
+    response = upstream_get("kakao", **_keyword_request(keyword))
+    response.raise_for_status()
+    return _parse_keyword_search(response.json())
+
 
 def search_address_by_keyword(keyword: str) -> list:
     """
@@ -53,134 +136,182 @@ def search_address_by_keyword(keyword: str) -> list:
     if not keyword:
         return []
 
-    API_URL = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    API_KEY = os.getenv("KAKAO_API_KEY")
-
-    headers = {
-        "Authorization": f"KakaoAK {API_KEY}"
-    }
-
-    params = {
-        "query": keyword,
-        "size": 1
-    }
-
     try:
-        response = requests.get(API_URL, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        result = []
-        for doc in data.get("documents", []):
-            result.append({
-                "name": doc.get("place_name"),
-                "address": doc.get("road_address_name") or doc.get("address_name"),
-                "lon": float(doc.get("x")),
-                "lat": float(doc.get("y"))
-            })
-
-        return result
+        return keyword_cache.get_or_load(normalize_query(keyword), lambda: _request_keyword_search(keyword))
 
     except Exception as e:
         print("주소 검색 오류:", e)
         return []
 
 
-def fetch_bus_directions(dep_coord: tuple, dest_coord: tuple) -> list:
-    def parse_all_itineraries_for_llm(api_response: dict) -> list:
-        """
-        SK 대중교통 API 응답에서 모든 경로(itinerary)를 정제하여 LLM 입력용 리스트로 반환.
-        - 모든 시간 단위는 '분' 단위로 통일
-        - bus_routes: station_list, 좌표 제외, start_nodeid 포함
-        - walk_segments: 출발→정류장, 환승, 정류장→도착지 도보 구간 정보 포함
-        """
-        results = []
-        itineraries = api_response.get("metaData", {}).get("plan", {}).get("itineraries", [])
-
-        for itinerary in itineraries:
-            try:
-                total_time_min = itinerary.get("totalTime", 0) // 60
-                fare = itinerary.get("fare", {}).get("regular", {}).get("totalFare", 0)
-                transfer_count = itinerary.get("transferCount", 0)
-
-                total_walk_time_min = 0
-                bus_routes = []
-                walk_segments = []
-
-                legs = itinerary.get("legs", [])
-                for i, leg in enumerate(legs):
-                    mode = leg.get("mode")
-
-                    if mode == "WALK":
-                        distance = leg.get("distance", 0)
-                        time_min = leg.get("sectionTime", 0) // 60
-                        total_walk_time_min += time_min
-
-                        prev_mode = legs[i - 1]["mode"] if i > 0 else None
-                        next_mode = legs[i + 1]["mode"] if i + 1 < len(legs) else None
-
-                        if prev_mode is None and next_mode == "BUS":
-                            walk_type = "start_to_station"
-                        elif prev_mode == "BUS" and next_mode == "BUS":
-                            walk_type = "transfer"
-                        elif next_mode is None and prev_mode == "BUS":
-                            walk_type = "station_to_dest"
-                        else:
-                            walk_type = "unknown"
-
-                        walk_segments.append({
-                            "type": walk_type,
-                            "distance": distance,
-                            "time": time_min,
-                            "start_name": leg.get("start", {}).get("name"),
-                            "end_name": leg.get("end", {}).get("name")
-                        })
-
-                    elif mode == "BUS":
-                        route_name_full = leg.get("route", "알 수 없음")
-                        route_name = route_name_full.split(":")[-1]  # '간선:710' → '710'
-
-                        station_list = leg.get("passStopList", {}).get("stationList", [])
-                        if not station_list:
-                            continue
-
-                        start_station = station_list[0]
-                        end_station = station_list[-1]
-                        start_lat = float(start_station["lat"])
-                        start_lon = float(start_station["lon"])
-                        nodeid = find_nearest_station_nodeid(start_lat, start_lon)
-
-                        bus_routes.append({
-                            "route_name": route_name,
-                            "start_station": start_station["stationName"],
-                            "end_station": end_station["stationName"],
-                            "start_nodeid": nodeid
-                        })
-
-                if not bus_routes:
-                    continue
-
-                results.append({
-                    "total_time": total_time_min,
-                    # "fare": fare,
-                    "transfer_count": transfer_count,
-                    "total_walk_time": total_walk_time_min,
-                    "bus_routes": bus_routes,
-                    "walk_segments": walk_segments
-                })
-
-            except Exception as e:
-                print(f"❌ itinerary 파싱 실패: {e}")
+def parse_all_itineraries_for_llm(api_response: dict) -> list:
+    """
+    SK 대중교통 API 응답에서 모든 경로(itinerary)를 정제하여 LLM 입력용 리스트로 반환.
+    - 모든 시간 단위는 '분' 단위로 통일
+    - bus_routes: station_list, 좌표 제외, start_nodeid 포함
+    - walk_segments: 출발→정류장, 환승, 정류장→도착지 도보 구간 정보 포함
+    - start_nodeid는 모든 경로의 승차 정류장 좌표를 모아 한 번에 조회
+    """
+    results = []
+    pending_nodeids = []  # (bus_route, lat, lon)
+    itineraries = api_response.get("metaData", {}).get("plan", {}).get("itineraries", [])
+
+    for itinerary in itineraries:
+        try:
+            total_time_min = itinerary.get("totalTime", 0) // 60
+            fare = itinerary.get("fare", {}).get("regular", {}).get("totalFare", 0)
+            transfer_count = itinerary.get("transferCount", 0)
+
+            total_walk_time_min = 0
+            bus_routes = []
+            walk_segments = []
+
+            legs = itinerary.get("legs", [])
+            for i, leg in enumerate(legs):
+                mode = leg.get("mode")
+
+                if mode == "WALK":
+                    distance = leg.get("distance", 0)
+                    time_min = leg.get("sectionTime", 0) // 60
+                    total_walk_time_min += time_min
+
+                    prev_mode = legs[i - 1]["mode"] if i > 0 else None
+                    next_mode = legs[i + 1]["mode"] if i + 1 < len(legs) else None
+
+                    if prev_mode is None and next_mode == "BUS":
+                        walk_type = "start_to_station"
+                    elif prev_mode == "BUS" and next_mode == "BUS":
+                        walk_type = "transfer"
+                    elif next_mode is None and prev_mode == "BUS":
+                        walk_type = "station_to_dest"
+                    else:
+                        walk_type = "unknown"
+
+                    walk_segments.append({
+                        "type": walk_type,
+                        "distance": distance,
+                        "time": time_min,
+                        "start_name": leg.get("start", {}).get("name"),
+                        "end_name": leg.get("end", {}).get("name")
+                    })
+
+                elif mode == "BUS":
+                    route_name_full = leg.get("route", "알 수 없음")
+                    route_name = route_name_full.split(":")[-1]  # '간선:710' → '710'
+
+                    station_list = leg.get("passStopList", {}).get("stationList", [])
+                    if not station_list:
+                        continue
+
+                    start_station = station_list[0]
+                    end_station = station_list[-1]
+                    start_lat = float(start_station["lat"])
+                    start_lon = float(start_station["lon"])
+
+                    bus_route = {
+                        "route_name": route_name,
+                        "start_station": start_station["stationName"],
+                        "end_station": end_station["stationName"],
+                        "start_nodeid": None
+                    }
+                    bus_routes.append(bus_route)
+                    pending_nodeids.append((bus_route, start_lat, start_lon))
+
+            if not bus_routes:
                 continue
 
-        return results
+            results.append({
+                "total_time": total_time_min,
+                # "fare": fare,
+                "transfer_count": transfer_count,
+                "total_walk_time": total_walk_time_min,
+                "bus_routes": bus_routes,
+                "walk_segments": walk_segments
+            })
+
+        except Exception as e:
+            print(f"❌ itinerary 파싱 실패: {e}")
+            continue
+
+    # 승차 정류장 nodeid 일괄 조회 (중복 정류장은 한 번만)
+    if pending_nodeids:
+        try:
+            nodeids = find_nearest_station_nodeids([(lat, lon) for _, lat, lon in pending_nodeids])
+            for (bus_route, _, _), nodeid in zip(pending_nodeids, nodeids):
+                bus_route["start_nodeid"] = nodeid
+        except Exception as e:
+            print(f"❌ 정류장 nodeid 조회 실패: {e}")
+
+    return results
 
+
+def _itinerary_score(itinerary: dict) -> float:
+    """낮을수록 추천 (총 소요 시간 + 도보/환승 가중치)"""
+    return (
+        itinerary.get("total_time", 0)
+        + ROUTE_WALK_WEIGHT * itinerary.get("total_walk_time", 0)
+        + ROUTE_TRANSFER_PENALTY * itinerary.get("transfer_count", 0)
+    )
+
+
+def compact_itineraries(itineraries: list, top_k: int = ROUTE_PROMPT_TOP_K) -> list:
     """
-    출발지-목적지 좌표를 이용한 경로 탐색
-    반환값: 경로 정보 배열(시간, 거리, 경유지 등)
+    parse_all_itineraries_for_llm 결과를 프롬프트용으로 압축
+    - 승차/하차 정류장이 모두 같은 경로는 하나로 묶고 버스 번호를 route_names 배열로 나열
+    - 총 소요 시간 + 도보/환승 가중치 순으로 정렬해 상위 top_k개만 반환 (None이면 전부)
+    - walk_segments는 제외 (도보 시간은 total_walk_time으로 충분)
+    [{"total_time", "total_walk_time", "transfer_count",
+      "bus_routes": [{"route_names": ["105", "511"], "start_station", "end_station", "start_nodeid"}, ...]}, ...]
+    """
+    groups = {}
+    for itinerary in sorted(itineraries or [], key=_itinerary_score):
+        legs = itinerary.get("bus_routes", [])
+        key = tuple((leg.get("start_nodeid") or leg.get("start_station"), leg.get("end_station")) for leg in legs)
+        group = groups.get(key)
+        if group is None:
+            # 가장 추천 순위가 높은 경로의 시간 정보를 대표값으로 사용
+            groups[key] = {
+                "total_time": itinerary.get("total_time"),
+                "total_walk_time": itinerary.get("total_walk_time"),
+                "transfer_count": itinerary.get("transfer_count"),
+                "bus_routes": [
+                    {
+                        "route_names": [leg.get("route_name")],
+                        "start_station": leg.get("start_station"),
+                        "end_station": leg.get("end_station"),
+                        "start_nodeid": leg.get("start_nodeid"),
+                    }
+                    for leg in legs
+                ],
+            }
+            continue
+        for merged, leg in zip(group["bus_routes"], legs):
+            if leg.get("route_name") not in merged["route_names"]:
+                merged["route_names"].append(leg.get("route_name"))
+    return list(groups.values())[:top_k] if top_k else list(groups.values())
+
+
+def itineraries_for_prompt(itineraries: list, top_k: int = ROUTE_PROMPT_TOP_K) -> str:
+    """프롬프트용 압축 JSON (공백 없이, 한글 그대로)"""
+    return json.dumps(compact_itineraries(itineraries, top_k), ensure_ascii=False, separators=(",", ":"))
+
+
+def find_bus_leg(itineraries: list, bus_no: str):
     """
-    url = "https://apis.openapi.sk.com/transit/routes/"
+    경로 목록에서 요청한 번호의 버스를 타는 구간 (추천 순으로 가장 앞선 경로 기준), 없으면 None
+    반환값: {"route_name", "start_station", "end_station", "start_nodeid"}
+    """
+    target = normalize_routeno(bus_no)
+    if not target:
+        return None
+    for itinerary in sorted(itineraries or [], key=_itinerary_score):
+        for leg in itinerary.get("bus_routes", []):
+            if normalize_routeno(leg.get("route_name")) == target and leg.get("start_nodeid"):
+                return leg
+    return None
+
 
+def _directions_request(dep_coord: tuple, dest_coord: tuple) -> dict:
     now = datetime.now()
     search_dttm = now.strftime("%Y%m%d%H%M")  # 현재 시각을 'YYYYMMDDHHMM' 형식으로
 
@@ -200,129 +331,107 @@ def fetch_bus_directions(dep_coord: tuple, dest_coord: tuple) -> list:
         "content-type": "application/json",
         "appKey": os.getenv("SK_OPENAPI_APPKEY")
     }
+    return {"url": SK_TRANSIT_URL, "json": payload, "headers": headers}
 
-    response = requests.post(url, json=payload, headers=headers)
 
-    if response.status_code == 200:
-        try:
-            api_response = response.json()
-            parsed_results = parse_all_itineraries_for_llm(api_response)
-            if not parsed_results:
-                print("❌ 유효한 경로 정보가 없습니다.")
-                return []
-            return parsed_results
-        except Exception as e:
-            print(f"❌ JSON 디코딩 실패: {e}")
+def _request_directions(dep_coord: tuple, dest_coord: tuple) -> list:
+    """SK 대중교통 경로 탐색 호출 후 파싱. 요청/응답 오류 시 예외, 경로가 없으면 빈 리스트"""
+    response = upstream_post("sk_transit", **_directions_request(dep_coord, dest_coord))
+    if response.status_code != 200:
+        raise RuntimeError(f"status code {response.status_code}")
+    return parse_all_itineraries_for_llm(response.json())
+
+
+def _snap(value: float, step_deg: float) -> int:
+    return int(math.floor(value / step_deg + 0.5))
+
+
+def directions_cache_key(dep_coord: tuple, dest_coord: tuple, now: datetime = None) -> str:
+    """
+    경로 캐시 키: 출발/도착 좌표를 DIRECTIONS_GRID_M 격자에 맞춘 값 + 검색 시각 구간
+    좌표는 (lon, lat) 순서
+    """
+    now = now or datetime.now()
+    lat_step = DIRECTIONS_GRID_M / 111320.0
+    parts = []
+    for lon, lat in (dep_coord, dest_coord):
+        lon_step = lat_step / max(math.cos(math.radians(float(lat))), 0.01)
+        parts.append(f"{_snap(float(lat), lat_step)}:{_snap(float(lon), lon_step)}")
+    bucket = (now.hour * 60 + now.minute) // DIRECTIONS_TIME_BUCKET_MIN
+    return f"{'|'.join(parts)}|{now:%Y%m%d}{bucket:03d}"
+
+
+def stale_directions(dep_coord: tuple, dest_coord: tuple, now: datetime = None):
+    """
+    경로 탐색 장애 시 대체할 결과: 같은 출발/도착 격자의 이전 시간 구간 결과 중 가장 최근 것
+    (DIRECTIONS_STALE_IF_ERROR 안에서), 없으면 None
+    """
+    now = now or datetime.now()
+    for k in range(1, DIRECTIONS_STALE_IF_ERROR // (DIRECTIONS_TIME_BUCKET_MIN * 60) + 1):
+        key = directions_cache_key(dep_coord, dest_coord, now - timedelta(minutes=k * DIRECTIONS_TIME_BUCKET_MIN))
+        value = directions_cache.get_stale(key)
+        if value:
+            return value
+    return None
+
+
+def fetch_bus_directions(dep_coord: tuple, dest_coord: tuple) -> list:
+    """
+    출발지-목적지 좌표를 이용한 경로 탐색
+    반환값: 경로 정보 배열(시간, 거리, 경유지 등)
+    - 같은 격자/시간 구간의 결과는 캐시에서 반환 (DIRECTIONS_FRESH_SEC가 지난 결과는 반환 후 백그라운드 갱신)
+    - SK 호출이 실패하면(회로 차단 포함) 이전 시간 구간의 결과로 대체
+    - 캐시된 리스트를 공유하므로 반환값을 직접 수정하지 말 것
+    """
+    try:
+        parsed_results = directions_cache.get_or_refresh(
+            directions_cache_key(dep_coord, dest_coord),
+            lambda: _request_directions(dep_coord, dest_coord),
+            fresh_for=DIRECTIONS_FRESH_SEC,
+        )
+    except Exception as e:
+        print(f"❌ 경로 탐색 요청 실패: {e}")
+        parsed_results = stale_directions(dep_coord, dest_coord)
+        if parsed_results is None:
             return []
-    else:
-        print(f"❌ 요청 실패: status code {response.status_code}")
+
+    if not parsed_results:
+        print("❌ 유효한 경로 정보가 없습니다.")
         return []
 
+    # 경로의 승차 정류장은 곧 조회될 가능성이 높으므로 폴링 대상으로 등록
+    mark_hot(CITY_CODE, {route["start_nodeid"] for itinerary in parsed_results for route in itinerary["bus_routes"]})
+    return parsed_results
+
 
 def fetch_realtime_bus_info(node_id: str, route_id: str) -> list:
     """
     버스 노선 ID 기준 실시간 위치, 도착 정보 조회
-    반환값: 각 도착 예정 버스 정보 리스트
+    반환값: 각 도착 예정 버스 정보 리스트 (도착 순)
            [
              {
                 "routeno": "105",
                 "nodenm": "복대가경시장",
                 "arrprevstationcnt": 12,
-                "arrtime": 798
+                "arrtime": "13분 18초",
+                "data_age": 3
              },
              ...
            ]
     """
-    API_URL = "http://apis.data.go.kr/1613000/ArvlInfoInqireService/getSttnAcctoSpcifyRouteBusArvlPrearngeInfoList"
-
-    params = {
-        'serviceKey': os.getenv("DATA_GO_KEY"), 
-        'pageNo': '1', 
-        'numOfRows': '10', 
-        '_type': 'json', 
-        'cityCode': '33010', 
-        'nodeId': node_id,
-        'routeId': route_id
-    }
-
     try:
-        response = requests.get(API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        header = data.get("response", {}).get("header", {})
-        if header.get("resultCode") != "00":
-            print("❌ API 응답 오류:", header)
-            return []
-
-        item_data = data.get("response", {}).get("body", {}).get("items", {}).get("item", [])
-
-        # 단일 객체인 경우 리스트로 감쌈
-        if isinstance(item_data, dict):
-            item_data = [item_data]
-
-        result = []
-        for item in item_data:
-            seconds = item.get("arrtime", 0)
-            minutes, secs = divmod(seconds, 60)
-
-            result.append({
-                "routeno": str(item.get("routeno")),
-                "nodenm": item.get("nodenm"),
-                "arrprevstationcnt": item.get("arrprevstationcnt"),
-                "arrtime": f"{minutes}분 {secs}초"
-            })
-
-        return result
+        return present_arrivals(get_arrivals(node_id, route_id))
 
     except Exception as e:
         print(f"❌ 실시간 버스 정보 조회 실패: {e}")
         return []
-    
 
 
 def fetch_realtime_node_info(node_id: str) -> list:
-    API_URL = "http://apis.data.go.kr/1613000/ArvlInfoInqireService/getSttnAcctoArvlPrearngeInfoList"
-
-    params = {
-        'serviceKey': os.getenv("DATA_GO_KEY"), 
-        'pageNo': '1', 
-        'numOfRows': '10', 
-        '_type': 'json', 
-        'cityCode': '33010', 
-        'nodeId': node_id
-    }
-
+    """정류장 기준 도착 예정 버스 전체 (형식은 fetch_realtime_bus_info와 같음)"""
     try:
-        response = requests.get(API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        header = data.get("response", {}).get("header", {})
-        if header.get("resultCode") != "00":
-            print("❌ API 응답 오류:", header)
-            return []
-
-        item_data = data.get("response", {}).get("body", {}).get("items", {}).get("item", [])
-
-        # 단일 객체인 경우 리스트로 감쌈
-        if isinstance(item_data, dict):
-            item_data = [item_data]
-
-        result = []
-        for item in item_data:
-            seconds = item.get("arrtime", 0)
-            minutes, secs = divmod(seconds, 60)
-
-            result.append({
-                "routeno": str(item.get("routeno")),
-                "nodenm": item.get("nodenm"),
-                "arrprevstationcnt": item.get("arrprevstationcnt"),
-                "arrtime": f"{minutes}분 {secs}초"
-            })
-
-        return result
+        return present_arrivals(get_arrivals(node_id))
 
     except Exception as e:
         print(f"❌ 실시간 버스 정보 조회 실패: {e}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,123 @@
+import asyncio
+
+from app.services.apis import (
+    DIRECTIONS_FRESH_SEC,
+    keyword_cache, geocode_cache, directions_cache,
+    _geocode_request, _parse_geocode, _keyword_request, _parse_keyword_search,
+    _directions_request, parse_all_itineraries_for_llm, _request_directions, directions_cache_key, stale_directions,
+)
+from app.services.arrival_poller import mark_hot
+from app.services.arrivals import CITY_CODE, get_arrivals_async, present_arrivals
+from app.services.cache import normalize_query
+from app.services.http_client_async import upstream_get_async, upstream_post_async
+
+# apis.py의 비동기 버전
+# - 캐시, 응답 파싱, 반환 형식은 동기 버전과 같음
+# - deadline: 호출별 제한 시간(초). 넘으면 진행 중인 요청을 취소하고 실패와 같이 처리 (None/[] 반환)
+
+
+async def geocode_address(address: str, deadline: float = None) -> tuple:
+    """주소 문자열을 위경도로 변환 (lon, lat)"""
+    if not address:
+        return None
+
+    async def load():
+        response = await upstream_get_async("kakao", deadline=deadline, **_geocode_request(address))
+        response.raise_for_status()
+        return _parse_geocode(response.json())
+
+    try:
+        coord = await geocode_cache.aget_or_load(normalize_query(address), load)
+        if coord is None:
+            print("주소를 찾을 수 없음")
+            return None
+        return (coord[0], coord[1])
+
+    except Exception as e:
+        print("실패:", e)
+        return None
+
+
+async def search_address_by_keyword(keyword: str, deadline: float = None) -> list:
+    """키워드로 주소 후보 목록 검색 [{'name', 'address', 'lon', 'lat'}, ...]"""
+    if not keyword:
+        return []
+
+    async def load():
+        response = await upstream_get_async("kakao", deadline=deadline, **_keyword_request(keyword))
+        response.raise_for_status()
+        return _parse_keyword_search(response.json())
+
+    try:
+        return await keyword_cache.aget_or_load(normalize_query(keyword), load)
+
+    except Exception as e:
+        print("주소 검색 오류:", e)
+        return []
+
+
+async def fetch_bus_directions(dep_coord: tuple, dest_coord: tuple, deadline: float = None) -> list:
+    """출발지-목적지 좌표를 이용한 경로 탐색 (캐시/갱신 규칙은 apis.fetch_bus_directions와 같음)"""
+    async def load():
+        response = await upstream_post_async("sk_transit", deadline=deadline, **_directions_request(dep_coord, dest_coord))
+        if response.status_code != 200:
+            raise RuntimeError(f"status code {response.status_code}")
+        # 승차 정류장 nodeid 조회(인덱스/DB)는 스레드에서
+        return await asyncio.to_thread(parse_all_itineraries_for_llm, response.json())
+
+    try:
+        parsed_results = await directions_cache.aget_or_refresh(
+            directions_cache_key(dep_coord, dest_coord),
+            load,
+            fresh_for=DIRECTIONS_FRESH_SEC,
+            refresh_loader=lambda: _request_directions(dep_coord, dest_coord),
+        )
+    except Exception as e:
+        print(f"❌ 경로 탐색 요청 실패: {e}")
+        parsed_results = await asyncio.to_thread(stale_directions, dep_coord, dest_coord)
+        if parsed_results is None:
+            return []
+
+    if not parsed_results:
+        print("❌ 유효한 경로 정보가 없습니다.")
+        return []
+
+    await asyncio.to_thread(
+        mark_hot, CITY_CODE, {route["start_nodeid"] for itinerary in parsed_results for route in itinerary["bus_routes"]}
+    )
+    return parsed_results
+
+
+async def fetch_realtime_bus_info(node_id: str, route_id: str, deadline: float = None) -> list:
+    try:
+        return present_arrivals(await get_arrivals_async(node_id, route_id, deadline=deadline))
+
+    except Exception as e:
+        print(f"❌ 실시간 버스 정보 조회 실패: {e}")
+        return []
+
+
+async def fetch_realtime_node_info(node_id: str, deadline: float = None) -> list:
+    try:
+        return present_arrivals(await get_arrivals_async(node_id, deadline=deadline))
+
+    except Exception as e:
+        print(f"❌ 실시간 버스 정보 조회 실패: {e}")
+        return []
+
+
+async def gather(*aws, deadline: float = None) -> list:
+    """
+    독립적인 조회를 동시에 실행 (턴 지연 = 가장 긴 호출)
+    deadline초가 지나면 끝나지 않은 조회는 취소하고 그 자리는 None
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"❌ 제한 시간 {deadline}초 초과로 {len(pending)}개 조회 취소")
+        await asyncio.gather(*pending, return_exceptions=True)
+    return [task.result() if task in done and not task.exception() else None for task in tasks]
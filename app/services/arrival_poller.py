@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from app.services.redis_client import redis_client
+from app.services.http_client import track_attempts
+
+# 도착 정보 폴러 설정
+ARRIVAL_POLL_ENABLED = os.getenv("ARRIVAL_POLL_ENABLED", "1") == "1"
+ARRIVAL_DAILY_QUOTA = int(os.getenv("ARRIVAL_DAILY_QUOTA", "10000"))              # 서비스키 일일 호출 한도
+ARRIVAL_POLL_QUOTA_SHARE = float(os.getenv("ARRIVAL_POLL_QUOTA_SHARE", "0.7"))    # 한도 중 폴러가 쓸 수 있는 비율 (나머지는 실시간 호출용)
+ARRIVAL_POLL_MIN_SEC = float(os.getenv("ARRIVAL_POLL_MIN_SEC", "20"))             # 정류장별 최소 폴링 간격(초)
+ARRIVAL_POLL_MAX_SEC = float(os.getenv("ARRIVAL_POLL_MAX_SEC", "120"))            # 정류장별 최대 폴링 간격(초)
+ARRIVAL_HOT_TTL = int(os.getenv("ARRIVAL_HOT_TTL", "600"))                        # 마지막 참조 후 이 시간이 지나면 폴링 중단(초)
+ARRIVAL_POLL_MAX_STOPS = int(os.getenv("ARRIVAL_POLL_MAX_STOPS", "200"))          # 한 번에 폴링하는 최대 정류장 수
+ARRIVAL_SNAPSHOT_MAX_AGE = float(os.getenv("ARRIVAL_SNAPSHOT_MAX_AGE", "90"))     # 이보다 오래된 스냅샷은 쓰지 않음(초)
+ARRIVAL_SNAPSHOT_STALE_SEC = int(os.getenv("ARRIVAL_SNAPSHOT_STALE_SEC", "600"))  # 실시간 호출 실패 시 오래된 스냅샷을 대신 쓸 수 있는 추가 시간(초)
+
+HOT_KEY = "arrivals:hot"
+LOCK_KEY = "arrivals:poller:lock"
+LOCK_TTL = 30
+
+_worker_id = uuid.uuid4().hex
+_poller = None
+_poller_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "leader": False,
+    "cycles": 0,
+    "polls": 0,
+    "poll_errors": 0,
+    "skipped_for_quota": 0,
+    "snapshot_hits": 0,
+    "snapshot_misses": 0,
+    "snapshot_stale": 0,
+    "snapshot_stale_served": 0,
+    "budget_per_min": None,
+}
+_stops_lock = threading.Lock()
+_stops = {}  # "city:node" → 정류장별 폴링 상태 (_stops_lock 안에서만 읽고 씀)
+
+# 락을 가진 워커일 때만 TTL 연장 (GET과 EXPIRE 사이에 다른 워커가 락을 잡는 경우 방지)
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_renew_script = redis_client.register_script(_RENEW_SCRIPT)
+
+
+def _count(key: str, delta: int = 1):
+    with _stats_lock:
+        _stats[key] += delta
+
+
+def get_snapshot_key(city_code: str, node_id: str) -> str:
+    return f"arrivals:snapshot:{city_code}:{node_id}"
+
+
+def get_quota_key(day: datetime = None) -> str:
+    return f"arrivals:quota:{(day or datetime.now()):%Y%m%d}"
+
+
+# ----------------------------------------------------------------------------
+# 요청 처리 쪽: 인기 정류장 등록, 스냅샷 읽기, 호출 수 기록
+
+def mark_hot(city_code: str, node_ids):
+    """정류장을 폴링 대상으로 등록 (참조될 때마다 마지막 참조 시각 갱신)"""
+    now = time.time()
+    members = {f"{city_code}:{node_id}": now for node_id in node_ids if node_id}
+    if not members:
+        return
+    try:
+        redis_client.zadd(HOT_KEY, members)
+    except Exception as e:
+        print(f"❌ 인기 정류장 등록 실패: {e}")
+
+
+def read_snapshot(city_code: str, node_id: str, allow_stale: bool = False):
+    """
+    폴러가 저장한 정류장 도착 정보 {"t": 받아온 시각, "items": [Arrival 배열, ...]}
+    없거나 ARRIVAL_SNAPSHOT_MAX_AGE보다 오래됐으면 None
+    allow_stale: 실시간 호출이 실패했을 때 오래된 스냅샷이라도 반환 (ARRIVAL_SNAPSHOT_STALE_SEC 안에서)
+    """
+    try:
+        raw = redis_client.get(get_snapshot_key(city_code, node_id))
+    except Exception as e:
+        print(f"❌ 도착 정보 스냅샷 조회 실패: {e}")
+        raw = None
+    if raw is None:
+        _count("snapshot_misses")
+        return None
+    snapshot = json.loads(raw)
+    if time.time() - snapshot["t"] > ARRIVAL_SNAPSHOT_MAX_AGE:
+        if allow_stale:
+            _count("snapshot_stale_served")
+            return snapshot
+        _count("snapshot_stale")
+        return None
+    _count("snapshot_hits")
+    return snapshot
+
+
+def count_quota(calls: int = 1):
+    """서비스키 호출 수 기록 (폴러와 실시간 호출 모두, fetch_arrivals에서 페이지마다 기록)"""
+    if calls <= 0:
+        return  # 회로 차단/제한 시간 초과로 보내지 않은 요청
+    try:
+        key = get_quota_key()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incrby(key, calls)
+        pipe.expire(key, 60 * 60 * 48)
+        pipe.execute()
+    except Exception as e:
+        print(f"❌ 호출 수 기록 실패: {e}")
+
+
+def get_quota_used() -> int:
+    try:
+        return int(redis_client.get(get_quota_key()) or 0)
+    except Exception:
+        return 0
+
+
+# ----------------------------------------------------------------------------
+# 폴러
+
+def next_interval(items: list) -> float:
+    """가장 먼저 도착하는 버스가 가까울수록 자주 폴링 (도착까지 남은 시간의 1/4, 최소/최대 간격 안에서)"""
+    arrtimes = [item.arrtime for item in items]
+    if not arrtimes:
+        return ARRIVAL_POLL_MAX_SEC
+    return min(ARRIVAL_POLL_MAX_SEC, max(ARRIVAL_POLL_MIN_SEC, min(arrtimes) / 4))
+
+
+def _budget_per_sec(now: datetime) -> float:
+    """오늘 남은 폴러 몫의 호출 수를 자정까지 남은 시간에 고르게 나눔"""
+    remaining_calls = ARRIVAL_DAILY_QUOTA * ARRIVAL_POLL_QUOTA_SHARE - get_quota_used()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    remaining_sec = max(1.0, (midnight - now).total_seconds())
+    return max(0.0, remaining_calls) / remaining_sec
+
+
+def _acquire_leadership() -> bool:
+    """여러 워커 중 하나만 폴링 (Redis 락, LOCK_TTL마다 갱신)"""
+    try:
+        if redis_client.set(LOCK_KEY, _worker_id, nx=True, ex=LOCK_TTL):
+            return True
+        if _renew_script(keys=[LOCK_KEY], args=[_worker_id, LOCK_TTL]):
+            return True
+    except Exception as e:
+        print(f"❌ 폴러 락 확인 실패: {e}")
+    return False
+
+
+def _hot_stops() -> list:
+    cutoff = time.time() - ARRIVAL_HOT_TTL
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zremrangebyscore(HOT_KEY, "-inf", cutoff)
+    pipe.zrevrange(HOT_KEY, 0, ARRIVAL_POLL_MAX_STOPS - 1)
+    return pipe.execute()[1]
+
+
+def _poll(stop: str, fetch: Callable[[str, str], list]) -> int:
+    """정류장 하나 폴링. 실제로 보낸 요청 수(페이지/재시도 포함) 반환"""
+    city_code, node_id = stop.split(":", 1)
+    with _stops_lock:
+        state = _stops.setdefault(stop, {"polls": 0, "errors": 0, "next_due": 0.0, "interval": None, "items": 0, "last_polled": None})
+    with track_attempts() as attempts:
+        try:
+            items = fetch(city_code, node_id)
+            fetched_at = time.time()
+            interval = next_interval(items)
+            redis_client.set(
+                get_snapshot_key(city_code, node_id),
+                json.dumps({"t": fetched_at, "items": items}, ensure_ascii=False, separators=(",", ":")),
+                ex=int(ARRIVAL_SNAPSHOT_MAX_AGE + interval + ARRIVAL_SNAPSHOT_STALE_SEC),
+            )
+            with _stops_lock:
+                state.update(polls=state["polls"] + 1, interval=interval, items=len(items), last_polled=fetched_at,
+                             next_due=fetched_at + interval)
+            _count("polls")
+        except Exception as e:
+            with _stops_lock:
+                state.update(errors=state["errors"] + 1, next_due=time.time() + ARRIVAL_POLL_MIN_SEC)
+            _count("poll_errors")
+            print(f"❌ 도착 정보 폴링 실패({stop}): {e}")
+    return attempts.count
+
+
+def _run(fetch: Callable[[str, str], list]):
+    tokens = None
+    last = time.monotonic()
+    while True:
+        try:
+            leader = _acquire_leadership()
+            with _stats_lock:
+                _stats["leader"] = leader
+            if not leader:
+                time.sleep(LOCK_TTL / 3)
+                last = time.monotonic()
+                continue
+
+            # 한도 안에서 쓸 수 있는 호출 수 (토큰 버킷, 최대 1분치까지 모아둠)
+            # 폴링마다 실제로 보낸 요청 수(페이지/재시도 포함)만큼 빼므로 음수가 되면 다시 채워질 때까지 쉼
+            budget = _budget_per_sec(datetime.now())
+            elapsed = time.monotonic() - last
+            last = time.monotonic()
+            capacity = max(1.0, budget * 60)
+            tokens = capacity if tokens is None else min(tokens + budget * elapsed, capacity)
+            with _stats_lock:
+                _stats["budget_per_min"] = budget * 60
+                _stats["cycles"] += 1
+
+            hot = set(_hot_stops())
+            now = time.time()
+            with _stops_lock:
+                for stop in list(_stops):
+                    if stop not in hot:
+                        del _stops[stop]
+                next_due = {stop: _stops.get(stop, {}).get("next_due", 0.0) for stop in hot}
+            due = sorted((stop for stop in hot if next_due[stop] <= now), key=next_due.get)
+            for stop in due:
+                if tokens < 1:
+                    _count("skipped_for_quota", len(due) - due.index(stop))
+                    break
+                tokens -= _poll(stop, fetch)
+        except Exception as e:
+            print(f"❌ 도착 정보 폴러 오류: {e}")
+        time.sleep(1.0)
+
+
+def start_poller(fetch: Callable[[str, str], list]):
+    """fetch(city_code, node_id) → Arrival 리스트로 인기 정류장을 폴링하는 백그라운드 스레드 시작"""
+    global _poller
+    if not ARRIVAL_POLL_ENABLED:
+        return
+    with _poller_lock:
+        if _poller is not None:
+            return
+        _poller = threading.Thread(target=_run, args=(fetch,), name="arrival-poller", daemon=True)
+        _poller.start()
+
+
+def get_poller_stats(top: int = 20) -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["quota"] = {
+        "daily": ARRIVAL_DAILY_QUOTA,
+        "used_today": get_quota_used(),
+        "poller_share": ARRIVAL_POLL_QUOTA_SHARE,
+    }
+    with _stops_lock:
+        stops = [(stop, dict(state)) for stop, state in _stops.items()]
+    stops.sort(key=lambda kv: kv[1]["polls"], reverse=True)
+    stats["stops_tracked"] = len(stops)
+    stats["stops"] = dict(stops[:top])
+    return stats
@@ -0,0 +1,256 @@
+import asyncio
+import os
+import time
+from typing import NamedTuple, Optional
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.http_client import upstream_get, track_attempts
+from app.services.http_client_async import upstream_get_async
+from app.services.realtime import RealtimeCache
+from app.services.arrival_poller import mark_hot, read_snapshot, count_quota, start_poller
+
+# data.go.kr 버스 도착 정보 설정
+CITY_CODE = os.getenv("DATA_GO_CITY_CODE", "33010")                               # 도시 코드 (기본값: 청주시)
+ARRIVALS_PAGE_SIZE = int(os.getenv("ARRIVALS_PAGE_SIZE", "100"))                  # 한 번에 받는 항목 수 (numOfRows)
+ARRIVALS_MAX_PAGES = int(os.getenv("ARRIVALS_MAX_PAGES", "5"))
+REALTIME_CACHE_TTL = float(os.getenv("REALTIME_CACHE_TTL", "15"))                 # 같은 정류장/노선 조회를 재사용하는 시간(초)
+
+DATA_GO_BASE_URL = os.getenv("DATA_GO_BASE_URL") or "http://apis.data.go.kr"   # 부하 테스트 시 bench/fake_upstreams.py 주소로 변경
+
+NODE_ARRIVALS_URL = f"{DATA_GO_BASE_URL}/1613000/ArvlInfoInqireService/getSttnAcctoArvlPrearngeInfoList"
+ROUTE_ARRIVALS_URL = f"{DATA_GO_BASE_URL}/1613000/ArvlInfoInqireService/getSttnAcctoSpcifyRouteBusArvlPrearngeInfoList"
+
+arrivals_cache = RealtimeCache("data_go_arrivals", REALTIME_CACHE_TTL)
+
+
+class Arrival(NamedTuple):
+    """
+    도착 예정 버스 한 대
+    JSON으로는 [routeid, routeno, nodenm, arrprevstationcnt, arrtime] 배열로 저장 (캐시/스냅샷 크기 절약)
+    """
+    routeid: Optional[str]
+    routeno: str
+    nodenm: Optional[str]
+    arrprevstationcnt: Optional[int]
+    arrtime: int  # 받아온 시점 기준 남은 시간(초)
+
+
+def to_arrival(row) -> Arrival:
+    """JSON에서 읽은 배열(또는 이전 형식의 dict)을 Arrival로"""
+    if isinstance(row, dict):
+        return Arrival(row.get("routeid"), str(row.get("routeno")), row.get("nodenm"),
+                       row.get("arrprevstationcnt"), int(row.get("arrtime") or 0))
+    return Arrival(*row)
+
+
+# ----------------------------------------------------------------------------
+# 요청 구성 / 응답 파싱 (동기·비동기 공용)
+
+def arrivals_request(node_id: str, route_id: str = None, city_code: str = CITY_CODE, page_no: int = 1) -> dict:
+    params = {
+        'serviceKey': os.getenv("DATA_GO_KEY"),
+        'pageNo': str(page_no),
+        'numOfRows': str(ARRIVALS_PAGE_SIZE),
+        '_type': 'json',
+        'cityCode': city_code,
+        'nodeId': node_id
+    }
+    if route_id:
+        params['routeId'] = route_id
+    return {"url": ROUTE_ARRIVALS_URL if route_id else NODE_ARRIVALS_URL, "params": params}
+
+
+def parse_arrivals_page(data: dict) -> tuple:
+    """
+    응답 한 페이지 파싱 → (Arrival 리스트, 전체 항목 수)
+    - 결과 코드가 정상이 아니면 예외
+    - 결과가 없으면 items가 ""로, 한 건이면 item이 dict로, 여러 건이면 list로 옴
+    """
+    header = data.get("response", {}).get("header", {})
+    if header.get("resultCode") != "00":
+        raise RuntimeError(f"API 응답 오류: {header}")
+
+    body = data.get("response", {}).get("body", {}) or {}
+    items = body.get("items") or {}
+    item_data = items.get("item", []) if isinstance(items, dict) else []
+    if isinstance(item_data, dict):
+        item_data = [item_data]
+
+    arrivals = [
+        Arrival(
+            item.get("routeid"),
+            str(item.get("routeno")),
+            item.get("nodenm"),
+            item.get("arrprevstationcnt"),
+            int(item.get("arrtime", 0) or 0),
+        )
+        for item in item_data
+    ]
+    total = int(body.get("totalCount") or len(arrivals))
+    return arrivals, total
+
+
+def _has_next_page(collected: int, page: list, total: int, page_no: int) -> bool:
+    return bool(page) and collected < total and page_no < ARRIVALS_MAX_PAGES
+
+
+def fetch_arrivals(node_id: str, route_id: str = None, city_code: str = CITY_CODE) -> list:
+    """정류장(+노선) 도착 예정 버스 전체 (페이지를 끝까지 읽음, 도착 순 정렬). 오류 시 예외"""
+    arrivals, page_no = [], 1
+    while True:
+        with track_attempts() as attempts:
+            try:
+                response = upstream_get("data_go", **arrivals_request(node_id, route_id, city_code, page_no))
+            finally:
+                count_quota(attempts.count)  # 재시도 포함
+        response.raise_for_status()
+        page, total = parse_arrivals_page(response.json())
+        arrivals.extend(page)
+        if not _has_next_page(len(arrivals), page, total, page_no):
+            return sorted(arrivals, key=lambda arrival: arrival.arrtime)
+        page_no += 1
+
+
+async def fetch_arrivals_async(node_id: str, route_id: str = None, city_code: str = CITY_CODE, deadline: float = None) -> list:
+    """fetch_arrivals의 비동기 버전"""
+    arrivals, page_no = [], 1
+    while True:
+        with track_attempts() as attempts:
+            try:
+                response = await upstream_get_async("data_go", deadline=deadline, **arrivals_request(node_id, route_id, city_code, page_no))
+            finally:
+                await asyncio.to_thread(count_quota, attempts.count)
+        response.raise_for_status()
+        page, total = parse_arrivals_page(response.json())
+        arrivals.extend(page)
+        if not _has_next_page(len(arrivals), page, total, page_no):
+            return sorted(arrivals, key=lambda arrival: arrival.arrtime)
+        page_no += 1
+
+
+# ----------------------------------------------------------------------------
+# 스냅샷 / 캐시를 거치는 조회
+
+def _snapshot_arrivals(node_id: str, route_id: str = None, city_code: str = CITY_CODE, allow_stale: bool = False):
+    """
+    폴러가 저장한 정류장 스냅샷에서 도착 정보 (노선 지정 시 routeid로 걸러냄), 없으면 None
+    조회한 정류장은 폴링 대상으로 등록(갱신)
+    allow_stale: 실시간 호출 실패 시 대체용으로 오래된 스냅샷도 사용 (source: stale)
+    """
+    if not allow_stale:
+        mark_hot(city_code, [node_id])
+    snapshot = read_snapshot(city_code, node_id, allow_stale=allow_stale)
+    if snapshot is None:
+        return None
+    arrivals = [to_arrival(row) for row in snapshot["items"]]
+    if route_id:
+        arrivals = [arrival for arrival in arrivals if arrival.routeid == route_id]
+    age = max(0.0, time.time() - snapshot["t"])
+    return {"value": arrivals, "fetched_at": snapshot["t"], "age": age, "source": "stale" if allow_stale else "snapshot"}
+
+
+def get_arrivals(node_id: str, route_id: str = None, city_code: str = CITY_CODE) -> dict:
+    """
+    도착 정보 조회 순서
+    1. 폴러가 저장한 정류장 스냅샷
+    2. (cityCode, nodeId[, routeId]) 단위 짧은 캐시 / 동시 요청 합치기
+    3. 실시간 호출
+    4. 실시간 호출이 실패하면(회로 차단 포함) 오래된 스냅샷, 그것도 없으면 예외
+    반환값: {"value": [Arrival, ...], "fetched_at", "age", "source"}
+    """
+    snapshot = _snapshot_arrivals(node_id, route_id, city_code)
+    if snapshot is not None:
+        return snapshot
+
+    try:
+        return arrivals_cache.get(
+            (city_code, node_id, route_id or None),
+            lambda: fetch_arrivals(node_id, route_id, city_code),
+        )
+    except Exception:
+        stale = _snapshot_arrivals(node_id, route_id, city_code, allow_stale=True)
+        if stale is None:
+            raise
+        return stale
+
+
+async def get_arrivals_async(node_id: str, route_id: str = None, city_code: str = CITY_CODE, deadline: float = None) -> dict:
+    """get_arrivals의 비동기 버전"""
+    snapshot = await asyncio.to_thread(_snapshot_arrivals, node_id, route_id, city_code)
+    if snapshot is not None:
+        return snapshot
+
+    try:
+        return await arrivals_cache.aget(
+            (city_code, node_id, route_id or None),
+            lambda: fetch_arrivals_async(node_id, route_id, city_code, deadline),
+        )
+    except Exception:
+        stale = await asyncio.to_thread(_snapshot_arrivals, node_id, route_id, city_code, True)
+        if stale is None:
+            raise
+        return stale
+
+
+def start_arrivals_poller():
+    """인기 정류장 도착 정보 폴링 시작 (앱 시작 시 호출)"""
+    start_poller(lambda city_code, node_id: fetch_arrivals(node_id, city_code=city_code))
+
+
+# ----------------------------------------------------------------------------
+# 표시용 변환 (숫자 초 → 사용자/프롬프트용)
+
+def remaining_seconds(arrival: Arrival, age: float) -> int:
+    """받아온 뒤 지난 시간을 뺀 현재 기준 남은 시간(초)"""
+    return max(0, arrival.arrtime - int(age))
+
+
+def format_arrtime(seconds: int) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}분 {secs}초"
+
+
+def present_arrivals(result: dict) -> list:
+    """
+    get_arrivals 결과를 기존 응답 형식으로 변환
+    [{"routeno", "nodenm", "arrprevstationcnt", "arrtime": "X분 Y초", "data_age": 경과 초}, ...]
+    """
+    age = int(result["age"])
+    return [
+        {
+            "routeno": arrival.routeno,
+            "nodenm": arrival.nodenm,
+            "arrprevstationcnt": arrival.arrprevstationcnt,
+            "arrtime": format_arrtime(remaining_seconds(arrival, age)),
+            "data_age": age,
+        }
+        for arrival in result["value"]
+    ]
+
+
+def normalize_routeno(routeno) -> str:
+    """'간선:105', '105번', '105 번 버스' → '105' (노선 번호 비교용)"""
+    text = str(routeno or "").split(":")[-1]
+    for word in ("버스", "번", " "):
+        text = text.replace(word, "")
+    return text.strip()
+
+
+def next_arrival(result: dict, routeno: str):
+    """
+    get_arrivals 결과에서 해당 노선 번호로 가장 먼저 도착하는 버스 (present_arrivals와 같은 형식), 없으면 None
+    """
+    age = int(result["age"])
+    target = normalize_routeno(routeno)
+    arrivals = [arrival for arrival in result["value"] if normalize_routeno(arrival.routeno) == target]
+    if not arrivals:
+        return None
+    arrival = min(arrivals, key=lambda arrival: arrival.arrtime)
+    return {
+        "routeno": arrival.routeno,
+        "nodenm": arrival.nodenm,
+        "arrprevstationcnt": arrival.arrprevstationcnt,
+        "arrtime": format_arrtime(remaining_seconds(arrival, age)),
+        "data_age": age,
+    }
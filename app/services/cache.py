@@ -0,0 +1,330 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.redis_client import redis_client
+
+# 공백/문장부호 (한글·영문·숫자 이외의 문자). 지번의 '12-3' 같은 숫자 사이 하이픈은 유지
+_FOLD_PATTERN = re.compile(r"(?!(?<=\d)-(?=\d))[\W_]", re.UNICODE)
+
+
+def normalize_query(text: str) -> str:
+    """
+    캐시 키용 검색어 정규화
+    - 유니코드 NFKC 정규화 (자모 분리 입력, 전각 문자 통일), 영문 소문자화
+    - 공백과 문장부호 제거: '청주대 ', '청주 대!' → '청주대'
+    - 숫자 사이 하이픈은 유지: '산남로 12-3' → '산남로12-3'
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).lower()
+    folded = _FOLD_PATTERN.sub("", text)
+    return folded or text.strip()
+
+
+def is_negative(value) -> bool:
+    """검색 결과 없음 (None 또는 빈 목록)"""
+    return value is None or value == [] or value == {}
+
+
+class TTLCache:
+    """
+    프로세스 내 LRU + TTL 캐시 (스레드 안전)
+    - 항목마다 만료 시각을 두고, 꽉 차면 가장 오래 안 쓴 항목부터 제거
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key → (value, stored_at, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_entry(self, key: str):
+        """(value, stored_at) 또는 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, stored_at
+
+    def set(self, key: str, value, ttl: float = None, stored_at: float = None):
+        now = time.time()
+        stored_at = now if stored_at is None else stored_at
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, stored_at, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class TwoTierCache:
+    """
+    프로세스 내 TTLCache → Redis 순으로 조회하는 2단 캐시
+    - Redis 키: cache:{name}:{key}, 값: {"v": 값, "t": 저장 시각} JSON
+    - 결과 없음(None, [])은 negative_ttl 동안만 보관
+    - Redis 장애 시에는 로컬 캐시만으로 동작
+    - get_or_refresh: 오래된 값을 먼저 내주고 백그라운드에서 갱신 (stale-while-revalidate)
+    - stale_if_error: TTL이 지난 값도 Redis에 이만큼 더 남겨 두고, 다시 읽기에 실패하면 대신 반환 (stale-if-error)
+    """
+
+    def __init__(self, name: str, ttl: float, negative_ttl: float, local_size: int = 1024, local_ttl: float = None,
+                 stale_if_error: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_if_error = stale_if_error
+        # 로컬 TTL은 Redis TTL보다 짧게 두어 다른 워커가 갱신한 값을 따라감
+        self.local = TTLCache(local_size, min(ttl, local_ttl) if local_ttl else ttl)
+        self._lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "stores": 0,
+            "negative_stores": 0,
+            "load_errors": 0,
+            "redis_errors": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "stale_on_error": 0,
+        }
+        self._refreshing = set()
+        register_cache(name, self)
+
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def get_entry(self, key: str):
+        """(value, stored_at) 또는 None"""
+        entry = self.local.get_entry(key)
+        if entry is not None:
+            self._count("local_hits")
+        else:
+            try:
+                raw = redis_client.get(self.redis_key(key))
+            except Exception as e:
+                self._count("redis_errors")
+                print(f"❌ 캐시 조회 실패({self.name}): {e}")
+                raw = None
+            data = json.loads(raw) if raw is not None else None
+            if data is None or (self.stale_if_error and time.time() - data["t"] > self.ttl):
+                self._count("misses")
+                return None
+            entry = (data["v"], data["t"])
+            self._count("redis_hits")
+            self.local.set(key, entry[0], stored_at=entry[1], ttl=self._local_ttl(entry[0]))
+
+        if is_negative(entry[0]):
+            self._count("negative_hits")
+        return entry
+
+    def get(self, key: str, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def _local_ttl(self, value) -> float:
+        return min(self.local.ttl, self.negative_ttl) if is_negative(value) else self.local.ttl
+
+    def set(self, key: str, value, ttl: float = None):
+        negative = is_negative(value)
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        stored_at = time.time()
+        self.local.set(key, value, stored_at=stored_at, ttl=min(ttl, self._local_ttl(value)))
+        keep = ttl if negative else ttl + self.stale_if_error
+        try:
+            payload = json.dumps({"v": value, "t": stored_at}, ensure_ascii=False, separators=(",", ":"))
+            redis_client.set(self.redis_key(key), payload, ex=max(1, int(keep)))
+        except Exception as e:
+            self._count("redis_errors")
+            print(f"❌ 캐시 저장 실패({self.name}): {e}")
+        self._count("negative_stores" if negative else "stores")
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        try:
+            redis_client.delete(self.redis_key(key))
+        except Exception as e:
+            self._count("redis_errors")
+            print(f"❌ 캐시 삭제 실패({self.name}): {e}")
+
+    def get_stale(self, key: str):
+        """TTL이 지났지만 stale_if_error 기간 안이라 남아 있는 값 (결과 없음은 제외), 없으면 None"""
+        if not self.stale_if_error:
+            return None
+        try:
+            raw = redis_client.get(self.redis_key(key))
+        except Exception as e:
+            self._count("redis_errors")
+            print(f"❌ 캐시 조회 실패({self.name}): {e}")
+            return None
+        value = json.loads(raw)["v"] if raw is not None else None
+        if is_negative(value):
+            return None
+        self._count("stale_on_error")
+        return value
+
+    def get_or_load(self, key: str, loader):
+        """
+        캐시에 있으면 그대로, 없으면 loader()로 읽어 저장 후 반환
+        loader가 예외를 내면 캐시에 남기지 않음 (일시 장애를 '결과 없음'으로 저장하지 않음)
+        TTL이 지난 값이 남아 있으면 그 값을, 없으면 예외를 그대로 전달
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            return entry[0]
+        try:
+            value = loader()
+        except Exception:
+            self._count("load_errors")
+            stale = self.get_stale(key)
+            if stale is None:
+                raise
+            return stale
+        self.set(key, value)
+        return value
+
+    def get_or_refresh(self, key: str, loader, fresh_for: float):
+        """
+        stale-while-revalidate 조회
+        - 저장된 지 fresh_for초 이내: 그대로 반환
+        - 그보다 오래됐지만 아직 남아 있음(TTL 이내): 오래된 값을 바로 반환하고 백그라운드에서 loader()로 갱신
+        - 없음: loader()로 읽어 저장 후 반환
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return self.get_or_load(key, loader)
+
+        value, stored_at = entry
+        if time.time() - stored_at > fresh_for:
+            self._count("stale_hits")
+            self._schedule_refresh(key, loader)
+        return value
+
+    async def aget_or_load(self, key: str, aloader):
+        """get_or_load의 비동기 버전 (aloader는 코루틴 함수). Redis 조회/저장은 스레드에서 실행"""
+        entry = await asyncio.to_thread(self.get_entry, key)
+        if entry is not None:
+            return entry[0]
+        try:
+            value = await aloader()
+        except Exception:
+            self._count("load_errors")
+            stale = await asyncio.to_thread(self.get_stale, key)
+            if stale is None:
+                raise
+            return stale
+        await asyncio.to_thread(self.set, key, value)
+        return value
+
+    async def aget_or_refresh(self, key: str, aloader, fresh_for: float, refresh_loader):
+        """get_or_refresh의 비동기 버전. 백그라운드 갱신은 동기 refresh_loader()로 실행"""
+        entry = await asyncio.to_thread(self.get_entry, key)
+        if entry is None:
+            return await self.aget_or_load(key, aloader)
+
+        value, stored_at = entry
+        if time.time() - stored_at > fresh_for:
+            self._count("stale_hits")
+            self._schedule_refresh(key, refresh_loader)
+        return value
+
+    def _schedule_refresh(self, key: str, loader):
+        # 같은 키는 프로세스 안에서 한 번만 갱신
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.set(key, loader())
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                print(f"❌ 캐시 갱신 실패({self.name}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _get_refresher().submit(refresh)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["refreshing"] = len(self._refreshing)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["local_hits"] + stats["redis_hits"]) / lookups if lookups else None
+        stats["local"] = self.local.stats()
+        return stats
+
+
+# 이름 → 캐시 (상태 조회용)
+_caches = {}
+
+# 백그라운드 갱신용 스레드풀 (처음 사용할 때 생성)
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _get_refresher() -> ThreadPoolExecutor:
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+    return _refresher
+
+
+def register_cache(name: str, cache):
+    """상태 조회에 포함할 캐시 등록 (stats() 메서드가 있는 객체)"""
+    _caches[name] = cache
+
+
+def get_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -1,23 +1,91 @@
 import pymysql
 import os
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
-# MySQL 연결 설정
-mysql_conn = pymysql.connect(
-    host=os.getenv("DATABASE_HOST"),
-    user=os.getenv("DATABASE_USER"),
-    password=os.getenv("DATABASE_PASSWORD"),
-    database=os.getenv("DATABASE_NAME"),
-    charset="utf8mb4",
-    cursorclass=pymysql.cursors.DictCursor  # dict 형태 반환
-)
+from app.services.station_index import StationIndex, get_station_index, start_refresher
+from app.services.mysql_pool import MySQLPool
+
+# 정류장 인덱스 설정
+STATION_INDEX_CELL_M = float(os.getenv("STATION_INDEX_CELL_M", "300"))             # 격자 크기(m)
+STATION_INDEX_REFRESH_SEC = int(os.getenv("STATION_INDEX_REFRESH_SEC", "3600"))   # MySQL에서 다시 읽는 주기(초)
+
+# MySQL 커넥션 풀 설정
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))                       # 최대 연결 수
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "3.0"))              # 빈 연결을 기다리는 최대 시간(초)
+MYSQL_POOL_PING_AFTER = float(os.getenv("MYSQL_POOL_PING_AFTER", "0"))          # 이 시간(초) 이상 쉰 연결은 꺼낼 때 ping
+MYSQL_CONNECT_TIMEOUT = int(os.getenv("MYSQL_CONNECT_TIMEOUT", "3"))
+MYSQL_READ_TIMEOUT = int(os.getenv("MYSQL_READ_TIMEOUT", "10"))
+
+_mysql_pool = None
+_mysql_pool_lock = threading.Lock()
+
+
+def get_mysql_pool() -> MySQLPool:
+    """MySQL 커넥션 풀 (처음 사용할 때 생성하므로 import 시점에는 DB에 연결하지 않음)"""
+    global _mysql_pool
+    if _mysql_pool is None:
+        with _mysql_pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = MySQLPool(
+                    max_size=MYSQL_POOL_SIZE,
+                    acquire_timeout=MYSQL_POOL_TIMEOUT,
+                    ping_after=MYSQL_POOL_PING_AFTER,
+                    host=os.getenv("DATABASE_HOST"),
+                    user=os.getenv("DATABASE_USER"),
+                    password=os.getenv("DATABASE_PASSWORD"),
+                    database=os.getenv("DATABASE_NAME"),
+                    charset="utf8mb4",
+                    cursorclass=pymysql.cursors.DictCursor,  # dict 형태 반환
+                    autocommit=True,
+                    connect_timeout=MYSQL_CONNECT_TIMEOUT,
+                    read_timeout=MYSQL_READ_TIMEOUT,
+                    write_timeout=MYSQL_READ_TIMEOUT,
+                )
+    return _mysql_pool
+
+
+def load_station_index() -> StationIndex:
+    """STATION 테이블 전체를 읽어 정류장 인덱스 생성"""
+    with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT nodeid, gpslati, gpslong FROM STATION;")
+        rows = cursor.fetchall()
+    return StationIndex(
+        [row["nodeid"] for row in rows],
+        [float(row["gpslati"]) for row in rows],
+        [float(row["gpslong"]) for row in rows],
+        cell_m=STATION_INDEX_CELL_M,
+    )
+
+
+def start_station_index():
+    """정류장 인덱스 로딩 및 주기적 갱신 시작 (앱 시작 시 호출)"""
+    start_refresher(load_station_index, STATION_INDEX_REFRESH_SEC)
+
+
+def find_nearest_stations(lat: float, lon: float, k: int = 1) -> list:
+    """
+    특정 좌표에서 가까운 정류장 k개 [(nodeid, 거리m), ...]
+    인덱스가 아직 준비되지 않았다면 빈 리스트
+    """
+    index = get_station_index()
+    if index is None:
+        return []
+    return index.nearest(lat, lon, k)
+
 
 def find_nearest_station_nodeid(lat: float, lon: float) -> str:
     """
     특정 좌표에 가장 가까운 STATION 테이블의 nodeid 반환
     """
-    with mysql_conn.cursor() as cursor:
+    index = get_station_index()
+    if index is not None:
+        nearest = index.nearest(lat, lon, 1)
+        return nearest[0][0] if nearest else None
+
+    # 인덱스 로딩 전에는 DB에서 직접 조회
+    with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
         query = """
             SELECT nodeid
             FROM STATION
@@ -28,10 +96,88 @@ def find_nearest_station_nodeid(lat: float, lon: float) -> str:
         result = cursor.fetchone()
         return result["nodeid"] if result else None
 
-def get_user_dep_history(user_id: str) -> list:
-    # 데이터베이스 연결 후 사용자 출발지 히스토리 불러와 반환
-    return ["청주 엔포드호텔", "오송역"]
+def find_nearest_station_nodeids(coords: list) -> list:
+    """
+    여러 (lat, lon) 좌표의 가장 가까운 정류장 nodeid를 한 번에 반환 (입력 순서 유지)
+    - 같은 좌표는 한 번만 계산
+    - 인덱스가 있으면 한 번의 벡터 연산, 없으면 한 번의 SQL 질의
+    """
+    unique = list(dict.fromkeys((float(lat), float(lon)) for lat, lon in coords))
+    if not unique:
+        return []
+
+    index = get_station_index()
+    if index is not None:
+        nearest = index.nearest_many([c[0] for c in unique], [c[1] for c in unique])
+        resolved = {coord: nodeid for coord, (nodeid, _) in zip(unique, nearest)}
+    else:
+        # 인덱스 로딩 전에는 좌표별 서브쿼리를 UNION ALL로 묶어 한 번에 조회
+        subquery = """
+            (SELECT %s AS idx, nodeid
+             FROM STATION
+             ORDER BY POW(gpslati - %s, 2) + POW(gpslong - %s, 2)
+             LIMIT 1)
+        """
+        query = " UNION ALL ".join([subquery] * len(unique)) + ";"
+        params = []
+        for i, (lat, lon) in enumerate(unique):
+            params.extend((i, lat, lon))
+        with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        by_idx = {int(row["idx"]): row["nodeid"] for row in rows}
+        resolved = {coord: by_idx.get(i) for i, coord in enumerate(unique)}
+
+    return [resolved[(float(lat), float(lon))] for lat, lon in coords]
+
+# ----------------------------------------------------------------------------
+# 사용자 출발지/목적지 히스토리
+
+PLACE_HISTORY_DDL = """
+    CREATE TABLE IF NOT EXISTS USER_PLACE_HISTORY (
+        user_id VARCHAR(64) NOT NULL,
+        kind ENUM('dep', 'dest') NOT NULL,
+        place VARCHAR(255) NOT NULL,
+        last_used DATETIME NOT NULL,
+        count INT UNSIGNED NOT NULL DEFAULT 1,
+        PRIMARY KEY (user_id, kind, place),
+        KEY idx_user_kind_last_used (user_id, kind, last_used)
+    ) DEFAULT CHARSET=utf8mb4;
+"""
+
+
+def ensure_place_history_table():
+    with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute(PLACE_HISTORY_DDL)
 
-def get_user_dest_history(user_id: str) -> list:
-    # 데이터베이스 연결 후 사용자 목적지 히스토리 불러와 반환
-    return ["청주대", "서원대"]
\ No newline at end of file
+
+def upsert_place_history(rows: list):
+    """
+    히스토리 일괄 기록
+    rows: [(user_id, kind, place, last_used(datetime), count), ...]
+    """
+    if not rows:
+        return
+    query = """
+        INSERT INTO USER_PLACE_HISTORY (user_id, kind, place, last_used, count)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            count = count + VALUES(count),
+            last_used = GREATEST(last_used, VALUES(last_used));
+    """
+    with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.executemany(query, rows)
+
+
+def load_place_history(user_id: str, kind: str, limit: int = 20) -> list:
+    """최근 사용한 순으로 히스토리 반환 [{'place', 'count', 'last_used'}, ...]"""
+    query = """
+        SELECT place, count, last_used
+        FROM USER_PLACE_HISTORY
+        WHERE user_id = %s AND kind = %s
+        ORDER BY last_used DESC
+        LIMIT %s;
+    """
+    with get_mysql_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute(query, (user_id, kind, limit))
+        return cursor.fetchall()
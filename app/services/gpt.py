@@ -1,20 +1,22 @@
-from app.services.redis_session import delete_session, init_session, get_session, update_session
+from app.services.redis_session import get_session, set_slots, append_slot
+from app.services.memory import build_history
+from app.services import apis_async
+from app.services.http_client_async import run_background
+from app.services.llm import get_openai_client, structured_completion, StructuredOutputError
+from app.services.llm_schemas import ClassifyResult
+from app.services.intent import fast_classify, record_fast_path, record_llm_classify
 
-from openai import OpenAI
 import os
-import json
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+PREFETCH_DEADLINE = float(os.getenv("PREFETCH_DEADLINE", "3.0"))  # 출발지/목적지 미리 조회 제한 시간(초)
 
-# ----------------------------------------------------------------------------
-# 대화 기록 test 데이터 삭제할 것
-def classify_state(user_id: str, user_message: str) -> dict:
-    session = get_session(user_id)
-    prompt = f"""
-사용자와의 대화 기록을 기반으로 대화 흐름과 사용자의 의도를 파악한 뒤, 다음 항목들을 판단하여 JSON 형식으로 반환해줘:
+CLASSIFY_PROMPT = """
+너는 대화의 흐름을 이해하고 사용자의 입력에서 출발지와 목적지를 추출해서 JSON 형태로 반환하는 도우미야.
+사용자와의 대화 기록을 기반으로 대화 흐름과 사용자의 의도를 파악한 뒤, 마지막 user 메시지(사용자 메시지)에 대해 다음 항목들을 판단하여 JSON 형식으로 반환해줘:
 
 1. 대화 기록을 포함해 현재 상태를 "set_dep", "set_dest", "main", "error" 중 하나로 분류해줘.
     - "set_dep": 사용자가 출발지를 설정하는 단계
@@ -31,10 +33,8 @@ def classify_state(user_id: str, user_message: str) -> dict:
 
 아래 JSON 형식 외의 **어떠한 설명, 주석, 코드블럭(예: ```)도 포함하지 마.** 반드시 JSON 객체로 시작하고 끝나야 해.
 
-사용자 메시지: "{user_message}"
-
 출력 형식 예시:
-{{
+{
   "state": "set_dest" 또는 "set_dep" 또는 "main" 또는 "error",
   "dep": "출발지명 또는 null",
   "dep_address": "출발지 주소 또는 null",
@@ -43,62 +43,100 @@ def classify_state(user_id: str, user_message: str) -> dict:
   "requires_dep_coord": true 또는 false,
   "requires_dest_coord": true 또는 false,
   "error": true 또는 false
-}}
+}
 """.strip()
-    
-    messages=[{
-        "role": "system", "content": "너는 대화의 흐름을 이해하고 사용자의 입력에서 출발지와 목적지를 추출해서 JSON 형태로 반환하는 도우미야."
-        }] + session.get("message_history", []) + [{"role": "user", "content": prompt}]
-    session["message_history"] = session.get("message_history", []) + [{"role": "user", "content": user_message}]
+
+
+def prefetch_places(updates: dict):
+    """
+    출발지와 목적지가 함께 추출된 경우, 이번 턴의 핸들러가 조회하지 않는 쪽의 검색(또는 좌표 변환)을
+    기다리지 않고 백그라운드에서 실행해 캐시를 채움 (다음 단계에서 캐시로 바로 읽음)
+    이번 턴에 처리할 쪽은 핸들러가 바로 조회하므로 여기서는 조회하지 않음
+    """
+    lookups = []
+    for kind in ("dep", "dest"):
+        if updates.get(f"requires_{kind}_coord") and updates.get(f"{kind}_address"):
+            lookups.append((kind, apis_async.geocode_address, updates[f"{kind}_address"]))
+        elif updates.get(f"requested_{kind}") and updates[f"requested_{kind}"] != "현재 위치":
+            lookups.append((kind, apis_async.search_address_by_keyword, updates[f"requested_{kind}"]))
+    if len(lookups) < 2:
+        return  # 하나뿐이면 핸들러에서 바로 조회
+
+    for kind, lookup, arg in lookups:
+        if updates.get("state") == f"set_{kind}":
+            continue
+        try:
+            run_background(lookup(arg, deadline=PREFETCH_DEADLINE))
+        except Exception as e:
+            print(f"❌ 출발지/목적지 미리 조회 실패: {e}")
+
+# ----------------------------------------------------------------------------
+# 대화 기록 test 데이터 삭제할 것
+def classify_state(user_id: str, user_message: str) -> dict:
+    session = get_session(user_id)
+
+    # "네", "2번", "현재 위치" 같은 짧은 응답은 LLM 없이 분류
+    started = time.perf_counter()
+    result = fast_classify(session, user_message)
+    if result is not None:
+        record_fast_path(result["fast_path"], time.perf_counter() - started)
+        print(f"classify_state... 빠른 분류({result['fast_path']}): {result}")
+        return apply_classification(user_id, session, user_message, result)
+
+    # 고정 지시문(system) 다음에 대화 기록, 마지막에 이번 사용자 메시지 (앞부분이 호출마다 같아야 프롬프트 캐시가 적중)
+    messages = (
+        [{"role": "system", "content": CLASSIFY_PROMPT}]
+        + build_history(user_id, "classify_state")  # 전체 기록 대신 요약 + 최근 메시지만 사용
+        + [{"role": "user", "content": user_message}]
+    )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "너는 대화의 흐름을 이해하고 사용자의 입력에서 출발지와 목적지를 추출해서 JSON 형태로 반환하는 도우미야."}
-            ] + session.get("message_history", []) + [
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.0,
-        )
-
-        content = response.choices[0].message.content
-        print(f"classify_state... GPT 응답: {content}")
-        
         try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
+            result = structured_completion(get_openai_client(), ClassifyResult, "classify_state",
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.0,
+            ).model_dump()
+        except StructuredOutputError:
             print("JSON 파싱 실패")
             result = {"state": "main", "sub_state": "main", "dep": None, "dest": None}
+        record_llm_classify(time.perf_counter() - started)
+        print(f"classify_state... GPT 응답: {result}")
 
-
-        # 결과에 따른 세션 값 업데이트
-        if result.get("dep", False):
-            session["requested_dep"] = result["dep"]
-            session["state"] = "set_dep"
-            session["sub_state"] = "search"
-            if result.get("requires_dep_coord", False):
-                session["dep_address"] = result.get("dep_address", None)
-                session["requires_dep_coord"] = True
-                session["sub_state"] = "coord"
-        if result.get("dest", False):
-            session["requested_dest"] = result["dest"]
-            session["state"] = "set_dest"
-            session["sub_state"] = "search"
-            if result.get("requires_dest_coord", False):
-                session["dest_address"] = result.get("dest_address", None)
-                session["requires_dest_coord"] = True
-                session["sub_state"] = "coord"
-        if result.get("error", False):
-            session["error_flag"] = True
-            session["state"] = "error"
-        session['state'] = result.get("state", session["state"])
-
-        # 레디스 세션 업데이트
-        update_session(user_id, session)
-
-        return result
+        return apply_classification(user_id, session, user_message, result)
 
     except Exception as e:
         print(f"gpt api 호출 중 에러: {e}")
         return {"departure": None, "destination": None}
+
+
+def apply_classification(user_id: str, session: dict, user_message: str, result: dict) -> dict:
+    """분류 결과(LLM 또는 빠른 분류)에 따른 세션 값 업데이트 (변경된 슬롯만 기록)"""
+    updates = {}
+    if result.get("dep", False):
+        updates["requested_dep"] = result["dep"]
+        updates["state"] = "set_dep"
+        updates["sub_state"] = "search"
+        if result.get("requires_dep_coord", False):
+            updates["dep_address"] = result.get("dep_address", None)
+            updates["requires_dep_coord"] = True
+            updates["sub_state"] = "coord"
+    if result.get("dest", False):
+        updates["requested_dest"] = result["dest"]
+        updates["state"] = "set_dest"
+        updates["sub_state"] = "search"
+        if result.get("requires_dest_coord", False):
+            updates["dest_address"] = result.get("dest_address", None)
+            updates["requires_dest_coord"] = True
+            updates["sub_state"] = "coord"
+    if result.get("error", False):
+        updates["error_flag"] = True
+        updates["state"] = "error"
+    updates["state"] = result.get("state", updates.get("state", session["state"]))
+
+    # 레디스 세션 업데이트
+    append_slot(user_id, "message_history", {"role": "user", "content": user_message})
+    set_slots(user_id, updates)
+    prefetch_places(updates)
+
+    return result
@@ -0,0 +1,210 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from app.services.redis_client import redis_client
+from app.services.db import ensure_place_history_table, upsert_place_history, load_place_history
+
+# 히스토리 설정
+HISTORY_LIMIT = int(os.getenv("HISTORY_LIMIT", "3"))                                # /init에서 안내하는 장소 수
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", str(60 * 60 * 24 * 30)))    # Redis 캐시 TTL(초)
+HISTORY_HALF_LIFE_DAYS = float(os.getenv("HISTORY_HALF_LIFE_DAYS", "14"))         # 최근성 가중치 반감기(일)
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "2.0"))         # MySQL 일괄 기록 주기(초)
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "2000"))               # 기록 실패 시 다시 시도할 최대 기록 수
+
+# 캐시에 보관하는 장소 수 (순위 계산용)
+_CACHE_ENTRIES = 20
+
+_jobs = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "recorded": 0,
+    "flushed_rows": 0,
+    "batches": 0,
+    "warmups": 0,
+    "errors": 0,
+    "retried_records": 0,
+    "dropped_records": 0,
+}
+
+
+def _count(key: str, delta: int = 1):
+    with _stats_lock:
+        _stats[key] += delta
+
+
+def get_history_key(user_id: str, kind: str) -> str:
+    return f"history:{user_id}:{kind}"
+
+
+def rank_places(entries: list) -> list:
+    """사용 횟수에 최근성 가중치(반감기)를 곱한 점수 순으로 정렬"""
+    now = time.time()
+
+    def score(entry):
+        age_days = max(0.0, now - entry["last_used"]) / 86400
+        return entry["count"] * 0.5 ** (age_days / HISTORY_HALF_LIFE_DAYS)
+
+    return sorted(entries, key=score, reverse=True)
+
+
+def get_place_history(user_id: str, kind: str) -> list:
+    """
+    자주/최근 이용한 장소명 목록 (Redis 캐시에서만 읽음)
+    캐시가 없으면 빈 목록을 반환하고 MySQL에서 채우는 작업을 백그라운드에 맡김
+    """
+    try:
+        raw = redis_client.get(get_history_key(user_id, kind))
+    except Exception as e:
+        print(f"❌ 히스토리 캐시 조회 실패: {e}")
+        _count("cache_misses")
+        return []
+    if raw is None:
+        _count("cache_misses")
+        _enqueue(("warm", user_id, kind))
+        return []
+    _count("cache_hits")
+    return [entry["place"] for entry in rank_places(json.loads(raw))[:HISTORY_LIMIT]]
+
+
+def get_user_dep_history(user_id: str) -> list:
+    return get_place_history(user_id, "dep")
+
+
+def get_user_dest_history(user_id: str) -> list:
+    return get_place_history(user_id, "dest")
+
+
+def record_place(user_id: str, kind: str, place: str):
+    """확정된 출발지/목적지 기록 (요청 처리 중에는 큐에 넣기만 함)"""
+    if not place:
+        return
+    _count("recorded")
+    _enqueue(("record", user_id, kind, place, time.time()))
+
+
+# ----------------------------------------------------------------------------
+# 백그라운드 기록 스레드
+
+def _enqueue(job: tuple):
+    start_history_writer()
+    _jobs.put(job)
+
+
+def _to_entry(row: dict) -> dict:
+    return {"place": row["place"], "count": int(row["count"]), "last_used": row["last_used"].timestamp()}
+
+
+def _refresh_cache(keys: set):
+    """MySQL에서 다시 읽어 (user_id, kind) 캐시 갱신"""
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id, kind in keys:
+        entries = [_to_entry(row) for row in load_place_history(user_id, kind, _CACHE_ENTRIES)]
+        pipe.set(get_history_key(user_id, kind), json.dumps(entries, ensure_ascii=False), ex=HISTORY_CACHE_TTL)
+    pipe.execute()
+
+
+def _flush(records: list, warmups: set):
+    # 같은 (user_id, kind, place)는 한 행으로 합침
+    merged = {}
+    for user_id, kind, place, used_at in records:
+        key = (user_id, kind, place)
+        count, last_used = merged.get(key, (0, 0.0))
+        merged[key] = (count + 1, max(last_used, used_at))
+
+    rows = [
+        (user_id, kind, place, datetime.fromtimestamp(last_used), count)
+        for (user_id, kind, place), (count, last_used) in merged.items()
+    ]
+    if rows:
+        upsert_place_history(rows)  # 실패하면 호출한 쪽에서 기록을 다시 시도
+        _count("flushed_rows", len(rows))
+        _count("batches")
+
+    touched = {(user_id, kind) for user_id, kind, _ in merged} | warmups
+    _count("warmups", len(warmups))
+    if touched:
+        try:
+            _refresh_cache(touched)
+        except Exception as e:
+            # MySQL에는 이미 기록됐으므로 다시 시도하지 않음 (캐시는 TTL 만료 후 다시 채워짐)
+            _count("errors")
+            print(f"❌ 히스토리 캐시 갱신 실패: {e}")
+
+
+def _run_writer():
+    try:
+        ensure_place_history_table()
+    except Exception as e:
+        _count("errors")
+        print(f"❌ 히스토리 테이블 확인 실패: {e}")
+
+    pending = []  # 기록에 실패해 다음 배치에서 다시 시도할 기록
+    while True:
+        records, warmups = pending, set()
+        pending = []
+        deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+        stop = False
+        while len(records) < HISTORY_BATCH_SIZE:
+            try:
+                job = _jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job[0] == "record":
+                records.append(job[1:])
+            elif job[0] == "warm":
+                warmups.add(job[1:])
+            elif job[0] == "stop":
+                stop = True
+                break
+
+        if records or warmups:
+            try:
+                _flush(records, warmups)
+            except Exception as e:
+                _count("errors")
+                print(f"❌ 히스토리 기록 실패: {e}")
+                pending = records[-HISTORY_MAX_PENDING:] if not stop else []
+                _count("retried_records", len(pending))
+                if len(records) > len(pending):
+                    _count("dropped_records", len(records) - len(pending))
+                    print(f"❌ 히스토리 기록 {len(records) - len(pending)}건 버림")
+                if not stop:
+                    time.sleep(HISTORY_FLUSH_INTERVAL)  # 장애 중 재시도 간격
+        if stop:
+            return
+
+
+def start_history_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name="history-writer", daemon=True)
+            _writer.start()
+
+
+def stop_history_writer(timeout: float = 5.0):
+    """남은 기록을 모두 쓰고 기록 스레드 종료 (앱 종료 시 호출)"""
+    global _writer
+    if _writer is None:
+        return
+    _jobs.put(("stop",))
+    _writer.join(timeout)
+    _writer = None
+
+
+def get_history_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queued"] = _jobs.qsize()
+    return stats
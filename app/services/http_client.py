@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.resilience import get_breaker, bounded_timeout
+
+
+def _env(name: str, key: str, default):
+    """업스트림별 설정을 환경변수로 덮어쓰기 (예: KAKAO_READ_TIMEOUT)"""
+    value = os.getenv(f"{name.upper()}_{key}")
+    return type(default)(value) if value is not None else default
+
+
+# 업스트림별 연결 설정
+# - retries는 멱등한 GET에만 적용 (SK 경로 탐색은 POST라 재시도하지 않음)
+# - hedge: 멱등한 GET이 최근 p95만큼 지나도 응답이 없으면 같은 요청을 한 번 더 보냄
+#   (data.go.kr은 호출 수가 일일 한도에 잡히므로 기본값 끔)
+UPSTREAMS = {
+    "kakao": {
+        "connect_timeout": _env("kakao", "CONNECT_TIMEOUT", 1.0),
+        "read_timeout": _env("kakao", "READ_TIMEOUT", 3.0),
+        "retries": _env("kakao", "RETRIES", 2),
+        "pool_size": _env("kakao", "POOL_SIZE", 20),
+        "hedge": _env("kakao", "HEDGE", 1),
+    },
+    "sk_transit": {
+        "connect_timeout": _env("sk_transit", "CONNECT_TIMEOUT", 1.5),
+        "read_timeout": _env("sk_transit", "READ_TIMEOUT", 8.0),
+        "retries": _env("sk_transit", "RETRIES", 0),
+        "pool_size": _env("sk_transit", "POOL_SIZE", 20),
+        "hedge": _env("sk_transit", "HEDGE", 0),
+    },
+    "data_go": {
+        "connect_timeout": _env("data_go", "CONNECT_TIMEOUT", 1.5),
+        "read_timeout": _env("data_go", "READ_TIMEOUT", 4.0),
+        "retries": _env("data_go", "RETRIES", 2),
+        "pool_size": _env("data_go", "POOL_SIZE", 20),
+        "hedge": _env("data_go", "HEDGE", 0),
+    },
+}
+
+# 최근 지연시간 보관 개수 (p50/p95 계산용)
+_LATENCY_WINDOW = 500
+
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))                     # 최근 응답이 이만큼 쌓이기 전에는 hedge 안 함
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "50"))                 # hedge 전 최소 대기 시간(ms)
+HEDGE_MAX_INFLIGHT = int(os.getenv("HEDGE_MAX_INFLIGHT", "8"))                    # 동시에 보낼 수 있는 hedge 요청 수 (넘으면 hedge 없이 기다림)
+
+
+class UpstreamStats:
+    """업스트림별 요청/오류/지연시간 카운터"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status = {}
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.recent_ms = deque(maxlen=_LATENCY_WINDOW)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, latency_ms: float, status=None, error: bool = False, retries: int = 0):
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            if error:
+                self.errors += 1
+            if status is not None:
+                self.status[status] = self.status.get(status, 0) + 1
+            self.latency_ms_total += latency_ms
+            self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+            self.recent_ms.append(latency_ms)
+
+    def record_hedge(self, won: bool = False):
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+
+    def percentile(self, q: float):
+        with self._lock:
+            recent = sorted(self.recent_ms)
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, int(len(recent) * q))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "status": dict(self.status),
+                "latency_ms_avg": self.latency_ms_total / self.requests if self.requests else None,
+                "latency_ms_max": self.latency_ms_max,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+            }
+        snapshot["latency_ms_p50"] = self.percentile(0.50)
+        snapshot["latency_ms_p95"] = self.percentile(0.95)
+        return snapshot
+
+
+# ----------------------------------------------------------------------------
+# 실제로 보낸 요청 수 (재시도/hedge 포함, 호출 수 한도가 있는 업스트림용)
+
+_attempt_counters = ContextVar("upstream_attempt_counters", default=())
+
+
+class AttemptCounter:
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def track_attempts():
+    """이 블록 안에서 업스트림에 실제로 보낸 요청 수를 셈 (블록이 겹치면 바깥 블록에도 더해짐)"""
+    counter = AttemptCounter()
+    token = _attempt_counters.set(_attempt_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _attempt_counters.reset(token)
+
+
+def add_attempts(count: int = 1):
+    for counter in _attempt_counters.get():
+        counter.count += count
+
+
+def _build_session(config: dict) -> requests.Session:
+    retry = Retry(
+        total=config["retries"],
+        connect=config["retries"],
+        read=config["retries"],
+        status=config["retries"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=0.2,
+        backoff_jitter=0.2,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config["pool_size"], max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# 업스트림별 keep-alive 세션 (커넥션 풀 공유)
+_sessions = {name: _build_session(config) for name, config in UPSTREAMS.items()}
+_stats = {name: UpstreamStats() for name in UPSTREAMS}
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream-hedge")
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_INFLIGHT)  # 진행 중인 hedge 요청 수 제한 (동기/비동기 공용)
+
+
+def hedge_delay(name: str):
+    """hedge 요청을 보내기 전 기다릴 시간(초) = 최근 p95. 표본이 부족하면 None (hedge 안 함)"""
+    stats = _stats[name]
+    if len(stats.recent_ms) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_DELAY_MS, stats.percentile(0.95)) / 1000
+
+
+def _is_failure(status: int) -> bool:
+    """회로 차단기에 실패로 기록할 응답"""
+    return status >= 500 or status == 429
+
+
+def _close_response(future):
+    """사용하지 않는 쪽의 응답을 닫아 커넥션을 풀에 돌려줌"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _hedged_request(name: str, method: str, url: str, delay: float, **kwargs) -> requests.Response:
+    """
+    delay초 안에 응답이 없으면 같은 요청을 한 번 더 보내 먼저 성공한 응답 사용
+    진행 중인 hedge가 HEDGE_MAX_INFLIGHT개면 hedge 없이 첫 요청을 기다림
+    """
+    session = _sessions[name]
+    first = _hedge_pool.submit(session.request, method, url, **kwargs)
+    if wait([first], timeout=delay).done or not _hedge_slots.acquire(blocking=False):
+        return first.result()
+
+    _stats[name].record_hedge()
+    add_attempts()
+    try:
+        second = _hedge_pool.submit(session.request, method, url, **kwargs)
+    except Exception:
+        _hedge_slots.release()
+        raise
+    second.add_done_callback(lambda _: _hedge_slots.release())
+    result, pending, last = None, {first, second}, None
+    while pending and result is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and not _is_failure(future.result().status_code):
+                if future is second:
+                    _stats[name].record_hedge(won=True)
+                result = future
+                break
+            last = future
+    result = result or last  # 둘 다 실패하면 나중 결과(예외면 그대로 발생)
+    for future in (first, second):
+        if future is not result:
+            future.add_done_callback(_close_response)  # 진 쪽은 끝나는 대로 닫음
+    return result.result()
+
+
+def upstream_request(name: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    업스트림 공용 요청 함수
+    - 업스트림별 세션(커넥션 풀/keep-alive)과 연결/응답 타임아웃 적용 (턴 제한 시간 안에서는 남은 시간까지만)
+    - 회로가 열려 있으면 호출하지 않고 CircuitOpenError
+    - hedge 설정된 업스트림의 GET은 최근 p95만큼 기다려도 응답이 없으면 한 번 더 보내 먼저 온 응답 사용
+    - 요청 수, 오류 수, 상태 코드, 지연시간 기록
+    """
+    config = UPSTREAMS[name]
+    connect_timeout = bounded_timeout(config["connect_timeout"])
+    read_timeout = bounded_timeout(config["read_timeout"])
+    kwargs.setdefault("timeout", (connect_timeout, read_timeout))
+    breaker = get_breaker(name)
+    breaker.check()
+    delay = hedge_delay(name) if config["hedge"] and method == "GET" else None
+
+    started = time.perf_counter()
+    try:
+        if delay is None:
+            response = _sessions[name].request(method, url, **kwargs)
+        else:
+            response = _hedged_request(name, method, url, delay, **kwargs)
+    except Exception as e:
+        if isinstance(e, requests.Timeout) and (read_timeout < config["read_timeout"] or connect_timeout < config["connect_timeout"]):
+            breaker.release()  # 턴 남은 시간으로 줄인 타임아웃: 업스트림 상태와 무관
+        else:
+            breaker.record(False)
+        # 실패한 요청은 재시도 기록을 알 수 없어 재시도를 모두 쓴 것으로 셈
+        add_attempts(1 + (config["retries"] if method == "GET" else 0))
+        _stats[name].record((time.perf_counter() - started) * 1000, error=True)
+        raise
+
+    breaker.record(not _is_failure(response.status_code))
+    history = response.raw.retries.history if response.raw is not None and response.raw.retries else ()
+    add_attempts(1 + len(history))
+    _stats[name].record(
+        (time.perf_counter() - started) * 1000,
+        status=response.status_code,
+        error=response.status_code >= 500,
+        retries=len(history),
+    )
+    return response
+
+
+def upstream_get(name: str, url: str, **kwargs) -> requests.Response:
+    return upstream_request(name, "GET", url, **kwargs)
+
+
+def upstream_post(name: str, url: str, **kwargs) -> requests.Response:
+    return upstream_request(name, "POST", url, **kwargs)
+
+
+def record_upstream(name: str, latency_ms: float, status=None, error: bool = False, retries: int = 0):
+    """다른 클라이언트(비동기 등)에서 보낸 요청도 같은 카운터에 기록"""
+    _stats[name].record(latency_ms, status=status, error=error, retries=retries)
+
+
+def record_upstream_hedge(name: str, won: bool = False):
+    _stats[name].record_hedge(won)
+
+
+def get_upstream_stats() -> dict:
+    return {name: stats.snapshot() for name, stats in _stats.items()}
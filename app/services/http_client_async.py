@@ -0,0 +1,206 @@
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+import weakref
+
+import httpx
+
+from app.services.http_client import UPSTREAMS, record_upstream, record_upstream_hedge, hedge_delay, add_attempts, _is_failure, _hedge_slots
+from app.services.resilience import get_breaker, remaining, DeadlineExceeded
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 이벤트 루프별 업스트림 클라이언트 (httpx.AsyncClient는 만든 루프에서만 사용 가능)
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    if name not in clients:
+        config = UPSTREAMS[name]
+        clients[name] = httpx.AsyncClient(
+            timeout=httpx.Timeout(config["read_timeout"], connect=config["connect_timeout"]),
+            limits=httpx.Limits(max_connections=config["pool_size"], max_keepalive_connections=config["pool_size"]),
+        )
+    return clients[name]
+
+
+async def close_async_clients():
+    """현재 루프의 클라이언트 종료 (앱 종료 시 호출)"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def _backoff(attempt: int) -> float:
+    # 동기 클라이언트(urllib3 Retry)와 같은 지수 백오프 + 지터
+    return 0.2 * (2 ** attempt) + random.uniform(0, 0.2)
+
+
+async def _hedged(name: str, send, delay: float) -> httpx.Response:
+    """delay초 안에 응답이 없으면 send()를 한 번 더 실행해 먼저 성공한 응답 사용 (나머지는 취소)"""
+    first = asyncio.ensure_future(send())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not _hedge_slots.acquire(blocking=False):
+            return await first  # 진행 중인 hedge가 HEDGE_MAX_INFLIGHT개면 hedge 없이 기다림
+
+        record_upstream_hedge(name)
+        add_attempts()
+        second = asyncio.ensure_future(send())
+        second.add_done_callback(lambda _: _hedge_slots.release())
+        tasks.append(second)
+        pending, last = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and not _is_failure(task.result().status_code):
+                    if task is second:
+                        record_upstream_hedge(name, won=True)
+                    return task.result()
+                last = task
+        return last.result()  # 둘 다 실패하면 나중 결과(예외면 그대로 발생)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def upstream_request_async(name: str, method: str, url: str, deadline: float = None, **kwargs) -> httpx.Response:
+    """
+    업스트림 공용 비동기 요청
+    - 연결/응답 타임아웃과 GET 재시도(지터 포함)는 동기 클라이언트와 같은 설정 사용
+    - deadline: 재시도를 포함한 전체 제한 시간(초). 넘으면 진행 중인 요청을 취소하고 TimeoutError
+      턴 제한 시간 안에서는 남은 시간을 넘지 않음
+    - 회로가 열려 있으면 호출하지 않고 CircuitOpenError, hedge 설정은 동기 클라이언트와 같음
+    - 호출한 쪽이 취소하면 진행 중인 요청도 함께 취소됨
+    """
+    config = UPSTREAMS[name]
+    retries = config["retries"] if method == "GET" else 0
+    client = get_async_client(name)
+
+    left = remaining()
+    turn_bound = False  # 턴 남은 시간이 제한 시간이 됨
+    if left is not None:
+        if left <= 0:
+            raise DeadlineExceeded("턴 제한 시간을 모두 사용했습니다.")
+        turn_bound = deadline is None or left < deadline
+        deadline = left if turn_bound else deadline
+    breaker = get_breaker(name)
+    breaker.check()
+    hedge = config["hedge"] and method == "GET"
+
+    async def send():
+        delay = hedge_delay(name) if hedge else None
+        if delay is None:
+            return await client.request(method, url, **kwargs)
+        return await _hedged(name, lambda: client.request(method, url, **kwargs), delay)
+
+    async def attempts():
+        for attempt in range(retries + 1):
+            add_attempts()
+            try:
+                response = await send()
+            except httpx.TransportError:
+                if attempt < retries:
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+                raise
+            if response.status_code in _RETRY_STATUS and attempt < retries:
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            return response, attempt
+
+    started = time.perf_counter()
+    status, error, retried = None, True, 0
+    try:
+        if deadline is None:
+            response, retried = await attempts()
+        else:
+            try:
+                async with asyncio.timeout(deadline):
+                    response, retried = await attempts()
+            except TimeoutError:
+                raise TimeoutError(f"{name} 요청이 제한 시간 {deadline}초를 넘었습니다.") from None
+        status, error = response.status_code, response.status_code >= 500
+        breaker.record(not _is_failure(response.status_code))
+        return response
+    except asyncio.CancelledError:
+        breaker.release()  # 호출한 쪽이 취소: 업스트림 상태와 무관
+        raise
+    except Exception as e:
+        if isinstance(e, TimeoutError) and turn_bound:
+            breaker.release()
+        else:
+            breaker.record(False)
+        raise
+    finally:
+        # 예외/취소로 끝난 경우도 오류로 기록
+        record_upstream(name, (time.perf_counter() - started) * 1000, status=status, error=error, retries=retried)
+
+
+async def upstream_get_async(name: str, url: str, deadline: float = None, **kwargs) -> httpx.Response:
+    return await upstream_request_async(name, "GET", url, deadline=deadline, **kwargs)
+
+
+async def upstream_post_async(name: str, url: str, deadline: float = None, **kwargs) -> httpx.Response:
+    return await upstream_request_async(name, "POST", url, deadline=deadline, **kwargs)
+
+
+# ----------------------------------------------------------------------------
+# 동기 코드(스레드풀에서 도는 핸들러)에서 코루틴을 실행하기 위한 전용 이벤트 루프
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="upstream-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    코루틴을 전용 루프에서 실행하고 결과를 기다림
+    timeout초 안에 끝나지 않으면 코루틴을 취소하고 TimeoutError
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"{timeout}초 안에 끝나지 않았습니다.")
+
+
+def run_background(coro) -> concurrent.futures.Future:
+    """코루틴을 전용 루프에 넘기고 기다리지 않음 (실패는 로그만 남김)"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+    def log_failure(f):
+        if not f.cancelled() and f.exception() is not None:
+            print(f"❌ 백그라운드 조회 실패: {f.exception()}")
+
+    future.add_done_callback(log_failure)
+    return future
+
+
+def stop_sync_loop(timeout: float = 5.0):
+    """전용 루프의 클라이언트를 닫고 루프 종료 (앱 종료 시 호출)"""
+    global _loop
+    if _loop is None:
+        return
+    try:
+        run_sync(close_async_clients(), timeout=timeout)
+    except Exception as e:
+        print(f"❌ 업스트림 클라이언트 종료 실패: {e}")
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+from dotenv import load_dotenv
+load_dotenv()
+
+# 빠른 의도 분류 설정
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "1") == "1"   # 0이면 항상 LLM으로 분류
+
+# 짧은 응답 사전 (공백/문장부호를 뺀 형태로 비교)
+YES_WORDS = {
+    "네", "넵", "넹", "예", "응", "웅", "엉", "어", "맞아", "맞아요", "맞습니다", "맞음", "맞네", "맞네요",
+    "그래", "그래요", "좋아", "좋아요", "좋습니다", "오케이", "ok", "okay", "yes", "ㅇㅇ", "ㅇㅋ",
+    "그거", "그거요", "그걸로", "그걸로요", "거기", "거기요", "거기로", "거기로요",
+}
+NO_WORDS = {"아니", "아니요", "아니오", "아뇨", "아니야", "아닌데", "아닙니다", "노", "no", "ㄴㄴ", "틀려", "틀렸어"}
+ORDINAL_WORDS = {"첫": 1, "한": 1, "두": 2, "둘": 2, "세": 3, "셋": 3, "네": 4, "넷": 4, "다섯": 5}
+
+_PUNCT = re.compile(r"[\s.,!?~^ㅎㅋ]+")
+_ORDINAL = re.compile(r"^(?:(\d{1,2})|(" + "|".join(ORDINAL_WORDS) + r")(?=번째|째))(?:번째|번|째)?(?:이요|요|거|걸로|으로|로)?$")
+_CURRENT_LOCATION = re.compile(r"^(?:(?:현재|지금|현|내)위치|여기)(?:에서|서)?(?:출발)?(?:할게|할게요|해줘|해주세요|이요|요)?$")
+_PLACE_SUFFIX = re.compile(r"^(?:이요|요|이에요|에요|으로|로|으로요|로요|으로할게|로할게|으로할게요|로할게요|이|가)?$")
+_BUS_NUMBER = re.compile(
+    r"^(\d{1,4}(?:-\d{1,2})?)번?(?:버스)?(?:는|은)?"
+    r"(?:언제와|언제와요|언제오나요|언제오니|언제도착해|몇분남았어|몇분남았어요|도착정보|정보|알려줘|알려주세요)?$"
+)
+
+# 빠른 분류 통계 (LLM 분류에 걸린 시간으로 절약한 시간을 추정)
+_stats_lock = threading.Lock()
+_stats = {"fast_hits": 0, "fallbacks": 0, "fast_ms": 0.0, "llm_ms": 0.0, "rules": {}}
+
+
+def _compact(text: str) -> str:
+    return _PUNCT.sub("", text or "").lower()
+
+
+def _is_words(compact_tokens: list, words: set) -> bool:
+    return bool(compact_tokens) and all(token in words for token in compact_tokens)
+
+
+def _last_message(history: list, role: str):
+    for message in reversed(history or []):
+        if message.get("role") == role:
+            return message.get("content") or ""
+    return None
+
+
+def _result(state: str, rule: str, **values) -> dict:
+    """LLM 분류(classify_state)와 같은 형식의 결과"""
+    result = {
+        "state": state,
+        "dep": None,
+        "dep_address": None,
+        "dest": None,
+        "dest_address": None,
+        "requires_dep_coord": False,
+        "requires_dest_coord": False,
+        "error": False,
+    }
+    result.update(values)
+    result["fast_path"] = rule
+    return result
+
+
+def _select(kind: str, place: dict, rule: str) -> dict:
+    """검색 결과 중 하나를 선택/확인한 경우 → 좌표 변환 단계로"""
+    return _result(f"set_{kind}", rule, **{
+        kind: place["name"],
+        f"{kind}_address": place["address"],
+        f"requires_{kind}_coord": True,
+    })
+
+
+def _match_place(compact: str, results: list):
+    """발화가 검색 결과 이름(+ 조사/어미)뿐이고 하나에만 해당하면 그 결과 ("청주대교 말고" 등은 제외)"""
+    matches = [
+        place for place in results
+        if place.get("name") and compact.startswith(_compact(place["name"]))
+        and _PLACE_SUFFIX.match(compact[len(_compact(place["name"])):])
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def fast_classify(session: dict, user_message: str):
+    """
+    짧고 뻔한 응답("네", "2번", "현재 위치", 버스 번호만 말한 경우)을 세션 상태와 직전 안내 문구로 바로 분류
+    확신할 수 없으면 None (LLM으로 분류)
+    """
+    if not INTENT_FAST_PATH or not session or not user_message:
+        return None
+
+    history = session.get("message_history", [])
+    # 같은 턴 안에서 다시 분류하는 경우(핸들러가 main으로 되돌아옴)는 LLM이 반복 여부를 판단
+    if _last_message(history, "user") == user_message:
+        return None
+
+    compact = _compact(user_message)
+    tokens = [_compact(token) for token in user_message.split()]
+    tokens = [token for token in tokens if token]
+    if not compact or _is_words(tokens, NO_WORDS) or (tokens and tokens[0] in NO_WORDS):
+        return None  # 부정 응답은 다른 장소를 함께 말하는 경우가 많아 LLM에 맡김
+
+    state = session.get("state")
+    last_prompt = _last_message(history, "assistant") or ""
+
+    # 1. 출발지/목적지 검색 결과에 대한 확인 또는 선택
+    if state in ("set_dest", "set_dep"):
+        kind = state.split("_", 1)[1]
+        results = session.get(f"{kind}_search_results") or []
+        if results and any(place.get("name") and place["name"] in last_prompt for place in results):
+            if len(results) == 1 and _is_words(tokens, YES_WORDS):
+                return _select(kind, results[0], "confirm")
+
+            ordinal = _ORDINAL.match(compact)
+            if ordinal:
+                index = int(ordinal.group(1)) if ordinal.group(1) else ORDINAL_WORDS[ordinal.group(2)]
+                if 1 <= index <= len(results):
+                    return _select(kind, results[index - 1], "ordinal")
+                return None
+
+            place = _match_place(compact, results)
+            if place:
+                return _select(kind, place, "name")
+
+    # 2. 현재 위치에서 출발 ("현재 위치", 또는 "현재 위치에서 출발하시겠어요?"에 대한 긍정)
+    if session.get("dest_coord") and state in ("set_dep", "main"):
+        if _CURRENT_LOCATION.match(compact) or (
+            state == "set_dep" and "현재 위치" in last_prompt and _is_words(tokens, YES_WORDS)
+        ):
+            return _result("set_dep", "current_location", dep="현재 위치")
+
+    # 3. 경로 안내 중 버스 번호만 말한 경우 → 경로 안내 단계 그대로
+    if state == "main" and session.get("dep_coord") and session.get("dest_coord") and _BUS_NUMBER.match(compact):
+        return _result("main", "bus_number")
+
+    return None
+
+
+def record_fast_path(rule: str, elapsed: float):
+    with _stats_lock:
+        _stats["fast_hits"] += 1
+        _stats["fast_ms"] += elapsed * 1000
+        _stats["rules"][rule] = _stats["rules"].get(rule, 0) + 1
+
+
+def record_llm_classify(elapsed: float):
+    with _stats_lock:
+        _stats["fallbacks"] += 1
+        _stats["llm_ms"] += elapsed * 1000
+
+
+def get_intent_stats() -> dict:
+    """빠른 분류 적중률과 절약한 시간 추정치 (LLM 분류 평균 시간 × 적중 수)"""
+    with _stats_lock:
+        stats = dict(_stats, rules=dict(_stats["rules"]))
+    total = stats["fast_hits"] + stats["fallbacks"]
+    avg_llm_ms = stats["llm_ms"] / stats["fallbacks"] if stats["fallbacks"] else None
+    avg_fast_ms = stats["fast_ms"] / stats["fast_hits"] if stats["fast_hits"] else 0.0
+    return {
+        "enabled": INTENT_FAST_PATH,
+        "classifications": total,
+        "fast_hits": stats["fast_hits"],
+        "fallbacks": stats["fallbacks"],
+        "hit_rate": round(stats["fast_hits"] / total, 3) if total else None,
+        "rules": stats["rules"],
+        "avg_fast_ms": round(avg_fast_ms, 3),
+        "avg_llm_ms": round(avg_llm_ms, 1) if avg_llm_ms is not None else None,
+        "saved_ms_estimate": round(stats["fast_hits"] * (avg_llm_ms - avg_fast_ms)) if avg_llm_ms is not None else None,
+    }
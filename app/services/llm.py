@@ -0,0 +1,318 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+import httpx
+import openai
+from pydantic import ValidationError
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.resilience import get_breaker, bounded_timeout, remaining
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))                               # LLM 호출 하나의 최대 대기 시간(초)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3"))                # OpenAI 연결 대기 시간(초)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))                          # 연결 실패/타임아웃/429/5xx 재시도 횟수
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))                             # OpenAI keep-alive 연결 수
+# JSON 스키마(response_format=json_schema)를 지원하는 모델. 나머지 모델은 json_object 모드 + 검증
+STRUCTURED_OUTPUT_MODELS = {m.strip() for m in os.getenv("STRUCTURED_OUTPUT_MODELS", "gpt-4o,gpt-4o-mini").split(",") if m.strip()}
+
+REPAIR_PROMPT = "위 응답을 요구한 형식으로 해석할 수 없어. 오류: {error}\n설명이나 코드블럭 없이 출력 형식에 맞는 JSON 객체만 다시 출력해."
+
+
+class StructuredOutputError(ValueError):
+    """수정 요청까지 했지만 응답이 형식에 맞지 않음"""
+
+
+# ----------------------------------------------------------------------------
+# 공용 클라이언트 (모든 호출 위치가 연결 풀을 함께 씀)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> openai.OpenAI:
+    """
+    프로세스에서 하나만 만드는 OpenAI 클라이언트
+    - keep-alive 연결을 LLM_POOL_SIZE개까지 재사용
+    - 기본 타임아웃 LLM_TIMEOUT(연결은 LLM_CONNECT_TIMEOUT), 재시도 LLM_MAX_RETRIES번 (SDK의 지수 백오프)
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = openai.OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                max_retries=LLM_MAX_RETRIES,
+                http_client=openai.DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+                ),
+            )
+        return _client
+
+
+def close_openai_client():
+    """연결 풀을 닫고 클라이언트를 버림 (이후 호출은 새 클라이언트를 만듦)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+# ----------------------------------------------------------------------------
+# 호출 위치별 통계 (형식 오류/수정 요청, 프롬프트 캐시 적중 토큰)
+
+_stats_lock = threading.Lock()
+_stats = {}  # 호출 위치 → {"calls", "parse_failures", "repairs", "repaired", "failed", "requests", "prompt_tokens", ...}
+
+
+def _site(name: str) -> dict:
+    return _stats.setdefault(name, {
+        "calls": 0, "parse_failures": 0, "repairs": 0, "repaired": 0, "failed": 0,
+        "requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+    })
+
+
+def _count(name: str, key: str):
+    with _stats_lock:
+        _site(name)[key] += 1
+
+
+def _record_usage(name: str, usage):
+    """응답의 토큰 사용량 기록. cached_tokens는 프롬프트 앞부분이 이전 호출과 같아 캐시에서 읽은 토큰"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    with _stats_lock:
+        site = _site(name)
+        site["requests"] += 1
+        site["prompt_tokens"] += usage.prompt_tokens or 0
+        site["cached_tokens"] += getattr(details, "cached_tokens", None) or 0
+        site["completion_tokens"] += usage.completion_tokens or 0
+
+
+# ----------------------------------------------------------------------------
+# 응답 스트리밍 (요청마다 ContextVar로 전달, 스레드풀에서 실행되는 핸들러까지 유지됨)
+
+_message_sink = ContextVar("message_sink", default=None)
+
+_SENTENCE_END = re.compile(r"[.?!…\n]")
+
+
+@contextmanager
+def message_stream(sink):
+    """
+    이 블록 안에서 stream_message=True로 호출한 LLM 응답은 스트리밍으로 받고,
+    JSON의 "message" 값을 문장 단위로 끊어 sink(text)로 바로 넘김
+    """
+    token = _message_sink.set(sink)
+    try:
+        yield
+    finally:
+        _message_sink.reset(token)
+
+
+class MessageFieldStream:
+    """
+    스트리밍으로 들어오는 JSON 텍스트에서 최상위 "message" 문자열 값만 점진적으로 꺼냄
+    feed(delta)는 새로 완성된 문장들을 반환 (문장부호 뒤 공백이 오거나 문자열이 끝나면 한 문장)
+    """
+
+    _KEY = re.compile(r'"message"\s*:\s*(["n])')
+
+    def __init__(self):
+        self.raw = ""
+        self.pos = None      # message 문자열 값에서 다음에 읽을 위치 (None이면 아직 키를 못 찾음)
+        self.done = False
+        self.pending = ""
+
+    def feed(self, delta: str) -> list:
+        self.raw += delta or ""
+        if self.done:
+            return []
+        if self.pos is None:
+            match = self._KEY.search(self.raw)
+            if not match:
+                return []
+            if match.group(1) == "n":  # "message": null
+                self.done = True
+                return []
+            self.pos = match.end()
+
+        sentences = []
+        while self.pos < len(self.raw):
+            ch = self.raw[self.pos]
+            if ch == '"':
+                self.pos += 1
+                self.done = True
+                break
+            if ch == "\\":
+                size = 6 if self.raw[self.pos + 1:self.pos + 2] == "u" else 2
+                if self.pos + size > len(self.raw):
+                    break  # 이스케이프가 다음 조각에서 끝남
+                ch = json.loads(f'"{self.raw[self.pos:self.pos + size]}"')
+                self.pos += size
+            else:
+                self.pos += 1
+            if ch.isspace() and self.pending and _SENTENCE_END.match(self.pending[-1]):
+                sentences.append(self.pending.strip())
+                self.pending = ""
+            self.pending += ch
+
+        if self.done and self.pending.strip():
+            sentences.append(self.pending.strip())
+            self.pending = ""
+        return [sentence for sentence in sentences if sentence]
+
+
+def _stream_completion(client, sink, **kwargs):
+    """스트리밍으로 받으며 message 문장을 sink로 넘기고, 끝나면 일반 응답과 같은 모양의 객체를 반환"""
+    extractor = MessageFieldStream()
+    parts = []
+    usage = None
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    for chunk in stream:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        parts.append(delta)
+        for sentence in extractor.feed(delta):
+            sink(sentence)
+    content = "".join(parts)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content))],
+        usage=usage,
+    )
+
+
+def chat_completion(client, stream_message: bool = False, name: str = None, **kwargs):
+    """
+    OpenAI chat completion 공용 호출
+    - 회로가 열려 있으면 호출하지 않고 CircuitOpenError
+    - 타임아웃은 LLM_TIMEOUT과 턴 남은 시간 중 짧은 쪽. 턴 남은 시간으로 재시도까지 할 수 없으면 재시도하지 않음
+    - 연결 실패/타임아웃/429/5xx만 회로 차단기에 실패로 기록 (잘못된 요청 등 4xx는 업스트림 상태와 무관)
+      단 턴 남은 시간으로 줄인 타임아웃에 걸린 경우는 기록하지 않음
+    - stream_message: 응답의 "message"가 항상 그대로 턴의 최종 응답이 되는 호출만 (결과에 따라 버릴 수 있는 message는
+      스트리밍하면 안 됨). 스트리밍 요청(message_stream) 중이면 스트리밍으로 받아 문장 단위로 먼저 내보냄
+      (반환값은 일반 호출과 같음)
+    - name: 호출 위치 (토큰 사용량 통계용, 없으면 모델 이름)
+    """
+    timeout = bounded_timeout(LLM_TIMEOUT)
+    kwargs.setdefault("timeout", httpx.Timeout(timeout, connect=min(LLM_CONNECT_TIMEOUT, timeout)))
+    left = remaining()
+    if left is not None and left < timeout * (LLM_MAX_RETRIES + 1):
+        client = client.with_options(max_retries=0)
+    sink = _message_sink.get() if stream_message else None
+    breaker = get_breaker("openai")
+    breaker.check()
+    try:
+        if sink is None:
+            response = client.chat.completions.create(**kwargs)
+        else:
+            response = _stream_completion(client, sink, **kwargs)
+    except openai.APITimeoutError:
+        # APIConnectionError의 하위 클래스라 먼저 처리. 턴 남은 시간으로 줄인 타임아웃은 업스트림 상태와 무관
+        if timeout < LLM_TIMEOUT:
+            breaker.release()
+        else:
+            breaker.record(False)
+        raise
+    except (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError):
+        breaker.record(False)
+        raise
+    except Exception:
+        breaker.release()
+        raise
+    breaker.record(True)
+    _record_usage(name or kwargs.get("model"), response.usage)
+    return response
+
+
+# ----------------------------------------------------------------------------
+# 형식이 정해진 응답 (호출 종류별 Pydantic 모델로 검증, 실패 시 한 번만 수정 요청)
+
+def _strict_schema(schema: dict) -> dict:
+    """Pydantic JSON 스키마 → strict 모드용 (모든 필드 required, 추가 필드 금지, default/title 제거)"""
+    if isinstance(schema, dict):
+        schema = {
+            key: {name: _strict_schema(field) for name, field in value.items()} if key in ("properties", "$defs") else _strict_schema(value)
+            for key, value in schema.items() if key not in ("default", "title")
+        }
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["required"] = list(schema["properties"])
+            schema["additionalProperties"] = False
+    elif isinstance(schema, list):
+        schema = [_strict_schema(value) for value in schema]
+    return schema
+
+
+def response_format_for(schema, model: str) -> dict:
+    if model in STRUCTURED_OUTPUT_MODELS:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": _strict_schema(schema.model_json_schema()), "strict": True},
+        }
+    return {"type": "json_object"}
+
+
+def parse_result(schema, content: str):
+    """응답 문자열 → schema 인스턴스. 코드블럭으로 감싼 경우는 벗겨서 읽음. 실패 시 ValueError"""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").strip()
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        return schema.model_validate_json(text)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc'])) or '응답'}: {err['msg']}" for err in e.errors())) from e
+
+
+def structured_completion(client, schema, name: str, stream_message: bool = False, **kwargs):
+    """
+    응답 형식을 schema(llm_schemas의 Pydantic 모델)로 강제하는 chat_completion
+    - 지원 모델은 JSON 스키마(strict), 나머지는 json_object 모드로 요청
+    - 검증에 실패하면 오류 내용을 붙여 한 번만 다시 요청, 그래도 실패하면 StructuredOutputError
+    - name: 호출 위치 (통계용)
+    """
+    kwargs.setdefault("response_format", response_format_for(schema, kwargs.get("model")))
+    _count(name, "calls")
+    response = chat_completion(client, stream_message=stream_message, name=name, **kwargs)
+    content = response.choices[0].message.content
+    try:
+        return parse_result(schema, content)
+    except ValueError as e:
+        _count(name, "parse_failures")
+        print(f"❌ {name} 응답 형식 오류: {e} / 응답: {content}")
+        error = e
+
+    _count(name, "repairs")
+    messages = list(kwargs.pop("messages")) + [
+        {"role": "assistant", "content": content or ""},
+        {"role": "user", "content": REPAIR_PROMPT.format(error=error)},
+    ]
+    response = chat_completion(client, name=name, messages=messages, **kwargs)
+    try:
+        result = parse_result(schema, response.choices[0].message.content)
+    except ValueError as e:
+        _count(name, "failed")
+        raise StructuredOutputError(f"{name} 응답 형식 오류: {e}") from e
+    _count(name, "repaired")
+    return result
+
+
+def get_llm_stats() -> dict:
+    """호출 위치별 형식 오류/수정 요청 통계와 프롬프트 토큰 중 캐시 적중 비율"""
+    with _stats_lock:
+        stats = {name: dict(site) for name, site in _stats.items()}
+    for site in stats.values():
+        site["uncached_tokens"] = site["prompt_tokens"] - site["cached_tokens"]
+        site["cache_hit_rate"] = round(site["cached_tokens"] / site["prompt_tokens"], 3) if site["prompt_tokens"] else None
+    return stats
@@ -0,0 +1,73 @@
+"""
+LLM 호출 종류별 응답 형식 (structured_completion에 넘김)
+- 필드 이름/의미는 각 프롬프트의 '출력 형식'과 같음
+- 문자열 "null", ""은 None으로, 숫자는 문자열로 바꿔 받음 (버스 번호를 105처럼 숫자로 주는 경우)
+- true/false 항목이 null이면 기본값(false), 필수 항목이 null이면 형식 오류
+"""
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationInfo, field_validator
+
+
+class LLMResult(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _normalize(cls, value, info: ValidationInfo):
+        if isinstance(value, str) and value.strip().lower() in ("", "null", "none"):
+            value = None
+        if value is None:
+            field = cls.model_fields[info.field_name]
+            if field.is_required():
+                return None  # 필수 항목은 검증에 실패시켜 수정 요청을 보내도록
+            return field.get_default(call_default_factory=True)
+        if type(value) in (int, float):
+            return str(value)
+        return value
+
+
+class ClassifyResult(LLMResult):
+    """classify_state: 대화 단계 분류 + 출발지/목적지 추출"""
+    state: Literal["set_dep", "set_dest", "main", "error"]
+    dep: Optional[str] = None
+    dep_address: Optional[str] = None
+    dest: Optional[str] = None
+    dest_address: Optional[str] = None
+    requires_dep_coord: bool = False
+    requires_dest_coord: bool = False
+    error: bool = False
+
+
+class SetDestResult(LLMResult):
+    """handle_set_dest: 목적지 선택 대화"""
+    message: str
+    dest: Optional[str] = None
+    dest_address: Optional[str] = None
+
+
+class SetDepResult(LLMResult):
+    """handle_set_dep: 출발지 선택 대화"""
+    message: str
+    dep: Optional[str] = None
+    dep_address: Optional[str] = None
+    use_gps: bool = False
+
+
+class MainResult(LLMResult):
+    """handle_main: 경로 안내 또는 실시간 조회할 버스/정류장 추출"""
+    message: Optional[str] = None
+    routeno: Optional[str] = None
+    nodeid: Optional[str] = None
+
+
+class RequestTypeResult(LLMResult):
+    """processing_message: 요청 종류 분류 + 목적지/버스 번호 추출"""
+    request_type: Optional[Literal["specific_bus_info", "general_bus_info"]] = None
+    dest: Optional[str] = None
+    bus_no: Optional[str] = None
+
+
+class GuideResult(LLMResult):
+    """processing_message: 일반 경로 안내 문장"""
+    message: str
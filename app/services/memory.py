@@ -0,0 +1,186 @@
+from app.services.redis_session import get_session, set_slots
+from app.services.llm import get_openai_client, chat_completion
+from app.services.apis import compact_itineraries
+from app.services.resilience import bounded_timeout, remaining
+
+import os
+import threading
+
+from dotenv import load_dotenv
+load_dotenv()
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _encoding = None
+
+# 프롬프트에 그대로 넣는 최근 메시지 수
+MEMORY_KEEP_MESSAGES = int(os.getenv("MEMORY_KEEP_MESSAGES", "8"))
+# 최근 메시지가 이만큼 더 쌓이면 오래된 메시지를 요약으로 압축
+MEMORY_COMPACT_BATCH = int(os.getenv("MEMORY_COMPACT_BATCH", "6"))
+# 프롬프트에 넣는 대화 기록(요약 + 최근 메시지)의 최대 토큰 수
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+# 요약 호출 하나의 최대 대기 시간(초)
+MEMORY_SUMMARY_TIMEOUT = float(os.getenv("MEMORY_SUMMARY_TIMEOUT", "5"))
+# 턴 남은 시간이 이보다 적으면 압축을 다음 턴으로 미룸(초)
+MEMORY_COMPACT_MIN_BUDGET = float(os.getenv("MEMORY_COMPACT_MIN_BUDGET", "12"))
+
+SUMMARY_SYSTEM_PROMPT = """
+너는 버스 안내 대화를 짧게 요약하는 도우미야.
+다음은 버스 안내 서비스에서 사용자와 assistant가 나눈 대화의 이전 요약과 그 뒤에 이어진 대화야.
+둘을 합쳐 사용자가 원하는 것과 지금까지 결정된 내용을 3문장 이내로 요약해줘. 요약문만 출력해.
+""".strip()
+
+# 호출 위치별 누적 토큰 통계
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def count_tokens(messages: list) -> int:
+    """메시지 목록의 대략적인 프롬프트 토큰 수 (tiktoken이 없으면 바이트 길이로 추정)"""
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if _encoding is not None:
+            total += len(_encoding.encode(content))
+        else:
+            total += len(content.encode("utf-8")) // 3 + 1
+        total += 4  # role 등 메시지 단위 오버헤드
+    return total
+
+
+def _format_facts(session: dict) -> str:
+    """세션에서 확정된 정보(출발지/목적지/최근 경로/요청 버스)를 한 줄씩 정리"""
+    facts = []
+    if session.get("dest_name"):
+        facts.append(f"목적지: {session['dest_name']} ({session.get('dest_address')})")
+    if session.get("dep_name"):
+        facts.append(f"출발지: {session['dep_name']} ({session.get('dep_address')})")
+    elif session.get("dep_coord"):
+        facts.append("출발지: 현재 위치")
+
+    routes = session.get("route") or []
+    if routes:
+        summaries = []
+        for route in compact_itineraries(routes, top_k=3):
+            buses = ", ".join(
+                f"{'/'.join(bus['route_names'])}번({bus['start_station']} 승차)" for bus in route.get("bus_routes", [])
+            )
+            summaries.append(f"{route.get('total_time')}분 소요 {buses}")
+        facts.append("최근 경로: " + " / ".join(summaries))
+
+    buses = session.get("bus") or []
+    if buses:
+        last = buses[-1]
+        facts.append(f"최근 요청 버스: {last.get('routeno')}번 (정류장 {last.get('nodeid')})")
+    return "\n".join(facts)
+
+
+def _summarize(previous_summary: str, evicted: list):
+    """이전 요약과 밀려난 메시지를 합쳐 새 요약 생성. 실패 시 None"""
+    dialogue = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+    prompt = f"""
+이전 요약: {previous_summary or "없음"}
+대화:
+{dialogue}
+""".strip()
+
+    try:
+        response = chat_completion(get_openai_client(), name="memory_summary",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.0,
+            timeout=bounded_timeout(MEMORY_SUMMARY_TIMEOUT),
+        )
+        return response.choices[0].message.content.strip() or None
+    except Exception as e:
+        print(f"❌ 대화 요약 실패: {e}")
+        return None
+
+
+def compact_history(user_id: str, session: dict) -> dict:
+    """
+    최근 메시지가 MEMORY_KEEP_MESSAGES + MEMORY_COMPACT_BATCH 개를 넘으면 오래된 메시지를 요약으로 압축
+    - 턴 남은 시간이 MEMORY_COMPACT_MIN_BUDGET보다 적으면 다음 턴으로 미룸 (프롬프트는 build_history의 토큰 예산으로 제한됨)
+    - 요약에 실패하면 기록을 그대로 둠 (요약에 들어가지 않은 메시지를 버리지 않음)
+    """
+    history = session.get("message_history", [])
+    if len(history) <= MEMORY_KEEP_MESSAGES + MEMORY_COMPACT_BATCH:
+        return session
+    left = remaining()
+    if left is not None and left < MEMORY_COMPACT_MIN_BUDGET:
+        return session
+
+    evicted, recent = history[:-MEMORY_KEEP_MESSAGES], history[-MEMORY_KEEP_MESSAGES:]
+    summary = _summarize(session.get("memory_summary") or "", evicted)
+    stats = dict(session.get("memory_stats") or {})
+    if summary is None:
+        stats["compaction_failures"] = stats.get("compaction_failures", 0) + 1
+        set_slots(user_id, {"memory_stats": stats})
+        session.update(memory_stats=stats)
+        return session
+    stats["evicted_tokens"] = stats.get("evicted_tokens", 0) + count_tokens(evicted)
+    stats["compactions"] = stats.get("compactions", 0) + 1
+
+    set_slots(user_id, {
+        "message_history": recent,
+        "memory_summary": summary,
+        "memory_stats": stats,
+    })
+    session.update(message_history=recent, memory_summary=summary, memory_stats=stats)
+    return session
+
+
+def build_history(user_id: str, call_site: str) -> list:
+    """
+    GPT 프롬프트에 넣을 대화 기록 반환
+    - 이전 대화 요약 + 확정된 정보를 system 메시지 하나로
+    - 최근 메시지는 그대로, 단 MEMORY_TOKEN_BUDGET을 넘으면 오래된 것부터 제외
+    """
+    session = get_session(user_id)
+    if not session:
+        return []
+    session = compact_history(user_id, session)
+
+    memory = []
+    summary = session.get("memory_summary")
+    facts = _format_facts(session)
+    if summary or facts:
+        content = ""
+        if summary:
+            content += f"[이전 대화 요약]\n{summary}\n"
+        if facts:
+            content += f"[확정된 정보]\n{facts}"
+        memory.append({"role": "system", "content": content.strip()})
+
+    recent = list(session.get("message_history", []))
+    budget = MEMORY_TOKEN_BUDGET - count_tokens(memory)
+    while recent and count_tokens(recent) > budget:
+        recent.pop(0)
+
+    result = memory + recent
+
+    # 압축 전(전체 기록을 보냈을 경우)과 후의 토큰 수 기록
+    stats = session.get("memory_stats") or {}
+    tokens_before = stats.get("evicted_tokens", 0) + count_tokens(session.get("message_history", []))
+    tokens_after = count_tokens(result)
+    stats = dict(stats, tokens_before=tokens_before, tokens_after=tokens_after)
+    set_slots(user_id, {"memory_stats": stats})
+
+    with _stats_lock:
+        site = _stats.setdefault(call_site, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        site["calls"] += 1
+        site["tokens_before"] += tokens_before
+        site["tokens_after"] += tokens_after
+
+    return result
+
+
+def get_memory_stats() -> dict:
+    """호출 위치별 누적 토큰 통계 (압축 전/후)"""
+    with _stats_lock:
+        return {site: dict(values) for site, values in _stats.items()}
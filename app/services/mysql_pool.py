@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+
+class MySQLPoolTimeout(Exception):
+    """정해진 시간 안에 풀에서 연결을 받지 못한 경우"""
+
+
+class MySQLPool:
+    """
+    스레드 안전한 MySQL 커넥션 풀
+    - 동시에 열 수 있는 연결은 최대 max_size개, 모두 사용 중이면 acquire_timeout초 동안 대기
+    - 꺼낼 때마다 ping으로 연결 상태를 확인하고 끊겼으면 다시 연결 (wait_timeout 대비)
+    - 사용 중 연결 오류가 나면 그 연결은 버리고 다음 요청에서 새로 연결
+    """
+
+    def __init__(self, max_size: int, acquire_timeout: float, ping_after: float = 0.0, **connect_kwargs):
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.ping_after = ping_after  # 마지막 사용 후 이 시간(초)이 지난 연결만 ping
+        self._connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "open": 0,
+            "in_use": 0,
+            "acquired": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _count(self, key: str, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _connect(self):
+        conn = pymysql.connect(**self._connect_kwargs)
+        with self._lock:
+            self._stats["created"] += 1
+            self._stats["open"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["open"] -= 1
+            self._stats["discarded"] += 1
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self._count("timeouts")
+            raise MySQLPoolTimeout(f"{self.acquire_timeout}초 안에 MySQL 연결을 받지 못했습니다.")
+
+        conn = None
+        try:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn, last_used = self._connect(), time.monotonic()
+
+            # 연결 상태 확인 및 재연결
+            if time.monotonic() - last_used >= self.ping_after:
+                thread_id = conn.thread_id()
+                conn.ping(reconnect=True)
+                if conn.thread_id() != thread_id:
+                    self._count("reconnects")
+        except Exception:
+            if conn is not None:
+                self._discard(conn)  # 재연결에 실패한 연결은 닫고 open 수에서 뺌
+            self._slots.release()
+            raise
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        with self._lock:
+            self._stats["in_use"] -= 1
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_size"] = self.max_size
+        stats["idle"] = self._idle.qsize()
+        stats["utilization"] = stats["in_use"] / self.max_size if self.max_size else 0.0
+        stats["wait_ms_avg"] = stats["wait_ms_total"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
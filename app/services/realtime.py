@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+from app.services.cache import TTLCache, register_cache
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    같은 키의 동시 호출을 하나로 합침
+    - 처음 들어온 호출만 fn()을 실행하고, 그동안 들어온 호출은 그 결과(또는 예외)를 함께 받음
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key → _Call
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """(결과, 다른 호출의 결과를 공유했는지 여부)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.followers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class RealtimeCache:
+    """
+    실시간 정보용 짧은 TTL 캐시 + single-flight
+    - ttl초 안의 같은 키 요청은 캐시에서, 동시에 들어온 캐시 미스는 업스트림 호출 한 번으로 처리
+    - 반환값에 데이터를 받아온 시각(fetched_at)과 경과 시간(age)을 함께 돌려줌
+    - 실패는 캐시하지 않음
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 4096):
+        self.name = name
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, ttl)
+        self.flight = SingleFlight()
+        self._tasks = {}  # (루프, key) → 진행 중인 비동기 조회 (_lock 안에서만 읽고 씀)
+        self._lock = threading.Lock()
+        self._stats = {
+            "cache_hits": 0,
+            "shared": 0,
+            "fetches": 0,
+            "errors": 0,
+            "age_sec_total": 0.0,
+            "served": 0,
+        }
+        register_cache(name, self)
+
+    def _count(self, key: str, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def get(self, key, loader) -> dict:
+        """
+        반환값: {"value": 값, "fetched_at": 받아온 시각(epoch), "age": 경과 시간(초), "source": cache|shared|live}
+        loader가 예외를 내면 그대로 전달
+        """
+        entry = self.local.get_entry(key)
+        if entry is not None:
+            value, fetched_at = entry
+            source = "cache"
+            self._count("cache_hits")
+        else:
+            def fetch():
+                self._count("fetches")
+                try:
+                    value = loader()
+                except Exception:
+                    self._count("errors")
+                    raise
+                fetched_at = time.time()
+                self.local.set(key, value, stored_at=fetched_at)
+                return value, fetched_at
+
+            (value, fetched_at), shared = self.flight.do(key, fetch)
+            source = "shared" if shared else "live"
+            if shared:
+                self._count("shared")
+
+        age = max(0.0, time.time() - fetched_at)
+        with self._lock:
+            self._stats["served"] += 1
+            self._stats["age_sec_total"] += age
+        return {"value": value, "fetched_at": fetched_at, "age": age, "source": source}
+
+    async def aget(self, key, aloader) -> dict:
+        """get의 비동기 버전 (aloader는 코루틴 함수). 같은 루프 안의 동시 조회를 하나로 합침"""
+        entry = self.local.get_entry(key)
+        if entry is not None:
+            value, fetched_at = entry
+            source = "cache"
+            self._count("cache_hits")
+        else:
+            task_key = (id(asyncio.get_running_loop()), key)
+
+            async def fetch():
+                self._count("fetches")
+                try:
+                    value = await aloader()
+                    fetched_at = time.time()
+                    self.local.set(key, value, stored_at=fetched_at)
+                    return value, fetched_at
+                except Exception:
+                    self._count("errors")
+                    raise
+                finally:
+                    with self._lock:
+                        if self._tasks.get(task_key) is task:
+                            del self._tasks[task_key]
+
+            # _tasks는 여러 루프(스레드)가 함께 쓰므로 조회와 등록을 락 안에서 한 번에
+            with self._lock:
+                task = self._tasks.get(task_key)
+                shared = task is not None
+                if shared:
+                    self._stats["shared"] += 1
+                else:
+                    task = self._tasks[task_key] = asyncio.ensure_future(fetch())
+            # 한 호출자가 취소돼도 함께 기다리는 다른 호출자의 조회는 계속되도록 shield
+            value, fetched_at = await asyncio.shield(task)
+            source = "shared" if shared else "live"
+
+        age = max(0.0, time.time() - fetched_at)
+        with self._lock:
+            self._stats["served"] += 1
+            self._stats["age_sec_total"] += age
+        return {"value": value, "fetched_at": fetched_at, "age": age, "source": source}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["ttl"] = self.ttl
+        stats["in_flight"] = self.flight.in_flight()
+        stats["age_sec_avg"] = stats.pop("age_sec_total") / stats["served"] if stats["served"] else None
+        stats["local"] = self.local.stats()
+        return stats
@@ -0,0 +1,66 @@
+import os
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+load_dotenv()
+
+# Redis 접속 설정 (.env)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+
+# 커넥션 풀 설정
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "50"))                    # 최대 연결 수
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "2.0"))           # 빈 연결을 기다리는 최대 시간(초)
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2.0"))       # 명령 응답 대기 시간(초)
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1.0"))     # 연결 수립 대기 시간(초)
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+
+def _connection_kwargs() -> dict:
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "decode_responses": True,
+    }
+
+
+# 동기 클라이언트 (기존 핸들러용). 연결이 모두 사용 중이면 REDIS_POOL_TIMEOUT 동안 대기
+redis_pool = redis.BlockingConnectionPool(
+    max_connections=REDIS_POOL_SIZE,
+    timeout=REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(),
+)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+
+# 비동기 클라이언트. 이벤트 루프에 묶이므로 처음 사용할 때 생성
+_async_client: Optional[aioredis.Redis] = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    global _async_client
+    if _async_client is None:
+        pool = aioredis.BlockingConnectionPool(
+            max_connections=REDIS_POOL_SIZE,
+            timeout=REDIS_POOL_TIMEOUT,
+            **_connection_kwargs(),
+        )
+        _async_client = aioredis.Redis(connection_pool=pool)
+    return _async_client
+
+
+async def close_async_redis():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
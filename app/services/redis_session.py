@@ -1,104 +1,468 @@
 import redis
 import json
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional, Any
 
-# Redis 클라이언트 초기화
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
-    db=0,
-    decode_responses=True
+# Redis 클라이언트 (접속/풀 설정은 redis_client.py)
+from app.services.redis_client import redis_client
+from app.services.session_codec import (
+    SessionSlots,
+    encode_value,
+    decode_value,
+    encode_field,
+    encode_fields,
+    decode_fields,
+    decode_session,
 )
 
 # TTL 설정
 SESSION_TTL = 60 * 60 * 24 * 7
 
+# 리스트로 저장하는 슬롯 (RPUSH로 추가, 나머지 슬롯은 해시 필드)
+LIST_SLOTS = (
+    "message_history",
+    "history_main_step",
+    "history_set_dest_step",
+    "history_set_dep_step",
+)
+
+# RPUSH 한 번에 보내는 최대 항목 수 (Lua unpack 제한)
+_PUSH_CHUNK = 500
+
+
+class SessionConflictError(Exception):
+    """같은 사용자의 다른 요청이 먼저 세션을 변경해 이번 턴의 변경을 기록할 수 없는 경우"""
+
+
 # 세션 키 생성 함수
 def get_session_key(session_id: str) -> str:
     return f"session:{session_id}"
 
 
+# 리스트 슬롯 키 생성 함수
+def get_list_key(session_id: str, key: str) -> str:
+    return f"session:{session_id}:{key}"
+
+
+# 세션 버전 키 (세션 삭제 시에도 유지되어 버전이 되돌아가지 않음)
+def get_version_key(session_id: str) -> str:
+    return f"session:{session_id}:version"
+
+
+def _all_keys(session_id: str) -> list:
+    return [get_session_key(session_id)] + [get_list_key(session_id, k) for k in LIST_SLOTS]
+
+
+def _touch(pipe, session_id: str):
+    """세션 버전을 올리고 세션을 구성하는 모든 키의 TTL 갱신"""
+    pipe.incr(get_version_key(session_id))
+    for key in _all_keys(session_id) + [get_version_key(session_id)]:
+        pipe.expire(key, SESSION_TTL)
+
+
+# 값 인코딩은 session_codec.py (스키마 버전 접두어 + ensure_ascii=False JSON)
+_encode = encode_value
+_decode = decode_value
+
+
+def _decode_session(raw_scalars: dict, raw_lists: list) -> Optional[dict]:
+    if not raw_scalars:
+        return None
+    session = decode_fields(raw_scalars)
+    for key, items in zip(LIST_SLOTS, raw_lists):
+        session[key] = [_decode(item) for item in items]
+    return session
+
+
+def _queue_read(pipe, session_id: str):
+    """세션 해시와 리스트 슬롯을 읽는 명령을 파이프라인에 추가"""
+    pipe.hgetall(get_session_key(session_id))
+    for key in LIST_SLOTS:
+        pipe.lrange(get_list_key(session_id, key), 0, -1)
+
+
+def _write_session(pipe, session_id: str, session_data: dict):
+    """세션 전체를 해시 + 리스트 구조로 기록 (파이프라인에 명령만 추가)"""
+    pipe.delete(*_all_keys(session_id))
+    scalars = encode_fields({k: v for k, v in session_data.items() if k not in LIST_SLOTS})
+    if scalars:
+        pipe.hset(get_session_key(session_id), mapping=scalars)
+    for key in LIST_SLOTS:
+        items = session_data.get(key) or []
+        if items:
+            pipe.rpush(get_list_key(session_id, key), *[_encode(item) for item in items])
+    _touch(pipe, session_id)
+
+
+def _default_slots() -> dict:
+    return SessionSlots().to_dict()
+
+
+def _hash_fields(keys: list) -> list:
+    """삭제할 해시 필드 목록 (새 필드 id와 이전 형식의 슬롯 이름 모두)"""
+    fields = []
+    for key in keys:
+        fields.append(encode_field(key))
+        if encode_field(key) != key:
+            fields.append(key)
+    return fields
+
+
+# ----------------------------------------------------------------------------
+# 요청 단위 세션 (unit of work)
+#
+# session_scope() 안에서는 아래 세션 함수들이 Redis 대신 메모리의 세션을 읽고 쓰며,
+# 변경된 슬롯만 턴이 끝날 때 한 번에 기록한다.
+# 기록은 Lua 스크립트 하나로 버전을 비교한 뒤 적용하므로(낙관적 동시성 제어)
+# 같은 user_id의 다른 턴이 먼저 세션을 바꿨다면 덮어쓰지 않고 SessionConflictError를 낸다.
+
+_FLUSH_SCRIPT = """
+-- KEYS[1]: 버전 키, KEYS[2]: 세션 해시, KEYS[3..]: 리스트 슬롯 키
+-- ARGV[1]: 읽을 때의 버전, ARGV[2]: TTL, ARGV[3]: 변경 내용(JSON)
+-- 세션 전체를 다시 쓰는 경우(reset)도 버전을 비교함. 버전 키가 없으면 0
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local ops = cjson.decode(ARGV[3])
+if current ~= tonumber(ARGV[1]) then
+    return -1
+end
+if ops.reset then
+    for i = 2, #KEYS do
+        redis.call('DEL', KEYS[i])
+    end
+end
+for _, field in ipairs(ops.hdel) do
+    redis.call('HDEL', KEYS[2], field)
+end
+for _, pair in ipairs(ops.hset) do
+    redis.call('HSET', KEYS[2], pair[1], pair[2])
+end
+for _, list in ipairs(ops.lists) do
+    local key = KEYS[list[1]]
+    if list[2] then
+        redis.call('DEL', key)
+    end
+    local items = list[3]
+    for i = 1, #items, %(chunk)d do
+        redis.call('RPUSH', key, unpack(items, i, math.min(i + %(chunk)d - 1, #items)))
+    end
+end
+local version = redis.call('INCR', KEYS[1])
+for i = 1, #KEYS do
+    redis.call('EXPIRE', KEYS[i], ARGV[2])
+end
+return version
+""" % {"chunk": _PUSH_CHUNK}
+
+_flush_script = redis_client.register_script(_FLUSH_SCRIPT)
+
+current_context: ContextVar = ContextVar("session_context", default=None)
+
+
+class SessionContext:
+    """한 턴 동안 사용하는 메모리 세션. 처음 접근할 때 한 번 읽고 flush()에서 한 번 기록한다."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.loaded = False
+        self.data: Optional[dict] = None
+        self.version = 0
+        self.reset = False          # 세션 전체 삭제/재작성
+        self.dirty = set()          # 변경된 스칼라 슬롯
+        self.removed = set()        # 삭제된 슬롯
+        self.replaced = set()       # 전체가 교체된 리스트 슬롯
+        self.appended = {}          # 리스트 슬롯별 추가 항목
+
+    # --- 읽기 ---------------------------------------------------------------
+    def queue_load(self, pipe):
+        pipe.get(get_version_key(self.session_id))
+        _queue_read(pipe, self.session_id)
+
+    def apply_load(self, results: list):
+        raw_version, raw_scalars, *raw_lists = results
+        self.version = int(raw_version or 0)
+        self.data = _decode_session(raw_scalars, raw_lists)
+        self.loaded = True
+
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        for attempt in range(2):
+            pipe = redis_client.pipeline(transaction=False)
+            self.queue_load(pipe)
+            try:
+                results = pipe.execute()
+                break
+            except redis.ResponseError:
+                if attempt:
+                    raise  # 변환 후에도 실패하면 WRONGTYPE이 아닌 오류
+                # WRONGTYPE: 이전 형식(문자열)의 세션을 변환한 뒤 한 번만 다시 읽음
+                _migrate_legacy_session(self.session_id)
+        self.apply_load(results)
+
+    def get_session(self) -> Optional[dict]:
+        self._ensure_loaded()
+        if self.data is None:
+            return None
+        # 핸들러가 반환값을 수정해도 메모리 세션이 바뀌지 않도록 리스트는 복사
+        return {k: list(v) if isinstance(v, list) else v for k, v in self.data.items()}
+
+    def get_slot(self, key: str, default: Any = None) -> Any:
+        self._ensure_loaded()
+        if key in LIST_SLOTS:
+            return list((self.data or {}).get(key, []))
+        if self.data is None or key not in self.data:
+            return default
+        return self.data[key]
+
+    # --- 쓰기 ---------------------------------------------------------------
+    def replace(self, session_data: Optional[dict]):
+        """세션 전체 교체 (None이면 삭제). 기록할 때 버전을 비교하도록 읽지 않은 세션은 먼저 읽음"""
+        self._ensure_loaded()
+        self.reset = True
+        self.dirty.clear()
+        self.removed.clear()
+        self.replaced.clear()
+        self.appended.clear()
+        if session_data is None:
+            self.data = None
+            return
+        self.data = {}
+        self.set_slots(session_data)
+
+    def set_slots(self, values: dict):
+        self._ensure_loaded()
+        if self.data is None:
+            self.data = {}
+        for key, value in values.items():
+            self.removed.discard(key)
+            if key in LIST_SLOTS:
+                self.data[key] = list(value or [])
+                self.replaced.add(key)
+                self.appended.pop(key, None)
+            else:
+                self.data[key] = value
+                self.dirty.add(key)
+
+    def append_slot(self, key: str, items: tuple):
+        self._ensure_loaded()
+        if self.data is None:
+            self.data = {}
+        self.data.setdefault(key, []).extend(items)
+        if key not in self.replaced:
+            self.appended.setdefault(key, []).extend(items)
+
+    def delete_slot(self, key: str):
+        self._ensure_loaded()
+        if self.data is not None:
+            self.data.pop(key, None)
+        self.dirty.discard(key)
+        self.replaced.discard(key)
+        self.appended.pop(key, None)
+        self.removed.add(key)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.reset or self.dirty or self.removed or self.replaced or self.appended)
+
+    def flush_call(self) -> tuple:
+        """기록 스크립트에 넘길 (keys, args)"""
+        list_index = {key: i + 3 for i, key in enumerate(LIST_SLOTS)}  # KEYS는 1부터 시작
+        lists = [
+            [list_index[key], True, [_encode(item) for item in self.data.get(key, [])]]
+            for key in self.replaced
+        ] + [
+            [list_index[key], False, [_encode(item) for item in items]]
+            for key, items in self.appended.items()
+        ]
+        ops = {
+            "reset": self.reset,
+            "hdel": _hash_fields([k for k in self.removed if k not in LIST_SLOTS]),
+            "hset": [[encode_field(k), _encode(self.data[k])] for k in self.dirty],
+            "lists": lists + [[list_index[k], True, []] for k in self.removed if k in LIST_SLOTS],
+        }
+        keys = [get_version_key(self.session_id)] + _all_keys(self.session_id)
+        return keys, [self.version, SESSION_TTL, json.dumps(ops, ensure_ascii=False)]
+
+    def mark_flushed(self, version: int):
+        if version == -1:
+            raise SessionConflictError(f"세션 {self.session_id}이(가) 다른 요청에 의해 변경되었습니다.")
+        self.version = version
+        self.reset = False
+        self.dirty.clear()
+        self.removed.clear()
+        self.replaced.clear()
+        self.appended.clear()
+
+    def flush(self):
+        """변경된 슬롯만 한 번의 스크립트 호출로 기록"""
+        if not self.has_changes:
+            return
+
+        keys, args = self.flush_call()
+        self.mark_flushed(_flush_script(keys=keys, args=args))
+
+
+@contextmanager
+def session_scope(session_id: str):
+    """요청 처리 동안 세션을 메모리에서 다루고, 정상 종료 시 변경 사항을 한 번에 기록"""
+    context = SessionContext(session_id)
+    token = current_context.set(context)
+    try:
+        yield context
+        context.flush()
+    finally:
+        current_context.reset(token)
+
+
+def active_context(session_id: str) -> Optional[SessionContext]:
+    context = current_context.get()
+    if context is not None and context.session_id == session_id:
+        return context
+    return None
+
+
+# ----------------------------------------------------------------------------
+# 세션 함수 (session_scope 안에서는 메모리 세션 사용)
+
 # 세션 초기화 함수
 def init_session(session_id: str) -> dict:
-    key = get_session_key(session_id)
-    
-    session_slots = {
-        "state": None,
-        "sub_state": "search",
-        "can_enter_main": False,
-        "route": None,
-        "requires_dest_search": False,
-        "requires_dep_search": False,
-        "requires_dest_coord": False,
-        "requires_dep_coord": False,
-        "dest_address": None,
-        "dep_address": None,
-        "requested_dep": None,
-        "requested_dest": None,
-        "dep_search_results": None,
-        "dest_search_results": None,
-        "dest_name": None,
-        "dest_coord": None,
-        "dep_name": None,
-        "dep_coord": None,
-        "user_gps": [],
-        "message_history": [],
-        "history_main_step": [],
-        "history_set_dest_step": [],
-        "history_set_dep_step": [],
-        "history_dest": [],
-        "history_dep": [],
-        "error_flag": False,
-        "bus": [],
-    }
-
-    redis_client.set(key, json.dumps(session_slots), ex=SESSION_TTL)
+    session_slots = _default_slots()
+
+    update_session(session_id, session_slots)
     return session_slots
 
 
+def _migrate_legacy_session(session_id: str) -> Optional[dict]:
+    """JSON 문자열 하나로 저장된 이전 형식의 세션을 해시 구조로 변환"""
+    data = redis_client.get(get_session_key(session_id))
+    if not data:
+        return None
+    session = decode_session(data)
+    pipe = redis_client.pipeline(transaction=True)
+    _write_session(pipe, session_id, session)
+    pipe.execute()
+    return session
+
+
 # 세션 가져오기 함수
 def get_session(session_id: str) -> Optional[dict]:
-    key = get_session_key(session_id)
-    data = redis_client.get(key)
-    return json.loads(data) if data else None
+    context = active_context(session_id)
+    if context:
+        return context.get_session()
+
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_read(pipe, session_id)
+    try:
+        results = pipe.execute()
+    except redis.ResponseError:
+        # WRONGTYPE: 이전 형식(문자열)의 세션
+        return _migrate_legacy_session(session_id)
 
+    return _decode_session(results[0], results[1:])
 
-# 세션 업데이트 함수
+
+# 세션 업데이트 함수 (세션 전체를 다시 기록하므로 가능하면 set_slot/set_slots/append_slot 사용)
 def update_session(session_id: str, session_data: dict):
-    key = get_session_key(session_id)
-    redis_client.set(key, json.dumps(session_data), ex=SESSION_TTL)
+    context = active_context(session_id)
+    if context:
+        context.replace(session_data)
+        return
+
+    pipe = redis_client.pipeline(transaction=True)
+    _write_session(pipe, session_id, session_data)
+    pipe.execute()
 
 
 # 세션 삭제 함수
 def delete_session(session_id: str):
-    key = get_session_key(session_id)
-    redis_client.delete(key)
+    context = active_context(session_id)
+    if context:
+        context.replace(None)
+        return
 
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(*_all_keys(session_id))
+    pipe.incr(get_version_key(session_id))  # 진행 중인 다른 턴이 삭제된 세션을 덮어쓰지 않도록
+    pipe.execute()
 
 
+# 슬롯 가져오기 함수
+def get_slot(session_id: str, key: str, default: Any = None) -> Optional[Any]:
+    context = active_context(session_id)
+    if context:
+        return context.get_slot(key, default)
 
+    if key in LIST_SLOTS:
+        items = redis_client.lrange(get_list_key(session_id, key), 0, -1)
+        return [_decode(item) for item in items]
 
-# 슬롯 가져오기 함수
-def get_slot(session_id: str, key: str) -> Optional[Any]:
-    session = get_session(session_id)
-    return session.get(key) if session else None
+    # 새 필드 id와 이전 형식의 슬롯 이름을 함께 조회
+    raw, legacy_raw = redis_client.hmget(get_session_key(session_id), encode_field(key), key)
+    raw = raw if raw is not None else legacy_raw
+    return _decode(raw) if raw is not None else default
 
 
 # 슬롯 설정 함수
 def set_slot(session_id: str, key: str, value: Any):
-    session = get_session(session_id)
-    session[key] = value
-    update_session(session_id, session)
+    set_slots(session_id, {key: value})
+
+
+# 여러 슬롯을 한 번에 설정하는 함수
+def set_slots(session_id: str, values: dict):
+    context = active_context(session_id)
+    if context:
+        context.set_slots(values)
+        return
+
+    pipe = redis_client.pipeline(transaction=True)
+    scalars = encode_fields({k: v for k, v in values.items() if k not in LIST_SLOTS})
+    if scalars:
+        pipe.hset(get_session_key(session_id), mapping=scalars)
+    for key in LIST_SLOTS:
+        if key in values:
+            list_key = get_list_key(session_id, key)
+            pipe.delete(list_key)
+            if values[key]:
+                pipe.rpush(list_key, *[_encode(item) for item in values[key]])
+    _touch(pipe, session_id)
+    pipe.execute()
+
+
+# 리스트 슬롯에 항목 추가 함수 (세션 크기와 무관하게 RPUSH 한 번)
+def append_slot(session_id: str, key: str, *items: Any):
+    if key not in LIST_SLOTS:
+        raise KeyError(f"{key}는 리스트 슬롯이 아닙니다.")
+    if not items:
+        return
+
+    context = active_context(session_id)
+    if context:
+        context.append_slot(key, items)
+        return
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.rpush(get_list_key(session_id, key), *[_encode(item) for item in items])
+    _touch(pipe, session_id)
+    pipe.execute()
 
 
 # 슬롯 삭제 함수
 def delete_slot(session_id: str, key: str):
-    session = get_session(session_id)
-    if session and key in session:
-        del session[key]
-        update_session(session_id, session)
+    context = active_context(session_id)
+    if context:
+        context.delete_slot(key)
+        return
+
+    pipe = redis_client.pipeline(transaction=True)
+    if key in LIST_SLOTS:
+        pipe.delete(get_list_key(session_id, key))
+    else:
+        pipe.hdel(get_session_key(session_id), *_hash_fields([key]))
+    _touch(pipe, session_id)
+    pipe.execute()
 
 
 # 슬롯 초기화 함수
 def clear_slots(session_id: str):
-    update_session(session_id, init_session(session_id))
+    init_session(session_id)
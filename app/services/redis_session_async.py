@@ -0,0 +1,215 @@
+"""
+redis_session.py의 비동기(redis.asyncio) 버전.
+함수 이름과 인자는 동기 버전과 같고, await 하는 동안 스레드를 점유하지 않는다.
+async_session_scope() 안에서는 동기 세션 함수도 메모리 세션을 사용하므로
+기존 동기 핸들러를 스레드풀에서 실행해도 Redis 왕복은 시작(읽기)과 끝(기록) 두 번뿐이다.
+"""
+from contextlib import asynccontextmanager
+from typing import Optional, Any
+
+import redis
+
+from app.services.redis_client import get_async_redis
+from app.services.redis_session import (
+    LIST_SLOTS,
+    SessionContext,
+    current_context,
+    active_context,
+    get_session_key,
+    get_list_key,
+    get_version_key,
+    _all_keys,
+    _touch,
+    _encode,
+    _decode,
+    _decode_session,
+    _queue_read,
+    _write_session,
+    _default_slots,
+    _hash_fields,
+    _FLUSH_SCRIPT,
+)
+from app.services.session_codec import encode_field, encode_fields, decode_session
+
+_flush_script = None
+
+
+def _get_flush_script():
+    global _flush_script
+    if _flush_script is None:
+        _flush_script = get_async_redis().register_script(_FLUSH_SCRIPT)
+    return _flush_script
+
+
+async def _migrate_legacy_session(session_id: str) -> Optional[dict]:
+    """JSON 문자열 하나로 저장된 이전 형식의 세션을 해시 구조로 변환"""
+    client = get_async_redis()
+    data = await client.get(get_session_key(session_id))
+    if not data:
+        return None
+    session = decode_session(data)
+    pipe = client.pipeline(transaction=True)
+    _write_session(pipe, session_id, session)
+    await pipe.execute()
+    return session
+
+
+async def load_context(context: SessionContext):
+    """요청 단위 세션을 한 번의 파이프라인으로 읽음"""
+    for attempt in range(2):
+        pipe = get_async_redis().pipeline(transaction=False)
+        context.queue_load(pipe)
+        try:
+            results = await pipe.execute()
+            break
+        except redis.ResponseError:
+            if attempt:
+                raise  # 변환 후에도 실패하면 WRONGTYPE이 아닌 오류
+            # WRONGTYPE: 이전 형식(문자열)의 세션을 변환한 뒤 한 번만 다시 읽음
+            await _migrate_legacy_session(context.session_id)
+    context.apply_load(results)
+
+
+async def flush_context(context: SessionContext):
+    """변경된 슬롯만 한 번의 스크립트 호출로 기록"""
+    if not context.has_changes:
+        return
+
+    keys, args = context.flush_call()
+    context.mark_flushed(await _get_flush_script()(keys=keys, args=args))
+
+
+@asynccontextmanager
+async def async_session_scope(session_id: str):
+    """session_scope()의 비동기 버전. 시작할 때 세션을 읽고 정상 종료 시 한 번에 기록"""
+    context = SessionContext(session_id)
+    await load_context(context)
+    token = current_context.set(context)
+    try:
+        yield context
+        await flush_context(context)
+    finally:
+        current_context.reset(token)
+
+
+# ----------------------------------------------------------------------------
+# 세션 함수 (async_session_scope 안에서는 메모리 세션 사용)
+
+async def init_session(session_id: str) -> dict:
+    session_slots = _default_slots()
+
+    await update_session(session_id, session_slots)
+    return session_slots
+
+
+async def get_session(session_id: str) -> Optional[dict]:
+    context = active_context(session_id)
+    if context:
+        return context.get_session()
+
+    pipe = get_async_redis().pipeline(transaction=False)
+    _queue_read(pipe, session_id)
+    try:
+        results = await pipe.execute()
+    except redis.ResponseError:
+        return await _migrate_legacy_session(session_id)
+
+    return _decode_session(results[0], results[1:])
+
+
+async def update_session(session_id: str, session_data: dict):
+    context = active_context(session_id)
+    if context:
+        context.replace(session_data)
+        return
+
+    pipe = get_async_redis().pipeline(transaction=True)
+    _write_session(pipe, session_id, session_data)
+    await pipe.execute()
+
+
+async def delete_session(session_id: str):
+    context = active_context(session_id)
+    if context:
+        context.replace(None)
+        return
+
+    pipe = get_async_redis().pipeline(transaction=True)
+    pipe.delete(*_all_keys(session_id))
+    pipe.incr(get_version_key(session_id))  # 진행 중인 다른 턴이 삭제된 세션을 덮어쓰지 않도록
+    await pipe.execute()
+
+
+async def get_slot(session_id: str, key: str, default: Any = None) -> Optional[Any]:
+    context = active_context(session_id)
+    if context:
+        return context.get_slot(key, default)
+
+    client = get_async_redis()
+    if key in LIST_SLOTS:
+        items = await client.lrange(get_list_key(session_id, key), 0, -1)
+        return [_decode(item) for item in items]
+
+    raw, legacy_raw = await client.hmget(get_session_key(session_id), encode_field(key), key)
+    raw = raw if raw is not None else legacy_raw
+    return _decode(raw) if raw is not None else default
+
+
+async def set_slot(session_id: str, key: str, value: Any):
+    await set_slots(session_id, {key: value})
+
+
+async def set_slots(session_id: str, values: dict):
+    context = active_context(session_id)
+    if context:
+        context.set_slots(values)
+        return
+
+    pipe = get_async_redis().pipeline(transaction=True)
+    scalars = encode_fields({k: v for k, v in values.items() if k not in LIST_SLOTS})
+    if scalars:
+        pipe.hset(get_session_key(session_id), mapping=scalars)
+    for key in LIST_SLOTS:
+        if key in values:
+            list_key = get_list_key(session_id, key)
+            pipe.delete(list_key)
+            if values[key]:
+                pipe.rpush(list_key, *[_encode(item) for item in values[key]])
+    _touch(pipe, session_id)
+    await pipe.execute()
+
+
+async def append_slot(session_id: str, key: str, *items: Any):
+    if key not in LIST_SLOTS:
+        raise KeyError(f"{key}는 리스트 슬롯이 아닙니다.")
+    if not items:
+        return
+
+    context = active_context(session_id)
+    if context:
+        context.append_slot(key, items)
+        return
+
+    pipe = get_async_redis().pipeline(transaction=True)
+    pipe.rpush(get_list_key(session_id, key), *[_encode(item) for item in items])
+    _touch(pipe, session_id)
+    await pipe.execute()
+
+
+async def delete_slot(session_id: str, key: str):
+    context = active_context(session_id)
+    if context:
+        context.delete_slot(key)
+        return
+
+    pipe = get_async_redis().pipeline(transaction=True)
+    if key in LIST_SLOTS:
+        pipe.delete(get_list_key(session_id, key))
+    else:
+        pipe.hdel(get_session_key(session_id), *_hash_fields([key]))
+    _touch(pipe, session_id)
+    await pipe.execute()
+
+
+async def clear_slots(session_id: str):
+    await init_session(session_id)
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+load_dotenv()
+
+# 턴 제한 시간 / 회로 차단 설정
+TURN_DEADLINE = float(os.getenv("TURN_DEADLINE", "20"))                           # 한 턴에서 업스트림/LLM 호출에 쓸 수 있는 전체 시간(초)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))                        # 연속 실패가 이만큼 쌓이면 차단
+BREAKER_COOLDOWN_SEC = float(os.getenv("BREAKER_COOLDOWN_SEC", "30"))             # 차단 후 시험 요청을 보내기까지 기다리는 시간(초)
+
+
+class DeadlineExceeded(TimeoutError):
+    """턴 제한 시간을 다 써서 호출하지 않음"""
+
+
+class CircuitOpenError(RuntimeError):
+    """업스트림 회로가 열려 있어 호출하지 않음"""
+
+
+# ----------------------------------------------------------------------------
+# 턴 제한 시간 (요청마다 ContextVar로 전달, 스레드풀/전용 루프로 넘어가도 유지됨)
+
+_deadline = ContextVar("turn_deadline", default=None)  # time.monotonic() 기준 마감 시각
+
+
+@contextmanager
+def turn_deadline(budget: float = TURN_DEADLINE):
+    """이 블록 안의 업스트림/LLM 호출은 합쳐서 budget초 안에 끝나야 함"""
+    token = _deadline.set(time.monotonic() + budget)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """남은 시간(초). 제한 시간 밖(백그라운드 작업 등)이면 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded_timeout(timeout: float) -> float:
+    """호출별 타임아웃을 남은 시간으로 줄임. 이미 다 썼으면 DeadlineExceeded"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("턴 제한 시간을 모두 사용했습니다.")
+    return timeout if timeout is None else min(timeout, left)
+
+
+# ----------------------------------------------------------------------------
+# 회로 차단기
+
+class CircuitBreaker:
+    """
+    업스트림별 회로 차단기
+    - closed: 정상. 연속 실패가 failures번 쌓이면 open
+    - open: 호출하지 않고 바로 CircuitOpenError (호출한 쪽은 캐시/오래된 값으로 대체)
+    - cooldown초가 지나면 half_open: 시험 요청 하나만 보내 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SEC):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def check(self):
+        """호출 전 확인. 열려 있으면 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} 회로가 열려 있어 호출하지 않았습니다.")
+
+    def record(self, success: bool):
+        with self._lock:
+            self._probing = False
+            if success:
+                self._stats["successes"] += 1
+                self.consecutive_failures = 0
+                self.state = "closed"
+                return
+            self._stats["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    self._stats["opened"] += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """결과를 판단할 수 없이 끝난 호출 (제한 시간 초과로 취소 등). 시험 요청 자리만 돌려줌"""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update(
+                state=self.state,
+                consecutive_failures=self.consecutive_failures,
+                open_for_sec=round(time.monotonic() - self.opened_at, 1) if self.state != "closed" and self.opened_at else None,
+            )
+        return snapshot
+
+
+_breakers = {name: CircuitBreaker(name) for name in ("kakao", "sk_transit", "data_go", "openai")}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    return _breakers[name]
+
+
+def get_breaker_states() -> dict:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -0,0 +1,144 @@
+import json
+from dataclasses import dataclass, field, fields, asdict
+from typing import Optional, Any
+
+# 세션 인코딩 스키마 버전. 값 앞에 한 글자(chr(버전))로 붙여 저장한다.
+# - 버전 0 (접두어 없음): json.dumps 기본값(ensure_ascii=True), 긴 필드명
+# - 버전 1: ensure_ascii=False + 공백 없는 구분자, 짧은 필드 id
+SCHEMA_VERSION = 1
+_VERSION_PREFIX = chr(SCHEMA_VERSION)
+
+
+@dataclass
+class SessionSlots:
+    """세션 슬롯 목록과 기본값 (init_session의 기본값, 세션은 dict로 읽고 씀)"""
+    state: Optional[str] = None
+    sub_state: str = "search"
+    can_enter_main: bool = False
+    enable_main: bool = False
+    route: Optional[list] = None
+    requires_dest_search: bool = False
+    requires_dep_search: bool = False
+    requires_dest_coord: bool = False
+    requires_dep_coord: bool = False
+    dest_address: Optional[str] = None
+    dep_address: Optional[str] = None
+    requested_dep: Optional[str] = None
+    requested_dest: Optional[str] = None
+    dep_search_results: Optional[list] = None
+    dest_search_results: Optional[list] = None
+    dest_name: Optional[str] = None
+    dest_coord: Optional[list] = None
+    dep_name: Optional[str] = None
+    dep_coord: Optional[list] = None
+    user_gps: list = field(default_factory=list)
+    message_history: list = field(default_factory=list)
+    history_main_step: list = field(default_factory=list)
+    history_set_dest_step: list = field(default_factory=list)
+    history_set_dep_step: list = field(default_factory=list)
+    history_dest: list = field(default_factory=list)
+    history_dep: list = field(default_factory=list)
+    error_flag: bool = False
+    bus: list = field(default_factory=list)
+    memory_summary: Optional[str] = None
+    memory_stats: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# 슬롯 이름 → 저장용 짧은 필드 id (한 번 정한 id는 재사용/변경하지 말 것)
+FIELD_IDS = {
+    "state": "s",
+    "sub_state": "ss",
+    "can_enter_main": "cm",
+    "route": "r",
+    "requires_dest_search": "rts",
+    "requires_dep_search": "rps",
+    "requires_dest_coord": "rtc",
+    "requires_dep_coord": "rpc",
+    "dest_address": "ta",
+    "dep_address": "pa",
+    "requested_dep": "qp",
+    "requested_dest": "qt",
+    "dep_search_results": "psr",
+    "dest_search_results": "tsr",
+    "dest_name": "tn",
+    "dest_coord": "tc",
+    "dep_name": "pn",
+    "dep_coord": "pc",
+    "user_gps": "g",
+    "message_history": "mh",
+    "history_main_step": "hm",
+    "history_set_dest_step": "ht",
+    "history_set_dep_step": "hp",
+    "history_dest": "hd",
+    "history_dep": "hs",
+    "error_flag": "e",
+    "bus": "b",
+    "memory_summary": "ms",
+    "memory_stats": "mt",
+    "enable_main": "em",
+}
+_FIELD_NAMES = {fid: name for name, fid in FIELD_IDS.items()}
+
+# 슬롯을 추가/삭제하면 SessionSlots와 FIELD_IDS를 함께 고쳐야 함
+assert set(FIELD_IDS) == {f.name for f in fields(SessionSlots)}, "SessionSlots와 FIELD_IDS의 슬롯이 다릅니다"
+assert len(_FIELD_NAMES) == len(FIELD_IDS), "FIELD_IDS에 중복된 필드 id가 있습니다"
+
+
+def encode_field(name: str) -> str:
+    """슬롯 이름을 저장용 필드 id로 변환 (모르는 슬롯은 이름 그대로)"""
+    return FIELD_IDS.get(name, name)
+
+
+def decode_field(fid: str) -> str:
+    """저장된 필드 id(또는 버전 0의 슬롯 이름)를 슬롯 이름으로 변환"""
+    return _FIELD_NAMES.get(fid, fid)
+
+
+def is_legacy_field(fid: str) -> bool:
+    return fid in FIELD_IDS
+
+
+def encode_value(value: Any) -> str:
+    return _VERSION_PREFIX + json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_value(raw: Optional[str]) -> Any:
+    if raw is None:
+        return None
+    if raw[:1] == _VERSION_PREFIX:
+        return json.loads(raw[1:])
+    if raw[:1] < " ":
+        raise ValueError(f"알 수 없는 세션 스키마 버전: {ord(raw[0])}")
+    # 버전 0: 접두어 없는 JSON
+    return json.loads(raw)
+
+
+def encode_fields(values: dict) -> dict:
+    """{슬롯 이름: 값} → {필드 id: 인코딩된 값}"""
+    return {encode_field(k): encode_value(v) for k, v in values.items()}
+
+
+def decode_fields(raw: dict) -> dict:
+    """{필드 id: 인코딩된 값} → {슬롯 이름: 값}. 같은 슬롯이 두 형식으로 있으면 새 형식 우선"""
+    session = {}
+    for fid, value in sorted(raw.items(), key=lambda item: not is_legacy_field(item[0])):
+        session[decode_field(fid)] = decode_value(value)
+    return session
+
+
+def encode_session(session: dict) -> str:
+    """세션 전체를 문자열 하나로 인코딩 (크기 비교/백업용)"""
+    return _VERSION_PREFIX + json.dumps(
+        {encode_field(k): v for k, v in session.items()},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def decode_session(raw: str) -> dict:
+    """encode_session() 결과 또는 버전 0(json.dumps 그대로)의 세션 문자열 디코딩"""
+    data = decode_value(raw)
+    return {decode_field(k): v for k, v in data.items()}
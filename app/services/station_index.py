@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+from typing import Optional, Callable
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """두 좌표 사이의 거리(m). numpy 배열도 받음"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class StationIndex:
+    """
+    정류장 좌표 격자 인덱스
+    - 정류장들을 등장방형(equirectangular) 투영한 평면 좌표(m)로 바꿔 cell_m 크기의 격자에 나눠 담음
+    - 질의 지점의 격자부터 바깥 고리로 넓혀가며 후보를 모으고, 후보끼리는 haversine 거리로 정렬
+    """
+
+    def __init__(self, nodeids: list, lats: list, lons: list, cell_m: float = 300.0):
+        self.nodeids = np.asarray(nodeids, dtype=object)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_m = cell_m
+        self.loaded_at = time.time()
+
+        self._cos_lat0 = math.cos(math.radians(float(self.lats.mean()))) if len(self.lats) else 1.0
+        self._x, self._y = self._project(self.lats, self.lons)
+        cx = np.floor(self._x / cell_m).astype(np.int64)
+        cy = np.floor(self._y / cell_m).astype(np.int64)
+
+        # 격자 좌표 → 정류장 인덱스 배열
+        self._cells = {}
+        order = np.lexsort((cy, cx))
+        keys = np.stack((cx[order], cy[order]), axis=1)
+        if len(order):
+            boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for chunk in np.split(order, boundaries):
+                self._cells[(int(cx[chunk[0]]), int(cy[chunk[0]]))] = chunk
+
+        if self._cells:
+            cells = np.array(list(self._cells.keys()))
+            self._min_cell = cells.min(axis=0)
+            self._max_cell = cells.max(axis=0)
+
+    def __len__(self) -> int:
+        return len(self.nodeids)
+
+    def _project(self, lat, lon):
+        x = np.radians(lon) * self._cos_lat0 * EARTH_RADIUS_M
+        y = np.radians(lat) * EARTH_RADIUS_M
+        return x, y
+
+    def _ring(self, cx: int, cy: int, r: int) -> list:
+        """(cx, cy)에서 체비쇼프 거리가 정확히 r인 격자들의 정류장 인덱스"""
+        if r == 0:
+            cell = self._cells.get((cx, cy))
+            return [cell] if cell is not None else []
+        found = []
+        for dx in range(-r, r + 1):
+            for dy in (-r, r):
+                cell = self._cells.get((cx + dx, cy + dy))
+                if cell is not None:
+                    found.append(cell)
+        for dy in range(-r + 1, r):
+            for dx in (-r, r):
+                cell = self._cells.get((cx + dx, cy + dy))
+                if cell is not None:
+                    found.append(cell)
+        return found
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """가장 가까운 정류장 k개 [(nodeid, 거리m), ...]"""
+        if not self._cells:
+            return []
+        k = min(k, len(self))
+        x, y = self._project(lat, lon)
+        cx, cy = int(math.floor(x / self.cell_m)), int(math.floor(y / self.cell_m))
+
+        # 질의 지점에서 가장 먼 격자 경계까지의 고리 수 (이보다 넓게는 볼 필요 없음)
+        max_r = int(max(
+            abs(cx - self._min_cell[0]), abs(cx - self._max_cell[0]),
+            abs(cy - self._min_cell[1]), abs(cy - self._max_cell[1]),
+        ))
+
+        candidates = []
+        count = 0
+        for r in range(max_r + 1):
+            ring = self._ring(cx, cy, r)
+            candidates.extend(ring)
+            count += sum(len(c) for c in ring)
+            if count < k:
+                continue
+            # r 고리까지 본 영역 밖의 정류장은 최소 r * cell_m 만큼 떨어져 있음 (투영 평면 거리로 판단)
+            idx = np.concatenate(candidates)
+            dist2 = (self._x[idx] - x) ** 2 + (self._y[idx] - y) ** 2
+            kth2 = np.partition(dist2, k - 1)[k - 1] if k > 1 else dist2.min()
+            if kth2 <= (r * self.cell_m) ** 2:
+                break
+
+        # 후보끼리는 haversine 거리로 최종 정렬
+        idx = np.concatenate(candidates)
+        dist = haversine_m(lat, lon, self.lats[idx], self.lons[idx])
+        best = np.argsort(dist)[:k]
+        return [(self.nodeids[idx[i]], float(dist[i])) for i in best]
+
+    def nearest_many(self, lats: list, lons: list) -> list:
+        """
+        여러 좌표 각각에 가장 가까운 정류장 [(nodeid, 거리m), ...]
+        좌표마다 격자에서 찾음 (전체 정류장과의 거리 행렬은 만들지 않음)
+        """
+        if not self._cells:
+            return [(None, None)] * len(lats)
+        return [self.nearest(float(lat), float(lon), 1)[0] for lat, lon in zip(lats, lons)]
+
+
+# ----------------------------------------------------------------------------
+# 프로세스 공용 인덱스 (주기적으로 새로 만들어 통째로 교체)
+
+_index: Optional[StationIndex] = None
+_refresher: Optional[threading.Thread] = None
+_refresher_lock = threading.Lock()
+
+
+def get_station_index() -> Optional[StationIndex]:
+    """현재 인덱스 (아직 로딩 전이면 None)"""
+    return _index
+
+
+def set_station_index(index: StationIndex):
+    global _index
+    _index = index
+
+
+def start_refresher(loader: Callable[[], StationIndex], interval_sec: int):
+    """loader로 인덱스를 바로 만들고, 이후 interval_sec마다 다시 만들어 교체하는 백그라운드 스레드 시작"""
+    global _refresher
+
+    def run():
+        while True:
+            try:
+                started = time.perf_counter()
+                index = loader()
+                set_station_index(index)
+                print(f"정류장 인덱스 갱신: {len(index)}개, {(time.perf_counter() - started) * 1000:.0f}ms")
+            except Exception as e:
+                print(f"❌ 정류장 인덱스 갱신 실패: {e}")
+            time.sleep(interval_sec)
+
+    with _refresher_lock:
+        if _refresher is not None:
+            return
+        _refresher = threading.Thread(target=run, name="station-index-refresher", daemon=True)
+        _refresher.start()
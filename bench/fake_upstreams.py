@@ -0,0 +1,599 @@
+"""
+Kakao / SK 대중교통 / data.go.kr / OpenAI 가짜 업스트림 서버
+
+    python -m bench.fake_upstreams [--port 8900] [--seed 1] [--scale 1.0] [--set openai.error_rate=0.05 ...]
+    python -m bench.fake_upstreams --dump-stations stations.sql   # 로컬 MySQL STATION 테이블용
+
+서버를 띄운 뒤 앱 환경변수를 다음처럼 설정하면 실제 키 없이 전체 흐름을 돌릴 수 있다.
+
+    KAKAO_BASE_URL=http://127.0.0.1:8900
+    SK_TRANSIT_BASE_URL=http://127.0.0.1:8900
+    DATA_GO_BASE_URL=http://127.0.0.1:8900
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+
+- 응답 형식은 apis.py / arrivals.py / OpenAI 클라이언트가 읽는 실제 응답 형식과 같다.
+- 업스트림별 지연(로그정규분포: 중앙값, p95), 오류율(5xx), 타임아웃 비율을 설정할 수 있다.
+  실행 중에는 POST /_fake/config 로 바꾸고, GET /_fake/stats 로 업스트림별 호출 수를 본다.
+- 정류장은 청주 시내 격자에 만든 가상 정류장이며, 같은 seed면 응답(지연 포함)이 재현된다.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 업스트림별 기본 지연/오류 설정 (실측 대략값)
+DEFAULT_PROFILES = {
+    "kakao": {"median_ms": 40, "p95_ms": 120, "error_rate": 0.0, "timeout_rate": 0.0},
+    "sk_transit": {"median_ms": 350, "p95_ms": 900, "error_rate": 0.0, "timeout_rate": 0.0},
+    "data_go": {"median_ms": 120, "p95_ms": 400, "error_rate": 0.0, "timeout_rate": 0.0},
+    "openai": {"median_ms": 700, "p95_ms": 1800, "error_rate": 0.0, "timeout_rate": 0.0},
+}
+TIMEOUT_SEC = 30.0  # 타임아웃 주입 시 응답을 붙잡고 있는 시간 (클라이언트 타임아웃보다 길게)
+OPENAI_CHUNK_CHARS = 4     # LLM 응답 생성 단위 (대략 토큰 하나)
+OPENAI_CHUNK_MS = 12.0     # 조각 하나 생성에 걸리는 시간 (지연 주입 후, 배율 적용). 스트리밍이 아니면 전부 생성한 뒤 응답
+
+ROUTE_NUMBERS = ["105", "502", "747", "831", "862", "911", "20-1"]
+PLACE_WORDS = ["시장", "사거리", "초교", "아파트", "공원", "병원", "우체국", "시청", "터미널", "주민센터"]
+
+
+# ----------------------------------------------------------------------------
+# 가상 정류장
+
+def build_stations(lat0: float = 36.60, lon0: float = 127.40, rows: int = 13, cols: int = 21, step: float = 0.005) -> list:
+    """청주 시내를 덮는 격자 정류장 [{nodeid, name, lat, lon}, ...]"""
+    stations = []
+    for i in range(rows):
+        for j in range(cols):
+            n = i * cols + j
+            stations.append({
+                "nodeid": f"CJB28{n:06d}",
+                "name": f"가상{n // len(PLACE_WORDS) + 1}{PLACE_WORDS[n % len(PLACE_WORDS)]}",
+                "lat": round(lat0 + i * step, 6),
+                "lon": round(lon0 + j * step, 6),
+            })
+    return stations
+
+
+STATIONS = build_stations()
+STATIONS_BY_ID = {station["nodeid"]: station for station in STATIONS}
+
+
+def nearest_station(lat: float, lon: float) -> dict:
+    return min(STATIONS, key=lambda s: (s["lat"] - lat) ** 2 + ((s["lon"] - lon) * 0.8) ** 2)
+
+
+def distance_m(lat1, lon1, lat2, lon2) -> float:
+    return math.hypot((lat1 - lat2) * 111320, (lon1 - lon2) * 111320 * math.cos(math.radians(lat1)))
+
+
+def _hash(*parts) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+_addresses = {}  # 키워드 검색으로 내준 주소 → 좌표 (주소 검색 시 같은 좌표를 돌려줌)
+
+
+def place_for(query: str) -> dict:
+    """검색어마다 항상 같은 가상 장소"""
+    h = _hash(query)
+    station = STATIONS[h % len(STATIONS)]
+    place = {
+        "place_name": query,
+        "address_name": f"충북 청주시 가상구 가상동 {h % 900 + 100}",
+        "road_address_name": f"충북 청주시 가상구 가상로 {h % 300 + 1}",
+        "x": f"{station['lon'] + 0.0004:.6f}",
+        "y": f"{station['lat'] + 0.0003:.6f}",
+    }
+    for key in ("address_name", "road_address_name"):
+        _addresses.setdefault(place[key], (place["x"], place["y"]))
+    return place
+
+
+# ----------------------------------------------------------------------------
+# 지연/오류 주입
+
+class Injector:
+    def __init__(self, seed: int = 1, scale: float = 1.0):
+        self.profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+        self.scale = scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {name: {"requests": 0, "errors": 0, "timeouts": 0, "latency_ms_total": 0.0} for name in self.profiles}
+            self.stats["openai"].update(prompt_tokens=0, cached_tokens=0)
+
+    def sample(self, name: str) -> tuple:
+        """(동작: ok|error|timeout, 지연 초)"""
+        profile = self.profiles[name]
+        with self._lock:
+            roll = self._rng.random()
+            median = max(profile["median_ms"], 0.001)
+            sigma = math.log(max(profile["p95_ms"], median) / median) / 1.645
+            latency_ms = self._rng.lognormvariate(math.log(median), sigma) if profile["median_ms"] > 0 else 0.0
+        if roll < profile["timeout_rate"]:
+            return "timeout", TIMEOUT_SEC
+        if roll < profile["timeout_rate"] + profile["error_rate"]:
+            return "error", latency_ms * self.scale / 1000
+        return "ok", latency_ms * self.scale / 1000
+
+    def record(self, name: str, outcome: str, latency_sec: float):
+        with self._lock:
+            stats = self.stats[name]
+            stats["requests"] += 1
+            stats["errors"] += outcome == "error"
+            stats["timeouts"] += outcome == "timeout"
+            stats["latency_ms_total"] += latency_sec * 1000
+
+    def record_tokens(self, prompt_tokens: int, cached_tokens: int):
+        with self._lock:
+            self.stats["openai"]["prompt_tokens"] += prompt_tokens
+            self.stats["openai"]["cached_tokens"] += cached_tokens
+
+
+injector = Injector()
+app = FastAPI(title="Gashu fake upstreams")
+
+
+def _upstream_for(path: str):
+    if path.startswith("/v2/local/"):
+        return "kakao"
+    if path.startswith("/transit/"):
+        return "sk_transit"
+    if path.startswith("/1613000/"):
+        return "data_go"
+    if path.startswith("/v1/"):
+        return "openai"
+    return None
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    name = _upstream_for(request.url.path)
+    if name is None:
+        return await call_next(request)
+
+    outcome, delay = injector.sample(name)
+    injector.record(name, outcome, delay)
+    await asyncio.sleep(delay)
+    if outcome == "timeout":
+        return JSONResponse({"error": "fake timeout"}, status_code=504)
+    if outcome == "error":
+        if name == "openai":
+            return JSONResponse({"error": {"message": "fake server error", "type": "server_error"}}, status_code=500)
+        return JSONResponse({"error": "fake server error"}, status_code=500)
+    return await call_next(request)
+
+
+@app.get("/_fake/stats")
+def fake_stats():
+    return injector.stats
+
+
+@app.post("/_fake/reset")
+def fake_reset():
+    injector.reset_stats()
+    return injector.stats
+
+
+@app.post("/_fake/config")
+async def fake_config(request: Request):
+    """{"kakao": {"median_ms": 80}, "scale": 0.5} 처럼 바꿀 값만 보냄"""
+    body = await request.json()
+    if "scale" in body:
+        injector.scale = float(body.pop("scale"))
+    for name, values in body.items():
+        injector.profiles[name].update({key: float(value) for key, value in values.items()})
+    return {"scale": injector.scale, "profiles": injector.profiles}
+
+
+# ----------------------------------------------------------------------------
+# Kakao 로컬 API
+
+@app.get("/v2/local/search/keyword.json")
+def kakao_keyword(query: str, size: int = 15):
+    if "없는" in query:
+        return {"documents": [], "meta": {"total_count": 0}}
+    documents = [place_for(query)][:size]
+    return {"documents": documents, "meta": {"total_count": len(documents)}}
+
+
+@app.get("/v2/local/search/address.json")
+def kakao_address(query: str):
+    if "없는" in query:
+        return {"documents": [], "meta": {"total_count": 0}}
+    if query not in _addresses:
+        place = place_for(query)
+        _addresses[query] = (place["x"], place["y"])
+    x, y = _addresses[query]
+    doc = {"address_name": query, "x": x, "y": y}
+    return {"documents": [doc], "meta": {"total_count": 1}}
+
+
+# ----------------------------------------------------------------------------
+# SK 대중교통 경로 탐색
+
+def _walk_leg(start_name, end_name, meters):
+    return {
+        "mode": "WALK",
+        "sectionTime": int(meters / 1.2),
+        "distance": int(meters),
+        "start": {"name": start_name},
+        "end": {"name": end_name},
+    }
+
+
+def _bus_leg(route_no, stations):
+    return {
+        "mode": "BUS",
+        "route": f"간선:{route_no}",
+        "sectionTime": 90 * (len(stations) - 1) + 60,
+        "passStopList": {"stationList": [
+            {"index": i, "stationName": s["name"], "stationID": s["nodeid"], "lat": f"{s['lat']:.6f}", "lon": f"{s['lon']:.6f}"}
+            for i, s in enumerate(stations)
+        ]},
+    }
+
+
+def _path(a: dict, b: dict) -> list:
+    """격자 위에서 a → b 로 가는 정류장 목록 (세로 먼저, 가로 나중)"""
+    ia, ja = divmod(int(a["nodeid"][5:]), 21)
+    ib, jb = divmod(int(b["nodeid"][5:]), 21)
+    cells = []
+    step_i = 1 if ib >= ia else -1
+    for i in range(ia, ib + step_i, step_i):
+        cells.append((i, ja))
+    step_j = 1 if jb >= ja else -1
+    for j in range(ja + step_j, jb + step_j, step_j):
+        cells.append((ib, j))
+    stations = [STATIONS[i * 21 + j] for i, j in cells]
+    return stations if len(stations) > 1 else [a, STATIONS[(int(a["nodeid"][5:]) + 1) % len(STATIONS)]]
+
+
+@app.post("/transit/routes/")
+async def sk_routes(request: Request):
+    body = await request.json()
+    start_lon, start_lat = float(body["startX"]), float(body["startY"])
+    end_lon, end_lat = float(body["endX"]), float(body["endY"])
+    board, alight = nearest_station(start_lat, start_lon), nearest_station(end_lat, end_lon)
+    walk_in = distance_m(start_lat, start_lon, board["lat"], board["lon"]) + 50
+    walk_out = distance_m(end_lat, end_lon, alight["lat"], alight["lon"]) + 50
+    path = _path(board, alight)
+    h = _hash(board["nodeid"], alight["nodeid"])
+
+    itineraries = []
+    count = min(int(body.get("count", 10)), 5)
+    for k in range(count):
+        route_no = ROUTE_NUMBERS[(h + k) % len(ROUTE_NUMBERS)]
+        if k % 2 == 1 and len(path) >= 4:
+            # 환승 경로
+            mid = len(path) // 2
+            second_no = ROUTE_NUMBERS[(h + k + 3) % len(ROUTE_NUMBERS)]
+            legs = [
+                _walk_leg("출발지", path[0]["name"], walk_in),
+                _bus_leg(route_no, path[:mid + 1]),
+                _walk_leg(path[mid]["name"], path[mid]["name"], 60),
+                _bus_leg(second_no, path[mid:]),
+                _walk_leg(path[-1]["name"], "도착지", walk_out),
+            ]
+            transfers = 1
+        else:
+            legs = [
+                _walk_leg("출발지", path[0]["name"], walk_in + k * 40),
+                _bus_leg(route_no, path),
+                _walk_leg(path[-1]["name"], "도착지", walk_out),
+            ]
+            transfers = 0
+        total = sum(leg["sectionTime"] for leg in legs) + transfers * 180
+        itineraries.append({
+            "totalTime": total,
+            "transferCount": transfers,
+            "fare": {"regular": {"totalFare": 1500}},
+            "legs": legs,
+        })
+    return {"metaData": {"requestParameters": body, "plan": {"itineraries": itineraries}}}
+
+
+# ----------------------------------------------------------------------------
+# data.go.kr 버스 도착 정보
+
+def _arrivals_for(node_id: str) -> list:
+    station = STATIONS_BY_ID.get(node_id)
+    if station is None:
+        return []
+    h = _hash(node_id)
+    now = int(time.time())
+    items = []
+    for k in range(3 + h % 4):
+        route_no = ROUTE_NUMBERS[(h + k) % len(ROUTE_NUMBERS)]
+        period = 600 + 120 * k  # 노선별 배차 간격(초)
+        arrtime = (period - (now + _hash(node_id, route_no)) % period) + 30
+        items.append({
+            "arrprevstationcnt": max(1, arrtime // 120),
+            "arrtime": arrtime,
+            "nodeid": node_id,
+            "nodenm": station["name"],
+            "routeid": f"CJB270{route_no.replace('-', '')}",
+            "routeno": int(route_no) if route_no.isdigit() else route_no,
+            "routetp": "간선버스",
+            "vehicletp": "일반차량",
+        })
+    return items
+
+
+def _data_go_response(items: list, page_no: int, num_of_rows: int) -> dict:
+    page = items[(page_no - 1) * num_of_rows: page_no * num_of_rows]
+    if not page:
+        body_items = ""  # 결과가 없으면 items가 빈 문자열
+    elif len(page) == 1:
+        body_items = {"item": page[0]}  # 한 건이면 item이 dict
+    else:
+        body_items = {"item": page}
+    return {"response": {
+        "header": {"resultCode": "00", "resultMsg": "NORMAL SERVICE."},
+        "body": {"items": body_items, "numOfRows": num_of_rows, "pageNo": page_no, "totalCount": len(items)},
+    }}
+
+
+@app.get("/1613000/ArvlInfoInqireService/getSttnAcctoArvlPrearngeInfoList")
+def data_go_node_arrivals(nodeId: str, pageNo: int = 1, numOfRows: int = 10):
+    return _data_go_response(_arrivals_for(nodeId), pageNo, numOfRows)
+
+
+@app.get("/1613000/ArvlInfoInqireService/getSttnAcctoSpcifyRouteBusArvlPrearngeInfoList")
+def data_go_route_arrivals(nodeId: str, routeId: str, pageNo: int = 1, numOfRows: int = 10):
+    items = [item for item in _arrivals_for(nodeId) if item["routeid"] == routeId]
+    return _data_go_response(items, pageNo, numOfRows)
+
+
+# ----------------------------------------------------------------------------
+# OpenAI chat completions (호출 위치별 프롬프트를 보고 그럴듯한 JSON 응답 생성)
+
+YES_WORDS = ("네", "예", "응", "맞아", "좋아", "그래")
+
+
+def _last_user_utterance(messages: list) -> str:
+    """마지막 메시지 안의 '사용자 메시지: "..."', 없으면 마지막 user 메시지"""
+    match = re.search(r'사용자 메시지: "(.*)"', messages[-1]["content"])
+    if match:
+        return match.group(1)
+    for message in reversed(messages):
+        if message["role"] == "user":
+            return message["content"]
+    return ""
+
+
+def _last_assistant(messages: list) -> str:
+    for message in reversed(messages):
+        if message["role"] == "assistant":
+            return message["content"]
+    return ""
+
+
+def _is_yes(text: str) -> bool:
+    return text.strip().startswith(YES_WORDS)
+
+
+def _confirmed_place(text: str):
+    match = re.search(r"'(.+?)' \((.+?)\)", text)
+    return match.groups() if match else (None, None)
+
+
+def _destination_in(text: str):
+    match = re.match(r"\s*(.+?)(?:으로|로|에|까지)?\s*(?:가고 싶어|가자|갈래|가려고|가는)", text)
+    return match.group(1).strip() if match else None
+
+
+def _bus_legs_in(prompt: str, label: str) -> list:
+    """프롬프트의 '{label}: [...]' 줄(itineraries_for_prompt 결과)에서 버스 구간만 꺼냄"""
+    match = re.search(re.escape(label) + r": (\[.*\])", prompt)
+    try:
+        itineraries = json.loads(match.group(1)) if match else []
+    except json.JSONDecodeError:
+        return []
+    return [leg for itinerary in itineraries for leg in itinerary.get("bus_routes", [])]
+
+
+def fake_completion(messages: list) -> dict:
+    # 고정 지시문/경로 데이터는 system 메시지, 사용자 메시지와 검색 결과는 마지막 메시지에 있음
+    prompt = "\n".join([m["content"] for m in messages if m["role"] == "system"] + [messages[-1]["content"]])
+    utterance = _last_user_utterance(messages)
+    assistant = _last_assistant(messages)
+
+    if '"requires_dep_coord"' in prompt:  # classify_state
+        # 같은 발화가 3번 이상 반복되면 error (프롬프트 규칙)
+        repeats = sum(1 for m in messages if m["role"] == "user" and m["content"] == utterance)
+        if repeats >= 3:
+            return {"state": "error", "error": True}
+        dest = _destination_in(utterance)
+        if dest:
+            return {"state": "set_dest", "dest": dest}
+        if "현재 위치" in utterance or "지금 위치" in utterance:
+            return {"state": "set_dep", "dep": "현재 위치"}
+        if _is_yes(utterance):
+            name, address = _confirmed_place(assistant)
+            if name and "목적지" in assistant:
+                return {"state": "set_dest", "dest": name, "dest_address": address, "requires_dest_coord": True}
+            if name and "출발지" in assistant:
+                return {"state": "set_dep", "dep": name, "dep_address": address, "requires_dep_coord": True}
+        if "언제" in utterance or "번" in utterance or "경로" in utterance:
+            return {"state": "main"}
+        return {"state": "error", "error": True}
+
+    if "목적지 검색 결과" in prompt or "출발지 검색 결과" in prompt:  # set_dest / set_dep
+        kind = "dest" if "목적지 검색 결과" in prompt else "dep"
+        results = re.search(r"검색 결과: (\[.*\])", prompt)
+        name_match = re.search(r"'name': '(.+?)', 'address': '(.+?)'", results.group(1) if results else "")
+        if "현재 위치" in utterance and kind == "dep":
+            return {"message": "현재 위치에서 출발할게요.", "dep": None, "dep_address": None, "use_gps": True}
+        if _is_yes(utterance) and name_match:
+            return {"message": "알겠어요.", kind: name_match.group(1), f"{kind}_address": name_match.group(2)}
+        return {"message": "말씀하신 곳을 찾지 못했어요. 어디로 가시겠어요?", kind: None, f"{kind}_address": None}
+
+    if "경로 검색 결과" in prompt:  # handle_main
+        legs = _bus_legs_in(prompt, "경로 검색 결과")
+        if legs and ("언제" in utterance or "실시간" in utterance):
+            return {"message": None, "routeno": legs[0]["route_names"][0], "nodeid": legs[0]["start_nodeid"]}
+        return {"message": "가장 빠른 경로를 안내해 드릴게요.", "routeno": None, "nodeid": None}
+
+    if '"request_type"' in prompt:  # processing_message 분류
+        bus_no = re.search(r"(\d+(?:-\d+)?)번", utterance)
+        dest = re.match(r"\s*(.+?)(?:으로|로|에|까지)?\s*(?:가는|가려면|가고)", utterance)
+        return {
+            "request_type": "specific_bus_info" if bus_no else "general_bus_info",
+            "dest": dest.group(1).strip() if dest else None,
+            "bus_no": bus_no.group(1) if bus_no else None,
+        }
+
+    if "3문장 이내로 요약" in prompt:  # memory 요약 (JSON 아님)
+        return "사용자는 버스 경로를 안내받고 있다."
+
+    legs = _bus_legs_in(prompt, "경로 정보")  # processing_message 일반 경로 안내
+    if legs:
+        first = legs[0]
+        return {"message": (
+            f"경로를 안내해 드릴게요. {first['start_station']} 정류장에서 {'/'.join(first['route_names'])}번 버스를 타세요. "
+            f"{legs[-1]['end_station']} 정류장에서 내리면 돼요."
+        )}
+    return {"message": "경로를 안내해 드릴게요."}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 2)
+
+
+OPENAI_CACHE_MIN_TOKENS = 1024  # 프롬프트 캐시가 적용되는 최소 길이
+OPENAI_CACHE_BLOCK = 128        # 캐시 적중 토큰은 이 단위로 늘어남
+OPENAI_CACHE_ENTRIES = 20000
+
+_prefix_cache = {}  # 앞에서부터 메시지 i개의 해시 → 토큰 수 (들어온 순서대로 오래된 것부터 버림)
+_prefix_cache_lock = threading.Lock()
+
+
+def cached_prompt_tokens(messages: list) -> int:
+    """
+    이전 요청과 메시지 단위로 같은 앞부분의 토큰 수 (OpenAI 프롬프트 캐시 흉내)
+    OPENAI_CACHE_MIN_TOKENS보다 짧으면 0, 아니면 OPENAI_CACHE_BLOCK 단위로 내림
+    """
+    digest = hashlib.sha1()
+    tokens = 0
+    prefixes = []
+    for message in messages:
+        digest.update(f"{message.get('role')}\0{message.get('content') or ''}\0".encode())
+        tokens += _estimate_tokens(message.get("content") or "")
+        prefixes.append((digest.hexdigest(), tokens))
+
+    with _prefix_cache_lock:
+        cached = max((tokens for key, tokens in prefixes if key in _prefix_cache), default=0)
+        for key, tokens in prefixes:
+            _prefix_cache[key] = tokens
+        while len(_prefix_cache) > OPENAI_CACHE_ENTRIES:
+            del _prefix_cache[next(iter(_prefix_cache))]
+    return 0 if cached < OPENAI_CACHE_MIN_TOKENS else cached // OPENAI_CACHE_BLOCK * OPENAI_CACHE_BLOCK
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    reply = fake_completion(messages)
+    content = reply if isinstance(reply, str) else json.dumps(reply, ensure_ascii=False)
+    prompt_tokens = sum(_estimate_tokens(m.get("content") or "") for m in messages)
+    cached_tokens = cached_prompt_tokens(messages)
+    completion_tokens = _estimate_tokens(content)
+    injector.record_tokens(prompt_tokens, cached_tokens)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+    base = {
+        "id": f"chatcmpl-fake-{_hash(time.time()):x}",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-fake"),
+    }
+    pieces = [content[i:i + OPENAI_CHUNK_CHARS] for i in range(0, len(content), OPENAI_CHUNK_CHARS)]
+    chunk_delay = OPENAI_CHUNK_MS * injector.scale / 1000
+
+    if not body.get("stream"):
+        await asyncio.sleep(chunk_delay * len(pieces))
+        return dict(
+            base,
+            object="chat.completion",
+            choices=[{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            usage=usage,
+        )
+
+    def event(choices: list, **extra) -> str:
+        return "data: " + json.dumps(dict(base, object="chat.completion.chunk", choices=choices, **extra), ensure_ascii=False) + "\n\n"
+
+    async def stream():
+        yield event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for piece in pieces:
+            await asyncio.sleep(chunk_delay)
+            yield event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield event([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+# ----------------------------------------------------------------------------
+
+def dump_stations_sql(path: str):
+    """가상 정류장을 로컬 MySQL STATION 테이블에 넣는 SQL"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("CREATE TABLE IF NOT EXISTS STATION (nodeid VARCHAR(32) PRIMARY KEY, nodenm VARCHAR(255), gpslati DOUBLE, gpslong DOUBLE) DEFAULT CHARSET=utf8mb4;\n")
+        for station in STATIONS:
+            f.write(
+                f"REPLACE INTO STATION (nodeid, nodenm, gpslati, gpslong) VALUES "
+                f"('{station['nodeid']}', '{station['name']}', {station['lat']}, {station['lon']});\n"
+            )
+
+
+def configure(seed: int = 1, scale: float = 1.0, overrides: list = ()):
+    """seed/지연 배율/업스트림별 설정('openai.error_rate=0.05')을 적용"""
+    global injector
+    injector = Injector(seed=seed, scale=scale)
+    for override in overrides:
+        key, value = override.split("=", 1)
+        name, field = key.split(".", 1)
+        injector.profiles[name][field] = float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1.0, help="지연 배율 (0이면 지연 없음)")
+    parser.add_argument("--set", action="append", default=[], metavar="UPSTREAM.FIELD=VALUE")
+    parser.add_argument("--dump-stations", metavar="PATH")
+    args = parser.parse_args()
+
+    if args.dump_stations:
+        dump_stations_sql(args.dump_stations)
+        print(f"{len(STATIONS)}개 정류장 → {args.dump_stations}")
+        return
+
+    import uvicorn
+    configure(args.seed, args.scale, args.set)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+가상 사용자 부하 테스트 (/init → 목적지 → 확인 → 현재 위치 → 실시간 요청 → /message)
+
+    python -m bench.loadtest [--users 50] [--concurrency 10] [--scale 1.0] [--set openai.median_ms=300 ...]
+    python -m bench.loadtest --url http://127.0.0.1:8000 --fake-url http://127.0.0.1:8900
+    python -m bench.loadtest --compare 이전.json 이후.json
+
+- 기본은 app.main:app을 프로세스 안(ASGI)에서 실행하고, bench/fake_upstreams.py를 띄워 업스트림을 대신한다.
+  Redis/MySQL은 .env 설정의 실제 서버를 사용 (MySQL STATION 테이블은 fake_upstreams --dump-stations 로 채움)
+- --url 을 주면 이미 떠 있는 서버에 요청한다. 업스트림 호출 수는 --fake-url 의 /_fake/stats 에서 읽는다.
+- 결과: 단계별/전체 p50/p95/p99 지연, 처리량, 오류율, 턴당 Redis 명령/MySQL 커넥션/HTTP/LLM 호출 수,
+  턴당 LLM 프롬프트 토큰과 그중 캐시 적중 토큰
+  bench/results/<시각>_<커밋>.json 으로 저장해 커밋 사이 회귀를 비교한다.
+- 첫 사용자 한 명은 다른 사용자 없이 단계마다 호출 수를 따로 기록한다 (cold 경로 프로필).
+- --stream 을 주면 /test/main, /message 대신 스트리밍 엔드포인트(/stream)를 호출하고 첫 문장까지의 시간도 기록한다.
+  ASGI 전송은 응답을 끝까지 모아서 돌려주므로 이때는 앱을 로컬 포트(--app-port)에 띄워 HTTP로 요청한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+PLACES = [
+    "청주대학교", "충북대학교", "청주시청", "청주고속버스터미널", "성안길",
+    "육거리시장", "청주체육관", "상당산성", "청주국제공항", "오창호수공원",
+]
+
+# 응답은 왔지만 처리에 실패한 경우 (사용자에게는 사과 메시지)
+FALLBACK_MARKERS = ("내부 오류", "비정상 종료", "문제가 발생", "버스 관련 정보만")
+
+
+def _with_josa(place: str, josa: str) -> str:
+    """받침에 따라 으로/로"""
+    code = ord(place[-1]) - 0xAC00
+    jong = code % 28 if 0 <= code < 11172 else 0
+    if josa == "으로" and (jong == 0 or jong == 8):  # 받침 없음 또는 ㄹ
+        josa = "로"
+    return place + josa
+
+
+def build_script(index: int, rng: random.Random) -> list:
+    """사용자 한 명의 대화 [(단계, 경로, 발화), ...]"""
+    place = rng.choice(PLACES)
+    if index % 2 == 0:
+        one_shot = f"{place}에 가는 105번 버스 언제 와?"
+    else:
+        one_shot = f"{place}에 가는 버스 알려줘"
+    return [
+        ("init", "/init", ""),
+        ("dest", "/test/main", f"{_with_josa(place, '으로')} 가고 싶어"),
+        ("confirm", "/test/main", "네 맞아요"),
+        ("dep_gps", "/test/main", "현재 위치"),
+        ("realtime", "/test/main", "제일 빠른 버스 언제 와?"),
+        ("message", "/message", one_shot),
+    ]
+
+
+# ----------------------------------------------------------------------------
+# 호출 수 측정 (실행 전후 차이)
+
+class Counters:
+    def __init__(self, client: httpx.AsyncClient, fake_url: str):
+        self.client = client
+        self.fake_url = fake_url
+        self._redis = None
+        try:
+            from app.services.redis_client import redis_client
+            self._redis = redis_client
+        except Exception as e:
+            print(f"❌ Redis 명령 수를 측정하지 않음: {e}")
+
+    async def snapshot(self) -> dict:
+        counts = {"redis": None, "mysql": None, "http": {}, "llm": None, "llm_prompt_tokens": None, "llm_cached_tokens": None}
+        if self._redis is not None:
+            try:
+                info = await asyncio.to_thread(self._redis.info, "stats")
+                counts["redis"] = int(info["total_commands_processed"])
+            except Exception:
+                pass
+        try:
+            response = await self.client.get("/status/db")
+            counts["mysql"] = response.json().get("acquired")
+        except Exception:
+            pass
+        if self.fake_url:
+            try:
+                async with httpx.AsyncClient(base_url=self.fake_url) as fake:
+                    stats = (await fake.get("/_fake/stats")).json()
+                openai_stats = stats.pop("openai", {})
+                counts["llm"] = openai_stats.get("requests")
+                counts["llm_prompt_tokens"] = openai_stats.get("prompt_tokens")
+                counts["llm_cached_tokens"] = openai_stats.get("cached_tokens")
+                counts["http"] = {name: values["requests"] for name, values in stats.items()}
+            except Exception:
+                pass
+        return counts
+
+
+def diff_counts(before: dict, after: dict) -> dict:
+    def sub(a, b):
+        return None if a is None or b is None else b - a
+
+    return {
+        "redis": sub(before["redis"], after["redis"]),  # INFO 명령 자체도 포함
+        "mysql": sub(before["mysql"], after["mysql"]),
+        "http": {name: sub(before["http"].get(name), count) for name, count in after["http"].items()},
+        "llm": sub(before["llm"], after["llm"]),
+        "llm_prompt_tokens": sub(before["llm_prompt_tokens"], after["llm_prompt_tokens"]),
+        "llm_cached_tokens": sub(before["llm_cached_tokens"], after["llm_cached_tokens"]),
+    }
+
+
+def per_turn(counts: dict, turns: int) -> dict:
+    def div(value):
+        return None if value is None or not turns else round(value / turns, 2)
+
+    return {
+        "redis": div(counts["redis"]),
+        "mysql": div(counts["mysql"]),
+        "http": {name: div(value) for name, value in counts["http"].items()},
+        "http_total": div(sum(v for v in counts["http"].values() if v is not None) if counts["http"] else None),
+        "llm": div(counts["llm"]),
+        "llm_prompt_tokens": div(counts["llm_prompt_tokens"]),
+        "llm_cached_tokens": div(counts["llm_cached_tokens"]),
+    }
+
+
+# ----------------------------------------------------------------------------
+# 실행
+
+STREAM_PATHS = ("/test/main", "/message")
+
+
+async def _post_stream(client: httpx.AsyncClient, path: str, body: dict, timeout: float, started: float) -> tuple:
+    """NDJSON 스트리밍 응답 → (상태 코드, done 이벤트, 첫 delta까지 걸린 ms)"""
+    first_ms, final = None, None
+    async with client.stream("POST", path, json=body, timeout=timeout) as response:
+        if response.status_code >= 400:
+            return response.status_code, None, None
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event.get("type") in ("delta", "replace") and first_ms is None:
+                first_ms = (time.perf_counter() - started) * 1000
+            elif event.get("type") == "done":
+                final = event
+        return response.status_code, final, first_ms
+
+
+async def run_turn(client: httpx.AsyncClient, user_id: str, path: str, utterance: str, gps: tuple, timeout: float,
+                   stream: bool = False) -> dict:
+    body = {"user_id": user_id, "user_message": utterance, "user_lon": f"{gps[0]:.6f}", "user_lat": f"{gps[1]:.6f}"}
+    started = time.perf_counter()
+    outcome, message, first_ms = "ok", None, None
+    try:
+        if stream and path in STREAM_PATHS:
+            status_code, data, first_ms = await _post_stream(client, f"{path}/stream", body, timeout, started)
+        else:
+            response = await client.post(path, json=body, timeout=timeout)
+            status_code, data = response.status_code, (response.json() if response.status_code < 400 else None)
+        if status_code >= 400:
+            outcome = "error"
+        else:
+            message = data.get("message") if isinstance(data, dict) else None
+            if not message:
+                outcome = "error"
+            elif any(marker in message for marker in FALLBACK_MARKERS):
+                outcome = "fallback"
+    except Exception as e:
+        outcome, message = "error", f"{type(e).__name__}: {e}"
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {"latency_ms": latency_ms, "first_ms": first_ms, "outcome": outcome, "message": message}
+
+
+async def run_user(client, index: int, args, rng: random.Random, results: list, counters: Counters = None, profile: dict = None):
+    user_id = f"load-{args.seed}-{index:05d}"
+    gps = (127.43168 + rng.uniform(-0.02, 0.02), 36.62544 + rng.uniform(-0.02, 0.02))
+    for step, path, utterance in build_script(index, rng):
+        before = await counters.snapshot() if profile is not None else None
+        result = await run_turn(client, user_id, path, utterance, gps, args.timeout, args.stream)
+        result.update(step=step, user=index)
+        results.append(result)
+        if profile is not None:
+            profile[step] = {
+                "latency_ms": round(result["latency_ms"], 1),
+                "outcome": result["outcome"],
+                "message": result["message"],
+                "calls": diff_counts(before, await counters.snapshot()),
+            }
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 1)
+
+
+def summarize(results: list) -> dict:
+    latencies = [r["latency_ms"] for r in results]
+    firsts = [r["first_ms"] for r in results if r.get("first_ms") is not None]  # 스트리밍: 첫 문장까지
+    return {
+        "turns": len(results),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "max_ms": round(max(latencies), 1) if latencies else None,
+        "error_rate": round(sum(r["outcome"] == "error" for r in results) / len(results), 4) if results else None,
+        "fallback_rate": round(sum(r["outcome"] == "fallback" for r in results) / len(results), 4) if results else None,
+        "first_p50_ms": percentile(firsts, 50),
+        "first_p95_ms": percentile(firsts, 95),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, args) -> dict:
+    counters = Counters(client, args.fake_url)
+    rng = random.Random(args.seed)
+
+    # 1. 한 명만 먼저 실행해 단계별 호출 수 기록
+    profile = {}
+    await run_user(client, 0, args, random.Random(rng.random()), [], counters, profile)
+
+    # 2. 나머지 사용자를 동시에 실행
+    results = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def user(index, user_rng):
+        async with semaphore:
+            await run_user(client, index, args, user_rng, results)
+
+    before = await counters.snapshot()
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i, random.Random(rng.random())) for i in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - started
+    counts = diff_counts(before, await counters.snapshot())
+
+    steps = {}
+    for result in results:
+        steps.setdefault(result["step"], []).append(result)
+    errors = [r for r in results if r["outcome"] != "ok"]
+
+    return {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "target": args.url or "in-process",
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "think_ms": args.think_ms,
+            "seed": args.seed,
+            "scale": args.scale,
+            "overrides": args.set,
+            "stream": args.stream,
+        },
+        "elapsed_sec": round(elapsed, 2),
+        "throughput_turns_per_sec": round(len(results) / elapsed, 2) if elapsed else None,
+        "overall": summarize(results),
+        "steps": {step: summarize(step_results) for step, step_results in steps.items()},
+        "calls_total": counts,
+        "calls_per_turn": per_turn(counts, len(results)),
+        "profile": profile,
+        "error_samples": [{k: r[k] for k in ("step", "user", "outcome", "message")} for r in errors[:10]],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# ----------------------------------------------------------------------------
+# 대상 준비
+
+def start_fake_upstreams(port: int, seed: int, scale: float, overrides: list) -> str:
+    """가짜 업스트림을 백그라운드 스레드로 띄우고 앱이 그 주소를 쓰도록 환경변수 설정 (app 임포트 전에 호출)"""
+    import uvicorn
+    from bench import fake_upstreams
+
+    fake_upstreams.configure(seed, scale, overrides)
+    server = uvicorn.Server(uvicorn.Config(fake_upstreams.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="fake-upstreams", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    os.environ.update({
+        "KAKAO_BASE_URL": base_url,
+        "SK_TRANSIT_BASE_URL": base_url,
+        "DATA_GO_BASE_URL": base_url,
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+    })
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    return base_url
+
+
+async def run_in_process(args) -> dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await run_load(client, args)
+
+
+def start_app_server(port: int) -> str:
+    """app.main:app을 백그라운드 스레드의 uvicorn으로 실행 (스트리밍 측정용)"""
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="app-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_remote(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await run_load(client, args)
+
+
+# ----------------------------------------------------------------------------
+# 출력 / 비교
+
+def print_report(report: dict):
+    meta = report["meta"]
+    print(f"\n{meta['commit']} · 사용자 {meta['users']}명 · 동시 {meta['concurrency']} · {report['elapsed_sec']}초 · "
+          f"{report['throughput_turns_per_sec']} 턴/초")
+    print(f"{'단계':<10}{'턴':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'오류':>8}{'실패응답':>8}{'첫문장p50':>10}{'첫문장p95':>10}")
+    for step, summary in list(report["steps"].items()) + [("전체", report["overall"])]:
+        print(f"{step:<10}{summary['turns']:>6}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}"
+              f"{summary['error_rate']:>8.1%}{summary['fallback_rate']:>8.1%}"
+              f"{summary.get('first_p50_ms') or '-':>10}{summary.get('first_p95_ms') or '-':>10}")
+    print(f"턴당 호출 수: {json.dumps(report['calls_per_turn'], ensure_ascii=False)}")
+    for sample in report["error_samples"][:3]:
+        print(f"  ❌ {sample['step']}: {sample['message']}")
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    def row(name, a, b):
+        if a is None or b is None:
+            return f"{name:<28}{str(a):>10}{str(b):>10}"
+        change = f"{(b - a) / a:+.1%}" if a else ""
+        return f"{name:<28}{a:>10}{b:>10}{change:>10}"
+
+    print(f"{'':<28}{before['meta']['commit']:>10}{after['meta']['commit']:>10}")
+    print(row("throughput_turns_per_sec", before["throughput_turns_per_sec"], after["throughput_turns_per_sec"]))
+    for key in ("p50_ms", "p95_ms", "p99_ms", "error_rate"):
+        print(row(f"overall.{key}", before["overall"][key], after["overall"][key]))
+    for step in after["steps"]:
+        if step in before["steps"]:
+            print(row(f"{step}.p95_ms", before["steps"][step]["p95_ms"], after["steps"][step]["p95_ms"]))
+            if after["steps"][step].get("first_p95_ms") is not None:
+                # 스트리밍 실행의 첫 문장 시간은 이전 실행의 전체 응답 시간과 비교
+                print(row(f"{step}.first_p95_ms", before["steps"][step].get("first_p95_ms") or before["steps"][step]["p95_ms"],
+                          after["steps"][step]["first_p95_ms"]))
+    for key in ("redis", "mysql", "http_total", "llm", "llm_prompt_tokens", "llm_cached_tokens"):
+        print(row(f"per_turn.{key}", before["calls_per_turn"].get(key), after["calls_per_turn"].get(key)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--think-ms", type=float, default=0, help="턴 사이 평균 대기 시간(ms)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="턴 하나의 최대 대기 시간(초)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="이미 떠 있는 서버 주소 (없으면 프로세스 안에서 실행)")
+    parser.add_argument("--fake-url", help="--url 사용 시 가짜 업스트림 주소 (호출 수 측정용)")
+    parser.add_argument("--fake-port", type=int, default=8900)
+    parser.add_argument("--scale", type=float, default=1.0, help="가짜 업스트림 지연 배율")
+    parser.add_argument("--set", action="append", default=[], metavar="UPSTREAM.FIELD=VALUE")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: bench/results/<시각>_<커밋>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--stream", action="store_true", help="스트리밍 엔드포인트로 요청하고 첫 문장까지의 시간 기록")
+    parser.add_argument("--app-port", type=int, default=8901, help="--stream 으로 프로세스 안에서 실행할 때 앱 포트")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.url:
+        report = asyncio.run(run_remote(args))
+    else:
+        args.fake_url = start_fake_upstreams(args.fake_port, args.seed, args.scale, args.set)
+        if args.stream:
+            args.url = start_app_server(args.app_port)
+            report = asyncio.run(run_remote(args))
+            report["meta"]["target"] = "in-process (http)"
+        else:
+            report = asyncio.run(run_in_process(args))
+
+    print_report(report)
+    path = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+세션 인코딩 형식별 크기/속도 비교 리포트
+
+    python -m bench.session_memory_report [--redis] [--json 결과.json]
+
+- legacy_blob : 이전 형식. 세션 전체를 json.dumps(ensure_ascii=True) 문자열 하나로 저장
+- hash_v0     : 슬롯별 해시 필드 + 리스트, 긴 슬롯 이름 + json.dumps 값
+- hash_v1     : 슬롯별 해시 필드 + 리스트, 짧은 필드 id + 버전 접두어 + ensure_ascii=False JSON
+--redis 를 주면 로컬 Redis에 세 형식을 실제로 기록하고 MEMORY USAGE 합계도 비교한다.
+"""
+import argparse
+import json
+import os
+import timeit
+
+from app.services.session_codec import (
+    SessionSlots,
+    encode_fields,
+    encode_value,
+    encode_session,
+    decode_session,
+)
+from app.services.redis_session import LIST_SLOTS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_DIALOGUE = [
+    ("assistant", "안녕하세요. 오늘은 어디에 가시겠어요? 이전에는 청주대, 서원대에 갔어요"),
+    ("user", "청주대교 가고 싶어"),
+    ("assistant", "검색된 목적지는 '청주대교' (충북 청주시 상당구 남주동)입니다. 이 주소가 맞나요?"),
+    ("user", "네 맞아요"),
+    ("assistant", "현재 위치에서 출발하시겠어요? 아니면 출발지를 알려주세요"),
+    ("user", "현재 위치"),
+    ("assistant", "105번 버스를 복대가경시장에서 타면 17분 걸려요. 도보 이동은 3분이에요."),
+    ("user", "105번 언제 와?"),
+]
+
+
+def _load_routes() -> list:
+    with open(os.path.join(FIXTURES, "parsed_routes.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_sessions() -> dict:
+    """대화 길이별로 실제 흐름과 비슷한 세션 생성"""
+    routes = _load_routes()
+    sessions = {}
+
+    for name, turns in (("short", 2), ("medium", 8), ("long", 40)):
+        slots = SessionSlots(
+            state="main",
+            sub_state="main",
+            user_gps=["127.43168", "36.62544"],
+            history_dest=["청주대", "서원대"],
+            history_dep=["청주 엔포드호텔", "오송역"],
+        )
+        history = [
+            {"role": role, "content": content}
+            for role, content in (_DIALOGUE * (turns // len(_DIALOGUE) + 1))[:turns]
+        ]
+        slots.message_history = history
+        slots.history_set_dest_step = history[:4]
+        slots.history_set_dep_step = history[4:6]
+        if turns > 2:
+            slots.dest_name = "청주대교"
+            slots.dest_address = "충북 청주시 상당구 남주동"
+            slots.dest_coord = [127.491279556299, 36.6369449145635]
+            slots.dest_search_results = [{
+                "name": "청주대교",
+                "address": "충북 청주시 상당구 남주동",
+                "lon": 127.491279556299,
+                "lat": 36.6369449145635,
+            }]
+            slots.dep_coord = [127.443867, 36.630563]
+            slots.route = routes
+            slots.bus = [{"routeno": "105", "nodeid": "CJB271000127"}]
+        sessions[name] = slots.to_dict()
+    return sessions
+
+
+def _hash_v0(session: dict) -> tuple:
+    scalars = {k: json.dumps(v) for k, v in session.items() if k not in LIST_SLOTS}
+    lists = {k: [json.dumps(item) for item in session.get(k, [])] for k in LIST_SLOTS}
+    return scalars, lists
+
+
+def _hash_v1(session: dict) -> tuple:
+    scalars = encode_fields({k: v for k, v in session.items() if k not in LIST_SLOTS})
+    lists = {k: [encode_value(item) for item in session.get(k, [])] for k in LIST_SLOTS}
+    return scalars, lists
+
+
+def _size(scalars: dict, lists: dict) -> int:
+    total = sum(len(k.encode()) + len(v.encode()) for k, v in scalars.items())
+    total += sum(len(item.encode()) for items in lists.values() for item in items)
+    return total
+
+
+def _timing(func, number: int = 2000) -> float:
+    """1회 평균 실행 시간(마이크로초)"""
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def measure(session: dict) -> dict:
+    legacy = json.dumps(session)
+    compact = encode_session(session)
+    return {
+        "bytes": {
+            "legacy_blob": len(legacy.encode()),
+            "hash_v0": _size(*_hash_v0(session)),
+            "hash_v1": _size(*_hash_v1(session)),
+        },
+        "encode_us": {
+            "legacy_blob": _timing(lambda: json.dumps(session)),
+            "hash_v1": _timing(lambda: encode_session(session)),
+        },
+        "decode_us": {
+            "legacy_blob": _timing(lambda: json.loads(legacy)),
+            "hash_v1": _timing(lambda: decode_session(compact)),
+        },
+    }
+
+
+def measure_redis(sessions: dict) -> dict:
+    """세 형식을 Redis에 기록한 뒤 MEMORY USAGE 합계 비교"""
+    from app.services.redis_client import redis_client
+
+    result = {}
+    for name, session in sessions.items():
+        prefix = f"bench:memory:{name}"
+        usage = {}
+
+        redis_client.set(f"{prefix}:legacy", json.dumps(session))
+        usage["legacy_blob"] = redis_client.memory_usage(f"{prefix}:legacy")
+
+        for fmt, encoder in (("hash_v0", _hash_v0), ("hash_v1", _hash_v1)):
+            scalars, lists = encoder(session)
+            keys = [f"{prefix}:{fmt}"]
+            redis_client.hset(keys[0], mapping=scalars)
+            for key, items in lists.items():
+                if items:
+                    keys.append(f"{prefix}:{fmt}:{key}")
+                    redis_client.rpush(keys[-1], *items)
+            usage[fmt] = sum(redis_client.memory_usage(k) or 0 for k in keys)
+            redis_client.delete(*keys)
+
+        redis_client.delete(f"{prefix}:legacy")
+        result[name] = usage
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="세션 인코딩 형식별 크기/속도 비교")
+    parser.add_argument("--redis", action="store_true", help="Redis MEMORY USAGE도 측정")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    sessions = build_sessions()
+    report = {name: measure(session) for name, session in sessions.items()}
+    if args.redis:
+        for name, usage in measure_redis(sessions).items():
+            report[name]["redis_memory_usage"] = usage
+
+    print(f"{'session':<8} {'legacy_blob':>12} {'hash_v0':>10} {'hash_v1':>10} {'ratio':>7} "
+          f"{'enc(us) old/new':>16} {'dec(us) old/new':>16}")
+    for name, row in report.items():
+        size = row["bytes"]
+        ratio = size["hash_v1"] / size["legacy_blob"]
+        enc, dec = row["encode_us"], row["decode_us"]
+        print(f"{name:<8} {size['legacy_blob']:>12} {size['hash_v0']:>10} {size['hash_v1']:>10} {ratio:>7.2f} "
+              f"{enc['legacy_blob']:>7.1f}/{enc['hash_v1']:<8.1f} {dec['legacy_blob']:>7.1f}/{dec['hash_v1']:<8.1f}")
+        if "redis_memory_usage" in row:
+            print(f"{'':<8} redis MEMORY USAGE: {row['redis_memory_usage']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()